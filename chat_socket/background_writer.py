@@ -0,0 +1,110 @@
+"""백그라운드 쓰기 태스크 (요청 큐 저널, 세션 레지스트리, 대화 기록, 검색 색인 공통)
+
+저장소는 기록을 메모리 버퍼에 모으기만 하고, 여기의 태스크가 버퍼에 변경이 생기면
+interval 동안 더 모았다가 묶음을 꺼내(collect, 이벤트 루프에서) 스레드에서 쓴다(write).
+
+- 삭제/압축처럼 파일을 건드리는 다른 작업도 submit()으로 같은 쓰기 스레드에 넣어
+  묶음 쓰기와 순서대로 실행한다 (이벤트 루프에서 파일 I/O를 하지 않고, 쓰는 중인 묶음과 겹치지 않음).
+- 한 번에 한 묶음만 스레드에서 실행하고, 실행 중에 들어온 기록은 다음 묶음까지 버퍼에 남는다.
+- 태스크를 시작하지 않았으면 (벤치마크, 종료 직전) flush()/submit()이 호출한 스레드에서 바로 쓴다.
+"""
+import asyncio
+import threading
+from collections import deque
+
+from log_pipeline import get_logger
+
+log = get_logger("writer")
+
+
+class BackgroundWriter:
+    """collect() -> 묶음 (없으면 None, 이벤트 루프에서 호출), write(묶음) (쓰기 스레드에서 호출)
+
+    write와 submit한 작업의 오류 처리(로그, 통계)는 저장소가 하고, 여기서는 놓친 예외만 남긴다.
+    """
+
+    def __init__(self, name: str, interval: float, collect, write):
+        self.name = name
+        self.interval = interval
+        self.collect = collect
+        self.write = write
+        self.operations = deque()  # 다음 묶음을 쓴 뒤 실행할 (함수, 인자)
+        self._lock = threading.Lock()  # 쓰기 스레드와 동기 flush()가 겹치지 않도록
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def notify(self):
+        """버퍼에 기록이 생겼음을 알림"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def submit(self, func, *args):
+        """쓰기 스레드에서 실행할 작업 예약 (모아 둔 묶음을 쓴 뒤 순서대로, 태스크가 없으면 바로 실행)"""
+        self.operations.append((func, args))
+        if self._task is None:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def _take(self):
+        batch = self.collect()
+        operations = list(self.operations)
+        self.operations.clear()
+        return batch, operations
+
+    def _drain(self, batch, operations: list):
+        with self._lock:
+            for func, args in ([(self.write, (batch,))] if batch is not None else []) + operations:
+                try:
+                    func(*args)
+                except Exception as e:
+                    log.warning(f"[{self.name}] 쓰기 작업 실패: {e!r}")
+
+    def flush(self):
+        """모아 둔 묶음과 예약된 작업을 호출한 스레드에서 바로 실행 (종료 직전 등 동기 호출용)"""
+        batch, operations = self._take()
+        if batch is not None or operations:
+            self._drain(batch, operations)
+
+    async def run_now(self):
+        """모아 둔 묶음과 예약된 작업을 기다리지 않고 스레드에서 실행 (검색 직전 등)"""
+        batch, operations = self._take()
+        if batch is not None or operations:
+            await asyncio.get_event_loop().run_in_executor(None, self._drain, batch, operations)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await self._wakeup.wait()
+            if not self._closing:
+                await asyncio.sleep(self.interval)
+            self._wakeup.clear()
+            batch, operations = self._take()
+            if batch is not None or operations:
+                await loop.run_in_executor(None, self._drain, batch, operations)
+            if self._closing:
+                return
+
+    def start(self):
+        """쓰기 태스크 시작 (이벤트 루프 안에서 호출, 이미 모인 기록이 있으면 바로 한 번 씀)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        """쓰기 태스크 중지 (남은 묶음과 작업을 쓰고 끝냄)"""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+            self._closing = False
+        self.flush()
@@ -0,0 +1,124 @@
+"""브로드캐스트 지연 시간 벤치마크
+
+가짜 WebSocket 클라이언트 1/10/100개(그중 하나는 느린 클라이언트)에
+진행 상황 프레임을 연속으로 브로드캐스트하고, 기존 순차 전송 방식과
+fanout.ClientHub 방식의 지연 시간을 비교한다.
+
+- 호출 지연: broadcast() 호출이 반환될 때까지 걸린 시간 (Claude 처리 루프가 멈추는 시간)
+- 전달 지연: 빠른 클라이언트가 프레임을 받기까지 걸린 시간
+
+실행: python bench/bench_broadcast.py [--frames 50] [--slow-delay 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fanout import ClientHub, encode  # noqa: E402
+
+
+class FakeWebSocket:
+    """send_str마다 delay초가 걸리는 가짜 WebSocket"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.latencies = []
+
+    async def send_str(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        sent_at = json.loads(text)["sent_at"]
+        self.latencies.append(time.perf_counter() - sent_at)
+
+    async def close(self):
+        pass
+
+
+async def legacy_broadcast(clients: list, message: dict):
+    """기존 방식: 클라이언트마다 인코딩 없이 순차 await"""
+    message_str = json.dumps(message, ensure_ascii=False)
+    for client in clients:
+        try:
+            await client.send_str(message_str)
+        except Exception:
+            pass
+
+
+def make_message(i: int) -> dict:
+    return {
+        "type": "progress",
+        "progress_type": "tool_start",
+        "turn": i,
+        "tool": "Read",
+        "detail": "chat_socket/server.py",
+        "sent_at": time.perf_counter()
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run_case(mode: str, client_count: int, frames: int, slow_delay: float) -> dict:
+    clients = [FakeWebSocket(slow_delay if i == 0 else 0.0) for i in range(client_count)]
+    hub = None
+    if mode == "hub":
+        hub = ClientHub()
+        for ws in clients:
+            hub.add(ws, "bench")
+
+    call_times = []
+    for i in range(frames):
+        start = time.perf_counter()
+        if hub:
+            hub.broadcast(encode(make_message(i)), room="bench", droppable=True)
+        else:
+            await legacy_broadcast(clients, make_message(i))
+        call_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0)  # 다음 이벤트 사이 writer가 돌 수 있게 양보
+
+    # 빠른 클라이언트의 수신이 끝날 때까지 대기
+    fast = clients[1:] or clients
+    deadline = time.perf_counter() + 30
+    while any(len(ws.latencies) < frames for ws in fast) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.001)
+
+    delivery = [lat for ws in fast for lat in ws.latencies]
+    if hub:
+        for ws in clients:
+            await hub.remove(ws)
+
+    return {
+        "call_p50_ms": statistics.median(call_times) * 1000,
+        "call_p99_ms": percentile(call_times, 0.99) * 1000,
+        "deliver_p50_ms": statistics.median(delivery) * 1000 if delivery else 0.0,
+        "deliver_p99_ms": percentile(delivery, 0.99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="브로드캐스트 지연 시간 벤치마크")
+    parser.add_argument("--frames", type=int, default=50, help="브로드캐스트할 프레임 수")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="느린 클라이언트의 프레임당 전송 시간 (초)")
+    args = parser.parse_args()
+
+    print(f"프레임 {args.frames}개, 느린 클라이언트 1개 (프레임당 {args.slow_delay * 1000:.0f}ms)")
+    print(f"{'방식':<8}{'클라이언트':>10}{'호출 p50':>12}{'호출 p99':>12}{'전달 p50':>12}{'전달 p99':>12}")
+    for client_count in (1, 10, 100):
+        for mode in ("legacy", "hub"):
+            result = await run_case(mode, client_count, args.frames, args.slow_delay)
+            print(f"{mode:<8}{client_count:>10}"
+                  f"{result['call_p50_ms']:>10.2f}ms{result['call_p99_ms']:>10.2f}ms"
+                  f"{result['deliver_p50_ms']:>10.2f}ms{result['deliver_p99_ms']:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,272 @@
+"""종단 간 부하/지연 벤치마크 (가짜 Claude CLI)
+
+server.py를 별도 프로세스로 띄우되 PATH 앞쪽에 가짜 `claude`(fake_claude.py)를
+두어 과금 없이 실행하고, swarm.py의 클라이언트 무리로 /ws에 부하를 준다.
+
+측정 항목:
+- 전송 → 첫 진행 상황(start) 지연, 전송 → 최종 응답 지연 (p50/p90/p99/max)
+- 초당 처리 요청 수, 초당 수신 프레임 수
+- 서버 프로세스 RSS (시작/최대/종료, Linux /proc 또는 psutil)
+- Claude CLI 실행 수, 요청당 비용 (서버 /usage의 사용량 장부 기준, 가짜 CLI는 실행당 $0.0123)
+
+결과를 --json으로 저장해 두고 다음 실행에서 --compare로 비교할 수 있다.
+--batch는 묶음 처리를 끈 실행과 켠 실행(server.py --batch)을 차례로 하고 비교한다.
+
+실행 예:
+  python bench/bench_e2e.py --clients 20 --messages 3 --scenario tools --json before.json
+  python bench/bench_e2e.py --clients 20 --messages 3 --scenario tools --compare before.json
+  python bench/bench_e2e.py --server-arg=--no-stream-text --server-arg=--warm-pool=0
+  python bench/bench_e2e.py --clients 12 --rooms 2 --scenario text --batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from swarm import Swarm, print_report
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_PATH = os.path.join(os.path.dirname(BENCH_DIR), "server.py")
+FAKE_CLAUDE_PATH = os.path.join(BENCH_DIR, "fake_claude.py")
+
+try:
+    import psutil  # 선택 의존성 (/proc이 없는 OS에서 RSS 측정)
+except ImportError:
+    psutil = None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_claude_shim(directory: str) -> str:
+    """가짜 CLI를 `claude`라는 이름으로 실행하는 스크립트 생성 (PATH에 추가할 디렉토리 반환)"""
+    if sys.platform == "win32":
+        path = os.path.join(directory, "claude.cmd")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'@"{sys.executable}" "{FAKE_CLAUDE_PATH}" %*\r\n')
+    else:
+        path = os.path.join(directory, "claude")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLAUDE_PATH}" "$@"\n')
+        os.chmod(path, 0o755)
+    return directory
+
+
+def read_rss(pid: int):
+    """프로세스 RSS (바이트), 측정할 수 없으면 None"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            pass
+    return None
+
+
+def to_mb(value):
+    """바이트 -> MB (소수 한 자리, 없으면 None)"""
+    return round(value / 1024 / 1024, 1) if value else None
+
+
+async def sample_rss(pid: int, samples: list, stop: asyncio.Event, interval: float = 0.2):
+    while not stop.is_set():
+        rss = read_rss(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def wait_ready(port: int, process, timeout: float = 30):
+    """서버 /ping 응답까지 대기"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"서버가 종료됨 (exit code {process.returncode})")
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/ping") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("서버 시작 시간 초과")
+
+
+def compare(result: dict, baseline: dict):
+    """이전 결과와 주요 지표 비교 출력"""
+    rows = [
+        ("첫 진행 상황 p50 (ms)", ("first_progress", "p50_ms"), ",.1f"),
+        ("첫 진행 상황 p99 (ms)", ("first_progress", "p99_ms"), ",.1f"),
+        ("최종 응답 p50 (ms)", ("end_to_end", "p50_ms"), ",.1f"),
+        ("최종 응답 p99 (ms)", ("end_to_end", "p99_ms"), ",.1f"),
+        ("초당 요청", ("requests_per_s",), ",.1f"),
+        ("초당 프레임", ("frames_per_s",), ",.1f"),
+        ("CLI 실행 수", ("claude_runs",), ",.0f"),
+        ("요청당 비용 (USD)", ("cost_per_request_usd",), ".4f"),
+        ("최대 RSS (MB)", ("rss_peak_mb",), ",.1f"),
+    ]
+    print("-" * 60)
+    print(f"{'지표':<22}{'이전':>12}{'현재':>12}{'변화':>12}")
+    for label, path, spec in rows:
+        before, after = baseline, result
+        for key in path:
+            before = (before or {}).get(key)
+            after = (after or {}).get(key)
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{label:<22}{format(before, spec):>12}{format(after, spec):>12}{change:>12}")
+
+
+async def fetch_usage(port: int) -> dict:
+    """서버 /usage (사용량 장부, 묶음 처리 통계), 실패하면 빈 dict"""
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/usage") as resp:
+                return await resp.json()
+    except (aiohttp.ClientError, ValueError):
+        return {}
+
+
+async def run(args) -> dict:
+    port = args.port or free_port()
+    with tempfile.TemporaryDirectory(prefix="chat-bench-") as temp_dir:
+        shim_dir = make_claude_shim(temp_dir)
+        env = dict(os.environ)
+        env["PATH"] = shim_dir + os.pathsep + env.get("PATH", "")
+        env["FAKE_CLAUDE_SPEED"] = str(args.speed)
+        env["FAKE_CLAUDE_SCENARIO"] = args.scenario
+        if args.transcript:
+            env["FAKE_CLAUDE_TRANSCRIPT"] = os.path.abspath(args.transcript)
+        # ccusage(npx)를 실행하지 않고, 실제 사용량 로그를 읽지 않도록 빈 설정 디렉토리의 로그로 집계
+        env["USAGE_SOURCE"] = "logs"
+        env["CLAUDE_CONFIG_DIR"] = temp_dir
+        env["PYTHONUNBUFFERED"] = "1"
+
+        # 저장소는 모두 임시 디렉토리에 (기본 경로는 server.py 기준 data/이므로 지정하지 않으면 실제 데이터에 씀)
+        # 서버에 파일 저장소가 추가되면 여기에도 경로 인자 추가
+        data_dir = os.path.join(temp_dir, "data")
+        cmd = [sys.executable, SERVER_PATH, "--port", str(port), "--workers", str(args.workers),
+               "--no-journal",
+               "--session-registry", os.path.join(data_dir, "sessions.json"),
+               "--history-dir", os.path.join(data_dir, "transcripts"),
+               "--search-db", os.path.join(data_dir, "search.db"),
+               "--blob-dir", os.path.join(data_dir, "blobs")] + args.server_arg
+        log = open(os.path.join(temp_dir, "server.log"), "w", encoding="utf-8")
+        process = subprocess.Popen(cmd, env=env, cwd=temp_dir, stdout=log, stderr=subprocess.STDOUT)
+        samples = []
+        stop = asyncio.Event()
+        try:
+            await wait_ready(port, process)
+            rss_start = read_rss(process.pid)
+            sampler = asyncio.ensure_future(sample_rss(process.pid, samples, stop))
+            swarm = Swarm(f"ws://127.0.0.1:{port}/ws", args.clients, args.rooms, args.messages,
+                          timeout=args.timeout)
+            result = await swarm.run()
+            usage = await fetch_usage(port)
+            rss_end = read_rss(process.pid)
+            stop.set()
+            await sampler
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+            if args.server_log:
+                with open(os.path.join(temp_dir, "server.log"), "r", encoding="utf-8") as f:
+                    print(f.read())
+
+    # 장부는 묶음 요청을 요청별로 나눠 기록하므로 CLI 실행 수는 묶음 통계로 보정
+    totals = usage.get("ledger", {}).get("totals", {})
+    batch = usage.get("batch", {})
+    if totals:
+        result["claude_runs"] = totals["requests"] - batch.get("requests", 0) + batch.get("runs", 0)
+        result["cost_usd"] = round(totals["costUSD"], 4)
+        result["cost_per_request_usd"] = (round(totals["costUSD"] / result["completed"], 5)
+                                          if result["completed"] else None)
+    result.update({
+        "scenario": args.scenario,
+        "speed": args.speed,
+        "workers": args.workers,
+        "server_args": args.server_arg,
+        "rss_start_mb": to_mb(rss_start),
+        "rss_peak_mb": to_mb(max(samples)) if samples else None,
+        "rss_end_mb": to_mb(rss_end),
+    })
+    return result
+
+
+def report(result: dict):
+    """실행 결과 출력"""
+    print("=" * 60)
+    print(f"시나리오 {result['scenario']} (속도 x{result['speed']}), 워커 {result['workers']}개"
+          + (f", 서버 인자 {' '.join(result['server_args'])}" if result["server_args"] else ""))
+    print_report(result)
+    if result.get("claude_runs") is not None:
+        print(f"Claude CLI 실행 {result['claude_runs']}회, 비용 ${result['cost_usd']:.4f} "
+              f"(요청당 ${result['cost_per_request_usd'] or 0:.5f})")
+    if result["rss_peak_mb"] is not None:
+        print(f"서버 RSS: 시작 {result['rss_start_mb']}MB, 최대 {result['rss_peak_mb']}MB, 종료 {result['rss_end_mb']}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="종단 간 부하/지연 벤치마크 (가짜 Claude CLI)")
+    parser.add_argument("--clients", type=int, default=10, help="WebSocket 클라이언트 수")
+    parser.add_argument("--rooms", type=int, default=0, help="방 수 (0이면 클라이언트마다 별도 방)")
+    parser.add_argument("--messages", type=int, default=3, help="클라이언트당 메시지 수")
+    parser.add_argument("--workers", type=int, default=2, help="서버 Claude 워커 수")
+    parser.add_argument("--scenario", default="mixed",
+                        help="가짜 CLI 시나리오 (text/tools/error/session_error/mixed)")
+    parser.add_argument("--speed", type=float, default=1.0, help="가짜 CLI 지연 배수 (0이면 지연 없음)")
+    parser.add_argument("--transcript", default="", help="시나리오 대신 재생할 녹화 stream-json 파일")
+    parser.add_argument("--timeout", type=float, default=120, help="요청당 최대 대기 시간 (초)")
+    parser.add_argument("--port", type=int, default=0, help="서버 포트 (0이면 빈 포트)")
+    parser.add_argument("--server-arg", action="append", default=[], help="server.py에 넘길 추가 인자 (반복 가능)")
+    parser.add_argument("--server-log", action="store_true", help="종료 후 서버 로그 출력")
+    parser.add_argument("--json", default="", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", default="", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--batch", action="store_true", help="묶음 처리 끔/켬 두 번 실행 후 비교")
+    args = parser.parse_args()
+
+    if args.batch:
+        baseline = asyncio.run(run(args))
+        report(baseline)
+        args.server_arg = args.server_arg + ["--batch"]
+    result = asyncio.run(run(args))
+    report(result)
+    if args.batch:
+        compare(result, baseline)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
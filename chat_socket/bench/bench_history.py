@@ -0,0 +1,94 @@
+"""대화 기록 페이지 조회 벤치마크 (기록 길이별 /history 한 페이지 읽기 시간)
+
+기록 1천/1만/10만 개짜리 대화 기록을 임시 디렉토리에 만들고, 무작위 위치의 페이지를
+다음 두 방식으로 읽는 시간을 비교한다.
+
+- TranscriptStore: 인덱스(mmap)에서 페이지 범위를 찾아 그 부분만 디코딩
+- 전체 읽기: JSON Lines 파일 전체를 읽어 나눈 뒤 페이지만 디코딩 (인덱스 없는 단순 방식)
+
+실행: python bench/bench_history.py [--sizes 1000 10000 100000] [--pages 500] [--limit 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_claude import make_text, tool_call  # noqa: E402
+from transcript_store import TranscriptStore  # noqa: E402
+
+
+def make_entries(count: int) -> list:
+    """사용자 메시지, 도구 실행, 완료 통계, Claude 응답이 섞인 기록 count개"""
+    entries = []
+    index = 0
+    while len(entries) < count:
+        entries.append({"type": "message", "ts": 0, "username": "alice", "message": make_text(f"q{index}", 80)})
+        for tool in range(4):
+            name, tool_input, _ = tool_call(index + tool)
+            entries.append({"type": "tool", "ts": 0, "tool": name, "detail": json.dumps(tool_input)[:100]})
+        entries.append({"type": "complete", "ts": 0, "duration_sec": 3.2, "cost_usd": 0.0123, "turns": 5})
+        entries.append({"type": "message", "ts": 0, "username": "Claude", "message": make_text(f"a{index}", 600),
+                        "reply_to": [{"id": f"r{index}", "sender": "alice"}]})
+        index += 1
+    return entries[:count]
+
+
+def full_read_page(path: str, before: int, limit: int) -> list:
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    start = max(0, before - limit)
+    return [json.loads(line) for line in lines[start:before]]
+
+
+def measure(read, size: int, pages: int, limit: int) -> list:
+    """무작위 위치 페이지 읽기 시간 목록 (ms)"""
+    rng = random.Random(size)
+    times = []
+    for _ in range(pages):
+        before = rng.randint(limit, size)
+        started = time.perf_counter()
+        read(before)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대화 기록 페이지 조회 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="기록 개수 목록")
+    parser.add_argument("--pages", type=int, default=500, help="크기별 페이지 조회 횟수")
+    parser.add_argument("--limit", type=int, default=50, help="페이지 크기")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        store = TranscriptStore(directory)
+        print(f"페이지 {args.limit}개씩, 크기별 {args.pages}회 무작위 조회")
+        print("-" * 76)
+        print(f"{'기록 수':>10}{'파일 크기':>12}{'mmap p50':>12}{'mmap p99':>12}{'전체 읽기 p50':>16}{'배율':>10}")
+        entries = make_entries(max(args.sizes))
+        for size in args.sizes:
+            key = f"bench{size:08d}"
+            store.append(key, entries[:size])
+            store.flush()
+            seg_path = os.path.join(directory, f"{key}.seg")
+            indexed = measure(lambda before: store.page(key, before, args.limit), size, args.pages, args.limit)
+            full = measure(lambda before: full_read_page(seg_path, before, args.limit), size,
+                           max(10, args.pages // 10), args.limit)
+            p50, p99, full_p50 = indexed[len(indexed) // 2], indexed[int(len(indexed) * 0.99)], full[len(full) // 2]
+            print(f"{size:>10,}{os.path.getsize(seg_path) / 1024 / 1024:>10.1f}MB{p50:>10.3f}ms{p99:>10.3f}ms"
+                  f"{full_p50:>14.2f}ms{full_p50 / p50:>9.0f}x")
+        asyncio.run(store.close())
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""로그 출력이 이벤트 루프를 막는 시간 벤치마크 (print vs 큐 로깅)
+
+느린 콘솔(파이프를 천천히 읽는 스레드)에 stream-json 이벤트 처리 때처럼 로그를
+몰아서 남기면서, 1ms마다 깨어나는 태스크로 이벤트 루프 지연을 측정한다.
+
+- print: 기존 방식 (파이프가 가득 차면 쓰기가 끝날 때까지 이벤트 루프가 멈춤)
+- 큐 로깅: log_pipeline (이벤트 루프는 큐에 넣기만 하고 백그라운드 스레드가 출력)
+
+방식마다 새 프로세스에서 실행한다 (표준 출력을 느린 파이프로 바꾸므로).
+결과: 로그 호출에 쓴 시간 합계, 이벤트 루프 최대/99% 지연, 버린 로그 수,
+마지막 로그가 콘솔에 쓰일 때까지 걸린 시간.
+
+실행: python bench/bench_logging.py [--lines 5000] [--burst 100] [--read-rate 400]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_pipeline  # noqa: E402
+
+READ_CHUNK = 4096  # 느린 콘솔이 한 번에 읽는 크기 (바이트)
+TICK = 0.001  # 이벤트 루프 지연 측정 간격 (초)
+
+
+def slow_console(read_rate_kb: int):
+    """표준 출력(fd 1)을 초당 read_rate_kb KB만 읽는 파이프로 교체 (읽기 스레드와 읽은 바이트 수 반환)"""
+    read_fd, write_fd = os.pipe()
+    os.dup2(write_fd, 1)
+    os.close(write_fd)
+    sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)  # 콘솔처럼 줄 단위
+    received = {"bytes": 0}
+
+    def reader():
+        interval = READ_CHUNK / (read_rate_kb * 1024)
+        while True:
+            data = os.read(read_fd, READ_CHUNK)
+            if not data:
+                return
+            received["bytes"] += len(data)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    return thread, received
+
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    loop = asyncio.get_event_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - started - TICK)
+
+
+async def workload(write, lines: int, burst: int) -> float:
+    """stream-json 이벤트 처리처럼 burst줄씩 로그를 남기고 로그 호출에 쓴 시간 합계 반환"""
+    spent = 0.0
+    for index in range(lines):
+        message = (f"[Claude] [{index}] Bash python -m pytest -q tests/test_{index % 50}.py "
+                   f"--maxfail=1 -k 'handler_{index} and not slow' | 방: bench, 요청: {index // burst}")
+        started = time.perf_counter()
+        write(message)
+        spent += time.perf_counter() - started
+        if (index + 1) % burst == 0:
+            await asyncio.sleep(0.005)  # 다음 stream-json 줄 도착 대기
+    return spent
+
+
+async def run_case(mode: str, lines: int, burst: int) -> dict:
+    if mode == "queue":
+        log_pipeline.pipeline.setup("INFO")
+        logger = log_pipeline.get_logger("bench")
+        write = logger.info
+    else:
+        write = print
+    stop = asyncio.Event()
+    lags = []
+    lag_task = asyncio.ensure_future(measure_lag(stop, lags))
+    started = time.perf_counter()
+    spent = await workload(write, lines, burst)
+    logged = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    if mode == "queue":
+        log_pipeline.pipeline.stop()  # 남은 레코드를 모두 콘솔에 쓸 때까지 대기
+    sys.stdout.flush()
+    lags.sort()
+    return {
+        "log_call_ms": spent * 1000,
+        "workload_ms": logged * 1000,
+        "flushed_ms": (time.perf_counter() - started) * 1000,
+        "max_lag_ms": lags[-1] * 1000 if lags else 0,
+        "p99_lag_ms": lags[int(len(lags) * 0.99)] * 1000 if lags else 0,
+        "dropped": log_pipeline.pipeline.summary().get("dropped", 0)
+    }
+
+
+def child(args):
+    thread, received = slow_console(args.read_rate)
+    result = asyncio.run(run_case(args.run, args.lines, args.burst))
+    sys.stdout = sys.stderr
+    os.close(1)  # 읽기 스레드가 남은 내용을 모두 읽고 끝나도록
+    thread.join()
+    result["console_bytes"] = received["bytes"]
+    sys.stderr.write(json.dumps(result) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="print vs 큐 로깅 이벤트 루프 지연 벤치마크")
+    parser.add_argument("--lines", type=int, default=5000, help="남길 로그 줄 수")
+    parser.add_argument("--burst", type=int, default=100, help="한 번에 몰아서 남길 줄 수 (사이에 5ms 대기)")
+    parser.add_argument("--read-rate", type=int, default=400, help="느린 콘솔 읽기 속도 (KB/초)")
+    parser.add_argument("--queue-size", type=int, default=log_pipeline.LOG_QUEUE_SIZE,
+                        help="로그 큐 크기 (작게 하면 가득 찼을 때 버리는 동작 확인)")
+    parser.add_argument("--run", choices=["print", "queue"], help=argparse.SUPPRESS)  # 내부용 (방식 하나 실행)
+    args = parser.parse_args()
+
+    if args.run:
+        log_pipeline.LOG_QUEUE_SIZE = args.queue_size
+        child(args)
+        return
+
+    print(f"로그 {args.lines:,}줄 ({args.burst}줄씩), 콘솔 읽기 {args.read_rate}KB/초, 큐 {args.queue_size:,}")
+    results = {}
+    for mode in ("print", "queue"):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", mode,
+                               "--lines", str(args.lines), "--burst", str(args.burst),
+                               "--read-rate", str(args.read_rate), "--queue-size", str(args.queue_size)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        results[mode] = json.loads(proc.stderr.strip().splitlines()[-1])
+
+    rows = [("로그 호출 합계 (ms)", "log_call_ms"), ("작업 시간 (ms)", "workload_ms"),
+            ("콘솔 출력 완료 (ms)", "flushed_ms"), ("루프 최대 지연 (ms)", "max_lag_ms"),
+            ("루프 99% 지연 (ms)", "p99_lag_ms"), ("버린 로그 (줄)", "dropped"), ("콘솔 출력 (바이트)", "console_bytes")]
+    print("-" * 56)
+    print(f"{'항목':<22}{'print':>16}{'큐 로깅':>16}")
+    for label, key in rows:
+        print(f"{label:<22}{results['print'][key]:>16,.1f}{results['queue'][key]:>16,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""stream-json 파서 처리량 벤치마크 (초당 줄 수)
+
+큰 stream-json 대화 기록(실제 CLI처럼 --include-partial-messages 출력: message_start,
+text_delta/input_json_delta 조각, 긴 도구 결과 등)을 메모리에 만들거나 녹화 파일을
+읽어, 다음 방식의 처리량을 비교한다.
+
+- 기존: 모든 줄 json.loads 후 중첩 if/elif 분기 (stream_parser 도입 전 server.py 방식)
+- StreamParser + json: 앞부분 검사로 무시할 줄 건너뛰기, 디코딩은 json
+- StreamParser + orjson: 위와 같고 디코딩은 orjson (설치되어 있을 때만)
+
+실행: python bench/bench_parser.py [--requests 200] [--repeat 5] [--transcript 파일.jsonl]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_claude import make_text, tool_call, TEXT_CHUNK  # noqa: E402
+from stream_parser import StreamParser, orjson  # noqa: E402
+
+
+def dumps(event: dict) -> str:
+    # 실제 CLI(JSON.stringify)와 같은 공백 없는 구분자
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+def stream_event(event: dict) -> str:
+    return dumps({"type": "stream_event", "event": event, "session_id": "bench", "parent_tool_use_id": None})
+
+
+def partial_message(blocks: list) -> list:
+    """assistant 메시지 하나의 partial 출력 줄 (message_start ~ message_stop + 최종 assistant)"""
+    lines = [stream_event({"type": "message_start", "message": {"id": "msg_bench", "role": "assistant",
+                                                                "content": [], "usage": {"input_tokens": 10}}})]
+    for index, block in enumerate(blocks):
+        if block["type"] == "text":
+            lines.append(stream_event({"type": "content_block_start", "index": index,
+                                       "content_block": {"type": "text", "text": ""}}))
+            text = block["text"]
+            for start in range(0, len(text), TEXT_CHUNK):
+                lines.append(stream_event({"type": "content_block_delta", "index": index,
+                                           "delta": {"type": "text_delta", "text": text[start:start + TEXT_CHUNK]}}))
+        else:
+            lines.append(stream_event({"type": "content_block_start", "index": index,
+                                       "content_block": {"type": "tool_use", "id": block["id"],
+                                                         "name": block["name"], "input": {}}}))
+            raw_input = dumps(block["input"])
+            for start in range(0, len(raw_input), 40):
+                lines.append(stream_event({"type": "content_block_delta", "index": index,
+                                           "delta": {"type": "input_json_delta",
+                                                     "partial_json": raw_input[start:start + 40]}}))
+        lines.append(stream_event({"type": "content_block_stop", "index": index}))
+    lines.append(stream_event({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                               "usage": {"output_tokens": 100}}))
+    lines.append(stream_event({"type": "message_stop"}))
+    lines.append(dumps({"type": "assistant", "message": {"content": blocks}, "session_id": "bench"}))
+    return lines
+
+
+def make_transcript(requests: int, tools: int) -> list:
+    """요청 requests개 분량의 stream-json 줄 목록"""
+    lines = []
+    for request in range(requests):
+        lines.append(dumps({"type": "system", "subtype": "init", "model": "bench-model", "session_id": "bench",
+                            "tools": ["Read", "Grep", "Edit", "Bash", "TodoWrite"]}))
+        for index in range(tools):
+            name, tool_input, tool_result = tool_call(request + index)
+            tool_id = f"toolu_{request}_{index}"
+            lines.extend(partial_message([
+                {"type": "text", "text": make_text(f"{request}-{index}", 120)},
+                {"type": "tool_use", "id": tool_id, "name": name, "input": tool_input}
+            ]))
+            # Read 결과처럼 큰 도구 결과
+            content = make_text(f"result-{request}-{index}", 3000)
+            lines.append(dumps({"type": "user", "message": {"content": [
+                {"type": "tool_result", "tool_use_id": tool_id, "content": content}
+            ]}, "tool_use_result": tool_result}))
+        text = make_text(f"answer-{request}", 1500)
+        lines.extend(partial_message([{"type": "text", "text": text}]))
+        lines.append(dumps({"type": "result", "subtype": "success", "is_error": False, "num_turns": tools + 1,
+                            "duration_ms": 1000, "total_cost_usd": 0.01,
+                            "usage": {"input_tokens": 100, "output_tokens": 50}, "result": text}))
+    return lines
+
+
+def legacy_parse(line: str):
+    """stream_parser 도입 전 server.py의 처리 (모든 줄 json.loads 후 중첩 분기, 전송 제외)"""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    json_type = data.get("type", "")
+    events = []
+    if json_type == "system" and data.get("subtype") == "init":
+        events.append(("init", data.get("model", "unknown"), data.get("session_id", "")))
+    elif json_type == "assistant":
+        msg = data.get("message", {})
+        if isinstance(msg, dict) and isinstance(msg.get("content", []), list):
+            for item in msg.get("content", []):
+                if not isinstance(item, dict):
+                    continue
+                if item.get("type") == "tool_use":
+                    tool_name = item.get("name", "unknown")
+                    tool_input = item.get("input", {})
+                    detail, edit_info = "", None
+                    if tool_name in ("Read", "Edit", "Write"):
+                        detail = tool_input.get("file_path", "")
+                        if tool_name == "Edit":
+                            edit_info = {"type": "edit", "file": detail,
+                                         "old": tool_input.get("old_string", "")[:500],
+                                         "new": tool_input.get("new_string", "")[:500]}
+                        elif tool_name == "Write":
+                            edit_info = {"type": "write", "file": detail,
+                                         "content": tool_input.get("content", "")[:500]}
+                    elif tool_name == "Bash":
+                        detail = tool_input.get("command", "")[:100]
+                    elif tool_name == "Grep":
+                        detail = tool_input.get("pattern", "")
+                    elif tool_name == "TodoWrite":
+                        todos = tool_input.get("todos", [])
+                        edit_info = {"type": "todo", "todos": todos}
+                        detail = f"{len(todos)}개 항목"
+                    events.append(("tool_use", tool_name, detail, edit_info))
+                elif item.get("type") == "text":
+                    events.append(("text", item.get("text", "")))
+    elif json_type == "stream_event":
+        event = data.get("event", {})
+        if isinstance(event, dict):
+            if event.get("type") == "content_block_delta":
+                delta = event.get("delta", {})
+                if isinstance(delta, dict) and delta.get("type") == "text_delta":
+                    events.append(("text_delta", delta.get("text", "")))
+            elif event.get("type") == "content_block_start":
+                block = event.get("content_block", {})
+                if isinstance(block, dict) and block.get("type") == "text":
+                    events.append(("text_block",))
+    elif json_type == "user":
+        tool_result = data.get("tool_use_result", {})
+        if tool_result and isinstance(tool_result, dict):
+            file_info = tool_result.get("file", {})
+            events.append(("tool_result", file_info.get("numLines", 0) if isinstance(file_info, dict) else None))
+    elif json_type == "result":
+        usage = data.get("usage", {})
+        events.append(("result", data.get("num_turns", 0), data.get("total_cost_usd", 0),
+                       usage.get("input_tokens", 0), usage.get("output_tokens", 0)))
+    return json_type, events
+
+
+def measure(cases: list, lines: list, repeat: int) -> list:
+    """방식별 가장 빠른 반복의 초당 줄 수 (CPU 클럭 변화 영향을 줄이려고 방식을 번갈아 실행)"""
+    best = [None] * len(cases)
+    for _ in range(repeat):
+        for index, (_, parse) in enumerate(cases):
+            started = time.perf_counter()
+            for line in lines:
+                parse(line)
+            elapsed = time.perf_counter() - started
+            best[index] = elapsed if best[index] is None else min(best[index], elapsed)
+    return [len(lines) / elapsed for elapsed in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stream-json 파서 처리량 벤치마크")
+    parser.add_argument("--requests", type=int, default=200, help="생성할 요청 수")
+    parser.add_argument("--tools", type=int, default=8, help="요청당 도구 호출 수")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수 (가장 빠른 값 사용)")
+    parser.add_argument("--transcript", default="", help="생성 대신 읽을 녹화 stream-json 파일")
+    args = parser.parse_args()
+
+    if args.transcript:
+        with open(args.transcript, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    else:
+        lines = make_transcript(args.requests, args.tools)
+    total_bytes = sum(len(line.encode("utf-8")) for line in lines)
+    print(f"줄 {len(lines):,}개, {total_bytes / 1024 / 1024:.1f}MB, 반복 {args.repeat}회")
+
+    cases = [("기존 (json.loads + 분기)", legacy_parse),
+             ("StreamParser + json", StreamParser(loads=json.loads).parse)]
+    if orjson is not None:
+        cases.append(("StreamParser + orjson", StreamParser().parse))
+    else:
+        print("(orjson 미설치 - pip install orjson 후 다시 실행하면 orjson 경로도 측정)")
+
+    rates = measure(cases, lines, args.repeat)
+    baseline = rates[0]
+    print("-" * 64)
+    print(f"{'방식':<26}{'줄/초':>14}{'MB/초':>10}{'배율':>10}")
+    for (label, _), rate in zip(cases, rates):
+        mb_rate = rate * total_bytes / len(lines) / 1024 / 1024
+        print(f"{label:<26}{rate:>14,.0f}{mb_rate:>10.1f}{rate / baseline:>9.2f}x")
+
+    stats = StreamParser()
+    for line in lines:
+        stats.parse(line)
+    skipped = stats.stats["skipped"]
+    print(f"디코딩 생략: {skipped:,}줄 ({skipped / len(lines) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
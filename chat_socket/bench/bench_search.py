@@ -0,0 +1,143 @@
+"""대화 검색 벤치마크 (FTS5 색인 검색 시간, LIKE 전체 검색과 비교)
+
+세션 수백 개에 걸친 메시지/도구 실행 기록(기본 5만 건)을 생성해 SearchIndex에
+색인한 뒤, 흔한 단어/드문 단어/구문/파일 경로/세션·날짜 필터 검색을 반복해
+p50/p99 시간을 측정한다. 비교 기준은 같은 데이터를 일반 테이블에 넣고
+LIKE '%단어%'로 찾아 최신 20건을 고르는 방식 (색인 없이 매번 전체를 읽음).
+
+실행: python bench/bench_search.py [--entries 50000] [--sessions 300] [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_claude import make_text, tool_call  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+DAY = 24 * 60 * 60
+TOPICS = ("큐 스케줄러 수정", "웹소켓 재연결", "로그 파이프라인", "세션 레지스트리", "정적 파일 캐시",
+          "사용량 장부", "프로세스 트리 종료", "대화 기록 페이지", "진행 상황 묶음", "테스트 실패 원인")
+
+
+def generate(count: int, sessions: int, now: float):
+    """(토큰, 세션 ID, 기록 항목) 목록 - 세션마다 질문, 도구 실행 몇 개, 응답이 반복되고 시각은 최근 30일에 분포"""
+    rng = random.Random(count)
+    batches = []
+    generated = 0
+    index = 0
+    while generated < count:
+        session = rng.randrange(sessions)
+        ts = now - rng.random() * 30 * DAY
+        topic = TOPICS[index % len(TOPICS)]
+        entries = [{"type": "message", "ts": ts, "username": "alice",
+                    "message": f"{topic} 부탁해. " + make_text(f"q{index}", 60)}]
+        for tool in range(rng.randint(1, 4)):
+            name, tool_input, _ = tool_call(index + tool)
+            detail = tool_input.get("command") or tool_input.get("file_path") or tool_input.get("pattern") or ""
+            entries.append({"type": "tool", "ts": ts + tool, "tool": name, "detail": detail})
+        entries.append({"type": "message", "ts": ts + 10, "username": "Claude",
+                        "message": f"{topic} 완료. " + make_text(f"a{index}", 400)})
+        batches.append((f"token{session:04d}", f"sid-{session}", entries))
+        generated += len(entries)
+        index += 1
+    return batches
+
+
+def percentile(times: list, ratio: float) -> float:
+    return times[min(len(times) - 1, int(len(times) * ratio))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대화 검색 벤치마크 (FTS5 vs LIKE)")
+    parser.add_argument("--entries", type=int, default=50000, help="색인할 기록 수")
+    parser.add_argument("--sessions", type=int, default=300, help="세션 수")
+    parser.add_argument("--repeat", type=int, default=200, help="검색어별 반복 횟수 (LIKE는 1/10)")
+    args = parser.parse_args()
+
+    now = time.time()
+    directory = tempfile.mkdtemp(prefix="bench_search_")
+    try:
+        batches = generate(args.entries, args.sessions, now)
+        index = SearchIndex(os.path.join(directory, "search.db"))
+        if not index.enabled:
+            print("SQLite에 FTS5가 없어 실행할 수 없습니다.")
+            return
+
+        # 색인: 서버처럼 요청 단위로 add() 후 주기적으로 flush()
+        started = time.perf_counter()
+        for number, (token, session_id, entries) in enumerate(batches):
+            index.add(entries, token, "bench", session_id, 0)
+            if number % 50 == 49:
+                index.flush()
+        index.flush()
+        build = time.perf_counter() - started
+        indexed = index.stats["indexed"]
+
+        # 비교 기준: 같은 본문을 일반 테이블에 넣고 LIKE로 검색
+        plain = sqlite3.connect(os.path.join(directory, "plain.db"))
+        plain.execute("CREATE TABLE entries (ts REAL, token TEXT, body TEXT)")
+        plain.executemany("INSERT INTO entries VALUES (?, ?, ?)", (
+            (entry["ts"], token, entry.get("message") or entry.get("detail") or "")
+            for token, _, entries in batches for entry in entries))
+        plain.commit()
+
+        db_size = os.path.getsize(os.path.join(directory, "search.db")) / 1024 / 1024
+        print(f"기록 {indexed:,}건 (세션 {args.sessions}개) 색인 {build:.2f}초 "
+              f"({indexed / build:,.0f}건/초), DB {db_size:.1f}MB")
+        print("-" * 94)
+        print(f"{'검색':<42}{'결과':>6}{'FTS5 p50':>12}{'FTS5 p99':>12}{'LIKE p50':>12}{'배율':>8}")
+
+        week_ago = now - 7 * DAY
+        cases = [
+            ("흔한 단어 (기록 20%): 완료", {"query": "완료"}, "%완료%", None),
+            ("주제 단어 (기록 4%): 재연결", {"query": "재연결"}, "%재연결%", None),
+            ("드문 명령: test_1233.py", {"query": "test_1233.py"}, "%test_1233.py%", None),
+            ("드문 패턴: handler_776", {"query": "handler_776"}, "%handler_776%", None),
+            ("구문: \"로그 파이프라인\"", {"query": "\"로그 파이프라인\""}, "%로그 파이프라인%", None),
+            ("파일 경로: module_3.py", {"query": "module_3.py"}, "%module_3.py%", None),
+            ("단어 2개: 큐 스케줄러", {"query": "큐 스케줄러"}, "%큐 스케줄러%", None),
+            ("세션 필터 + 흔한 단어", {"query": "완료", "token": "token0007"}, "%완료%", "token0007"),
+            ("최근 7일 + 단어", {"query": "재연결", "since": week_ago}, "%재연결%", None),
+        ]
+        for label, params, pattern, token in cases:
+            times = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = index.search(all_sessions=token is None, **params)  # 세션 필터가 없으면 관리자 전체 검색
+                times.append((time.perf_counter() - started) * 1000)
+            times.sort()
+            like_sql = "SELECT ts, body FROM entries WHERE body LIKE ?"
+            like_params = [pattern]
+            if token:
+                like_sql += " AND token = ?"
+                like_params.append(token)
+            if "since" in params:
+                like_sql += " AND ts >= ?"
+                like_params.append(params["since"])
+            like_times = []
+            for _ in range(max(5, args.repeat // 10)):
+                started = time.perf_counter()
+                plain.execute(like_sql + " ORDER BY ts DESC LIMIT 20", like_params).fetchall()
+                like_times.append((time.perf_counter() - started) * 1000)
+            like_times.sort()
+            p50 = percentile(times, 0.5)
+            like_p50 = percentile(like_times, 0.5)
+            print(f"{label:<42}{len(result['items']):>6}{p50:>10.2f}ms{percentile(times, 0.99):>10.2f}ms"
+                  f"{like_p50:>10.2f}ms{like_p50 / p50:>7.1f}x")
+        print("(FTS5 시간은 일치하는 기록 수에 비례 - 모든 일치 기록의 bm25를 계산한 뒤 상위 20건만 조각 생성)")
+        plain.close()
+        asyncio.run(index.close())
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""정적 파일 응답 벤치마크
+
+index.html을 기존 방식(요청마다 os.path.exists + FileResponse)과
+static_assets.AssetCache(메모리 + 압축본 + ETag) 방식으로 각각 N번 요청하여
+평균 응답 시간과 전송 바이트를 비교한다. 캐시 방식은 ETag 재검증(304)도 측정한다.
+
+실행: python bench/bench_static.py [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from static_assets import AssetCache  # noqa: E402
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.path.join(SCRIPT_DIR, "index.html")
+
+
+async def legacy_index(request):
+    """기존 방식: 요청마다 파일 확인 후 디스크에서 전송"""
+    if os.path.exists(INDEX_PATH):
+        return web.FileResponse(INDEX_PATH)
+    return web.Response(text="index.html not found", status=404)
+
+
+def make_app() -> web.Application:
+    cache = AssetCache()
+    cache.add("index.html", INDEX_PATH)
+    app = web.Application()
+    app.router.add_get("/legacy", legacy_index)
+    app.router.add_get("/cached", lambda request: cache.response(request, "index.html"))
+    return app
+
+
+async def measure(client: TestClient, path: str, count: int, headers: dict) -> tuple:
+    """평균 응답 시간(ms)과 요청당 전송 바이트"""
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        async with client.get(path, headers=headers, auto_decompress=False) as resp:
+            body = await resp.read()
+            total_bytes += len(body)
+    elapsed = time.perf_counter() - start
+    return elapsed / count * 1000, total_bytes / count
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="정적 파일 응답 벤치마크")
+    parser.add_argument("--requests", type=int, default=200, help="경우별 요청 수")
+    args = parser.parse_args()
+
+    accept = {"Accept-Encoding": "gzip, deflate, br"}
+    async with TestClient(TestServer(make_app())) as client:
+        async with client.get("/cached", headers=accept, auto_decompress=False) as resp:
+            etag = resp.headers.get("ETag")
+
+        cases = [
+            ("기존 FileResponse", "/legacy", accept),
+            ("메모리 캐시 (압축)", "/cached", accept),
+            ("메모리 캐시 (304 재검증)", "/cached", {**accept, "If-None-Match": etag}),
+        ]
+        print(f"index.html {os.path.getsize(INDEX_PATH):,} 바이트, 경우별 {args.requests}회 요청")
+        print(f"{'방식':<24}{'평균 응답':>12}{'요청당 전송':>14}")
+        for label, path, headers in cases:
+            latency, size = await measure(client, path, args.requests, headers)
+            print(f"{label:<24}{latency:>10.3f}ms{size:>12,.0f}B")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""벤치마크용 가짜 Claude CLI
+
+실제 Claude 호출(과금) 없이 서버를 측정하기 위해, Claude CLI와 같은 명령줄
+(`--output-format stream-json --verbose ... -p -`)을 받아 stdin의 프롬프트를 읽고
+stream-json 이벤트를 출력한다. bench_e2e.py가 PATH 앞쪽에 `claude` 실행 파일로
+연결해 둔다.
+
+시나리오 (환경 변수 FAKE_CLAUDE_SCENARIO 또는 프롬프트 안의 `[scenario:이름]`):
+- text: 긴 텍스트 응답 (--include-partial-messages면 text_delta로 나누어 출력)
+- tools: 도구 호출이 많은 턴 (Read/Grep/Edit/Bash/TodoWrite 반복 후 짧은 답변)
+- error: API 오류 (is_error result, exit code 1)
+- session_error: -r(재개)로 실행되면 stderr에 세션 에러를 쓰고 종료 → 서버가 새 세션으로 재시도
+- mixed: 프롬프트 해시로 text/tools 중 하나 선택
+- background: Bash 도구가 백그라운드 프로세스(300초 sleep)를 남기고 CPU를 잠시 쓴 뒤 답변
+  (서버가 요청 후 프로세스 트리 전체를 종료하는지, CPU/RSS 측정 확인용)
+
+FAKE_CLAUDE_TRANSCRIPT에 녹화된 stream-json(.jsonl) 파일을 지정하면 시나리오 대신
+그 내용을 한 줄씩 다시 출력한다.
+
+속도: FAKE_CLAUDE_SPEED (1 = 실제와 비슷한 지연, 0 = 지연 없음, 2 = 두 배 느리게)
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import uuid
+
+SPEED = float(os.environ.get("FAKE_CLAUDE_SPEED", "1"))
+SCENARIO = os.environ.get("FAKE_CLAUDE_SCENARIO", "mixed")
+TRANSCRIPT = os.environ.get("FAKE_CLAUDE_TRANSCRIPT", "")
+TOOL_CALLS = int(os.environ.get("FAKE_CLAUDE_TOOLS", "12"))  # tools 시나리오의 도구 호출 수
+TEXT_CHARS = int(os.environ.get("FAKE_CLAUDE_TEXT_CHARS", "4000"))  # text 시나리오의 응답 길이
+
+# 실제 CLI와 비슷한 지연 (초, SPEED 배)
+STARTUP_DELAY = 0.5  # Node 시작 후 stdin을 읽기까지
+INIT_DELAY = 0.3  # system/init 후 첫 응답까지
+TOOL_DELAY = 0.15  # 도구 호출 하나
+TEXT_CHUNK = 24  # text_delta 하나의 글자 수
+TEXT_CHUNK_DELAY = 0.02  # text_delta 간격
+LINE_DELAY = 0.05  # 녹화 파일 재생 시 줄 간격
+
+WORDS = ("서버", "요청", "응답", "세션", "큐", "클라이언트", "스트림", "이벤트", "지연", "처리량",
+         "the", "queue", "worker", "latency", "stream", "frame", "batch", "tool", "result", "session")
+
+
+def sleep(seconds: float):
+    if SPEED > 0:
+        time.sleep(seconds * SPEED)
+
+
+def emit(event: dict):
+    sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def session_id_from_args(argv: list) -> str:
+    for flag in ("-r", "--session-id"):
+        if flag in argv:
+            index = argv.index(flag)
+            if index + 1 < len(argv):
+                return argv[index + 1]
+    return str(uuid.uuid4())
+
+
+def make_text(seed: str, length: int) -> str:
+    """프롬프트에 따라 결정되는 마크다운 텍스트"""
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    parts = ["## 결과\n\n"]
+    i = 0
+    while sum(len(p) for p in parts) < length:
+        word = WORDS[digest[i % len(digest)] % len(WORDS)]
+        parts.append(word)
+        i += 1
+        if i % 12 == 0:
+            parts.append(".\n\n" if i % 48 == 0 else ". ")
+        else:
+            parts.append(" ")
+    return "".join(parts)[:length]
+
+
+def emit_text(text: str, partial: bool):
+    """응답 텍스트 출력 (partial이면 text_delta로 나누어 출력 후 assistant 메시지)"""
+    if partial:
+        emit({"type": "stream_event", "event": {"type": "content_block_start", "index": 0,
+                                                "content_block": {"type": "text", "text": ""}}})
+        for start in range(0, len(text), TEXT_CHUNK):
+            emit({"type": "stream_event", "event": {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": text[start:start + TEXT_CHUNK]}
+            }})
+            sleep(TEXT_CHUNK_DELAY)
+    else:
+        sleep(TEXT_CHUNK_DELAY * len(text) / TEXT_CHUNK)
+    emit({"type": "assistant", "message": {"content": [{"type": "text", "text": text}]}})
+
+
+def tool_call(index: int) -> tuple:
+    """index번째 도구 호출의 (이름, 입력, 결과)"""
+    path = f"/work/project/module_{index % 7}.py"
+    calls = (
+        ("Read", {"file_path": path}, {"file": {"filePath": path, "numLines": 120 + index}}),
+        ("Grep", {"pattern": f"def handler_{index}"}, {"mode": "files_with_matches", "numFiles": 3}),
+        ("Edit", {"file_path": path, "old_string": "x = 1\n" * 20, "new_string": "x = 2\n" * 20}, {}),
+        ("Bash", {"command": f"python -m pytest -q tests/test_{index}.py"}, {"stdout": "1 passed"}),
+        ("TodoWrite", {"todos": [{"content": f"작업 {n}", "status": "pending"} for n in range(5)]}, {}),
+    )
+    return calls[index % len(calls)]
+
+
+def emit_result(session_id: str, started: float, turns: int, text: str, is_error: bool = False):
+    emit({
+        "type": "result",
+        "subtype": "error_during_execution" if is_error else "success",
+        "is_error": is_error,
+        "num_turns": turns,
+        "duration_ms": int((time.time() - started) * 1000),
+        "total_cost_usd": 0.0 if is_error else 0.0123,
+        "usage": {"input_tokens": 1200, "output_tokens": len(text) // 4,
+                  "cache_read_input_tokens": 15000},
+        "result": text,
+        "session_id": session_id
+    })
+
+
+def replay(path: str):
+    """녹화된 stream-json 파일을 한 줄씩 다시 출력"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                sys.stdout.write(line + "\n")
+                sys.stdout.flush()
+                sleep(LINE_DELAY)
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    if "--version" in argv:
+        print("0.0.0 (fake claude for benchmarks)")
+        return 0
+
+    sleep(STARTUP_DELAY)
+    prompt = sys.stdin.read()
+    started = time.time()
+    partial = "--include-partial-messages" in argv
+    session_id = session_id_from_args(argv)
+
+    if TRANSCRIPT:
+        replay(TRANSCRIPT)
+        return 0
+
+    match = re.search(r"\[scenario:(\w+)\]", prompt)
+    scenario = match.group(1) if match else SCENARIO
+    if scenario == "mixed":
+        scenario = ("text", "tools")[hashlib.sha256(prompt.encode("utf-8")).digest()[0] % 2]
+
+    if scenario == "session_error" and "-r" in argv:
+        sys.stderr.write(f"Error: invalid session state for {session_id}\n")
+        sys.stderr.flush()
+        return 1
+
+    emit({"type": "system", "subtype": "init", "model": "fake-model", "session_id": session_id,
+          "tools": ["Read", "Grep", "Edit", "Bash", "TodoWrite"]})
+    sleep(INIT_DELAY)
+
+    if scenario == "error":
+        text = "API Error: 529 {\"type\":\"error\",\"error\":{\"type\":\"overloaded_error\"}}"
+        emit({"type": "assistant", "message": {"content": [{"type": "text", "text": text}]}})
+        emit_result(session_id, started, 1, text, is_error=True)
+        return 1
+
+    turns = 1
+    if scenario == "background":
+        emit({"type": "assistant", "message": {"content": [
+            {"type": "tool_use", "id": "toolu_bg", "name": "Bash", "input": {"command": "sleep 300 &"}}
+        ]}})
+        subprocess.Popen([sys.executable, "-c", "import time; time.sleep(300)"],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        busy_until = time.process_time() + 0.3
+        while time.process_time() < busy_until:
+            pass
+        emit({"type": "user", "message": {"content": [
+            {"type": "tool_result", "tool_use_id": "toolu_bg", "content": ""}
+        ]}, "tool_use_result": {"stdout": "", "stderr": ""}})
+        turns += 1
+        text = make_text(prompt, 300)
+    elif scenario == "tools":
+        for index in range(TOOL_CALLS):
+            name, tool_input, tool_result = tool_call(index)
+            tool_id = f"toolu_{index:04d}"
+            emit({"type": "assistant", "message": {"content": [
+                {"type": "tool_use", "id": tool_id, "name": name, "input": tool_input}
+            ]}})
+            sleep(TOOL_DELAY)
+            emit({"type": "user", "message": {"content": [
+                {"type": "tool_result", "tool_use_id": tool_id, "content": "ok"}
+            ]}, "tool_use_result": tool_result})
+            turns += 1
+        text = make_text(prompt, 300)
+    else:
+        text = make_text(prompt, TEXT_CHARS)
+
+    emit_text(text, partial)
+    emit_result(session_id, started, turns, text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""WebSocket 클라이언트 무리(swarm) - /ws 부하 생성
+
+N개의 클라이언트가 방(room)에 나뉘어 접속하고, 각 클라이언트는 메시지를 보낸 뒤
+그 요청의 Claude 응답이 끝나면 다음 메시지를 보낸다 (클라이언트별 closed loop).
+
+같은 방의 요청은 서버에서 순서대로 처리되므로 방별 FIFO로 요청과 응답을 짝짓는다.
+묶음 처리(--batch) 응답은 reply_to의 요청 수만큼 앞에서부터 함께 짝짓는다.
+같은 방의 클라이언트는 같은 브로드캐스트를 받으므로 seq 기준으로 한 번만 반영하여
+다음을 기록한다.
+- 첫 진행 상황: 전송부터 progress_type "start" 수신까지 (큐 대기 + 워커 시작)
+- 종단 간: 전송부터 Claude 최종 메시지(message / message_end) 수신까지
+
+단독 실행: python bench/swarm.py --url ws://localhost:8765/ws --clients 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import aiohttp
+
+
+def percentile(values: list, pct: float):
+    """정렬된 값의 백분위수 (nearest-rank), 값이 없으면 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(values: list) -> dict:
+    """지연 시간 목록(초)의 ms 단위 요약"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "avg_ms": round(sum(values) / len(values) * 1000, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p90_ms": round(percentile(values, 90) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+class PendingRequest:
+    """전송한 요청 하나 (방별 FIFO에서 응답과 짝지음)"""
+
+    def __init__(self, sent_at: float):
+        self.sent_at = sent_at
+        self.first_progress_at = None
+        self.done = asyncio.get_event_loop().create_future()
+
+
+class Swarm:
+    """클라이언트 무리 실행 및 지표 수집"""
+
+    def __init__(self, url: str, clients: int, rooms: int, messages: int,
+                 scenario: str = "", timeout: float = 120):
+        self.url = url
+        self.clients = clients
+        self.rooms = max(1, min(rooms or clients, clients))
+        self.messages = messages
+        self.scenario = scenario
+        self.timeout = timeout
+        self.pending = {}  # 방 -> deque(PendingRequest)
+        self.last_seq = {}  # 방 -> 반영한 마지막 브로드캐스트 seq
+        self.first_progress = []
+        self.end_to_end = []
+        self.failed = 0
+        self.timeouts = 0
+        self.frames = 0
+        self.frame_bytes = 0
+
+    def room_of(self, index: int) -> str:
+        return f"bench{index % self.rooms}"
+
+    def observe(self, room: str, data: dict):
+        """받은 브로드캐스트 프레임으로 방의 맨 앞 요청 갱신 (같은 seq는 한 번만)"""
+        seq = data.get("seq")
+        if seq is None or seq <= self.last_seq.get(room, 0):
+            return
+        self.last_seq[room] = seq
+        queue = self.pending.get(room)
+        if not queue:
+            return
+        head = queue[0]
+        msg_type = data.get("type")
+        now = time.perf_counter()
+
+        if msg_type == "progress":
+            events = [data]
+        elif msg_type == "progress_batch":
+            events = data.get("events", [])
+        else:
+            events = []
+        for event in events:
+            progress_type = event.get("progress_type")
+            if progress_type == "start":
+                for request in list(queue)[:len(event.get("reply_to") or (head,))]:
+                    if request.first_progress_at is None:
+                        request.first_progress_at = now
+            elif progress_type == "error":
+                self.finish(room, now, ok=False)
+                return
+
+        final = (msg_type == "message" and data.get("username") == "Claude") or \
+                (msg_type == "message_end" and data.get("message"))
+        if final:
+            for _ in range(min(len(queue), len(data.get("reply_to") or (head,)))):
+                self.finish(room, now, ok=True)
+
+    def finish(self, room: str, now: float, ok: bool):
+        queue = self.pending[room]
+        request = queue.popleft()
+        if request.first_progress_at is not None:
+            self.first_progress.append(request.first_progress_at - request.sent_at)
+        if ok:
+            self.end_to_end.append(now - request.sent_at)
+        else:
+            self.failed += 1
+        if not request.done.done():
+            request.done.set_result(ok)
+
+    async def client(self, session: aiohttp.ClientSession, index: int, ready: asyncio.Event,
+                     connected: list):
+        room = self.room_of(index)
+        ws = await session.ws_connect(f"{self.url}?room={room}", heartbeat=30, max_msg_size=0)
+        connected.append(index)
+
+        async def reader():
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                self.frames += 1
+                self.frame_bytes += len(msg.data)
+                self.observe(room, json.loads(msg.data))
+
+        read_task = asyncio.ensure_future(reader())
+        try:
+            await ready.wait()
+            for n in range(self.messages):
+                text = f"벤치마크 메시지 {index}-{n}"
+                if self.scenario:
+                    text += f" [scenario:{self.scenario}]"
+                request = PendingRequest(time.perf_counter())
+                self.pending.setdefault(room, deque()).append(request)
+                await ws.send_str(json.dumps({"type": "message", "username": f"bench{index}", "message": text}))
+                try:
+                    await asyncio.wait_for(asyncio.shield(request.done), self.timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    break
+        finally:
+            await ws.close()
+            read_task.cancel()
+
+    async def run(self) -> dict:
+        """모든 클라이언트 접속 후 동시에 전송 시작, 결과 요약 반환"""
+        ready = asyncio.Event()
+        connected = []
+        async with aiohttp.ClientSession() as session:
+            tasks = [asyncio.ensure_future(self.client(session, i, ready, connected))
+                     for i in range(self.clients)]
+            while len(connected) < self.clients and not any(task.done() for task in tasks):
+                await asyncio.sleep(0.01)
+            started = time.perf_counter()
+            ready.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            elapsed = time.perf_counter() - started
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        for error in errors[:3]:
+            print(f"[swarm] 클라이언트 오류: {type(error).__name__}: {error}")
+        completed = len(self.end_to_end)
+        return {
+            "clients": self.clients,
+            "rooms": self.rooms,
+            "messages_per_client": self.messages,
+            "elapsed_s": round(elapsed, 2),
+            "completed": completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "client_errors": len(errors),
+            "requests_per_s": round(completed / elapsed, 2) if elapsed else 0,
+            "frames": self.frames,
+            "frames_per_s": round(self.frames / elapsed, 1) if elapsed else 0,
+            "frame_bytes": self.frame_bytes,
+            "first_progress": latency_summary(self.first_progress),
+            "end_to_end": latency_summary(self.end_to_end),
+        }
+
+
+def print_report(result: dict):
+    """swarm 결과 출력"""
+    print(f"클라이언트 {result['clients']}개, 방 {result['rooms']}개, 클라이언트당 {result['messages_per_client']}건")
+    print(f"완료 {result['completed']}건, 실패 {result['failed']}건, 타임아웃 {result['timeouts']}건 "
+          f"({result['elapsed_s']}초, {result['requests_per_s']} req/s)")
+    print(f"수신 프레임 {result['frames']:,}개 ({result['frames_per_s']:,} fps, {result['frame_bytes']:,} 바이트)")
+    for key, label in (("first_progress", "전송 → 첫 진행 상황"), ("end_to_end", "전송 → 최종 응답")):
+        summary = result[key]
+        if summary["count"]:
+            print(f"{label:<16} p50 {summary['p50_ms']:>9.1f}ms  p90 {summary['p90_ms']:>9.1f}ms  "
+                  f"p99 {summary['p99_ms']:>9.1f}ms  max {summary['max_ms']:>9.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="WebSocket 클라이언트 swarm")
+    parser.add_argument("--url", default="ws://localhost:8765/ws", help="서버 WebSocket 주소")
+    parser.add_argument("--clients", type=int, default=10, help="클라이언트 수")
+    parser.add_argument("--rooms", type=int, default=0, help="방 수 (0이면 클라이언트마다 별도 방)")
+    parser.add_argument("--messages", type=int, default=3, help="클라이언트당 메시지 수")
+    parser.add_argument("--scenario", default="", help="가짜 CLI 시나리오 (text/tools/error/session_error/mixed)")
+    parser.add_argument("--timeout", type=float, default=120, help="요청당 최대 대기 시간 (초)")
+    args = parser.parse_args()
+    swarm = Swarm(args.url, args.clients, args.rooms, args.messages, args.scenario, args.timeout)
+    print_report(await swarm.run())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,244 @@
+"""Edit/Write 본문 blob 저장소 (내용 주소 + 크기 제한 LRU, 메모리 → 디스크)
+
+Edit/Write 도구의 전체 본문(old/new/content)을 진행 상황 프레임에 그대로 넣으면
+카드를 펼치지 않는 클라이언트까지 모두 받아야 하므로, 본문은 내용 해시를 키로
+여기에 한 번만 저장하고 프레임에는 해시, 크기, 짧은 미리보기만 넣는다.
+클라이언트는 카드를 펼칠 때만 `/blob/{hash}` 또는 `/blob/{old}/diff/{new}`로
+전체 본문이나 unified diff를 받는다.
+
+- 메모리: 최근 사용 순(LRU)으로 BLOB_MEMORY_LIMIT까지 보관, 넘치면 오래된 것부터 디스크로 이동
+- 디스크: 파일 이름이 해시인 파일, BLOB_DISK_LIMIT을 넘으면 오래된 것부터 삭제
+  (같은 디렉토리를 쓰는 무중단 재시작 후에도 이전 프레임의 본문을 받을 수 있음)
+- 응답: 내용이 바뀌지 않으므로 해시를 ETag로 쓰고 immutable 캐시, gzip 압축
+- diff: 계산은 스레드에서 (이벤트 루프를 막지 않음), 두 본문 합이 BLOB_DIFF_MAX_SIZE를 넘으면 계산하지 않음
+"""
+import asyncio
+import difflib
+import gzip
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+from aiohttp import web
+
+from log_pipeline import get_logger
+from static_assets import etag_matches
+
+log = get_logger("blob")
+
+# 설정
+BLOB_MEMORY_LIMIT = 32 * 1024 * 1024  # 메모리에 보관할 최대 크기 (바이트)
+BLOB_DISK_LIMIT = 256 * 1024 * 1024  # 디스크에 보관할 최대 크기 (바이트, 0이면 디스크 사용 안 함)
+BLOB_MIN_COMPRESS_SIZE = 512  # 이보다 작은 응답은 압축하지 않음 (바이트)
+BLOB_DIFF_CACHE_SIZE = 64  # 계산한 diff를 보관할 개수
+BLOB_DIFF_MAX_SIZE = 2 * 1024 * 1024  # diff를 계산할 두 본문 크기 합의 최대값 (바이트, 넘으면 413)
+BLOB_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+HASH_LENGTH = 32  # 해시 앞 32자 (128비트)
+HASH_PATTERN = re.compile(r"^[0-9a-f]{%d}$" % HASH_LENGTH)
+
+
+def unified_diff(old: bytes, new: bytes, name: str = "") -> bytes:
+    """두 본문(UTF-8 바이트)의 unified diff 바이트 (스레드에서 호출)"""
+    lines = difflib.unified_diff(
+        old.decode("utf-8").splitlines(keepends=True),
+        new.decode("utf-8").splitlines(keepends=True),
+        fromfile=f"a/{name.lstrip('/')}" if name else "a", tofile=f"b/{name.lstrip('/')}" if name else "b"
+    )
+    # 마지막 줄에 줄바꿈이 없는 경우도 한 줄씩 구분되도록
+    return "".join(line if line.endswith("\n") else line + "\n" for line in lines).encode("utf-8")
+
+
+class BlobStore:
+    """내용 해시 -> 본문(UTF-8 바이트) 저장소
+
+    stats: 저장 수, 중복 저장 수, 메모리/디스크 적중, 없음, 디스크 이동, 삭제
+    """
+
+    def __init__(self, directory: str = None, memory_limit: int = BLOB_MEMORY_LIMIT,
+                 disk_limit: int = BLOB_DISK_LIMIT):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()  # 해시 -> 바이트 (오래된 것부터)
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # 해시 -> 크기 (오래된 것부터)
+        self.disk_bytes = 0
+        self.diffs = OrderedDict()  # (이전 해시, 이후 해시) -> diff 바이트
+        self.stats = {"puts": 0, "dedup": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "spilled": 0, "evicted": 0}
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self.directory is not None and self.disk_limit > 0
+
+    def load_index(self):
+        """디스크 디렉토리의 기존 blob 목록 읽기 (수정 시각 순, 한도를 넘으면 오래된 것 삭제)"""
+        if not self.disk_enabled or not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if not HASH_PATTERN.match(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self.disk[name] = size
+            self.disk_bytes += size
+        self._trim_disk()
+        if self.disk:
+            log.info(f"[blob] 디스크 {len(self.disk)}개 ({self.disk_bytes:,} 바이트, {self.directory})")
+
+    # --------------------------------------------------------
+    # 저장/조회
+    # --------------------------------------------------------
+
+    def put(self, text: str) -> dict:
+        """본문 저장 후 {"hash", "size"} 반환 (같은 내용은 한 번만 저장)"""
+        body = text.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.stats["puts"] += 1
+        if digest in self.memory:
+            self.memory.move_to_end(digest)
+            self.stats["dedup"] += 1
+        elif digest in self.disk:
+            self.stats["dedup"] += 1
+        else:
+            self.memory[digest] = body
+            self.memory_bytes += len(body)
+            self._trim_memory()
+        return {"hash": digest, "size": len(body)}
+
+    def get(self, digest: str):
+        """본문 바이트 (없으면 None), 디스크에서 읽은 것은 다시 메모리로"""
+        body = self.memory.get(digest)
+        if body is not None:
+            self.memory.move_to_end(digest)
+            self.stats["memory_hits"] += 1
+            return body
+        if digest in self.disk:
+            try:
+                with open(self._path(digest), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._forget_disk(digest)
+            else:
+                self.stats["disk_hits"] += 1
+                self.memory[digest] = body
+                self.memory_bytes += len(body)
+                self._trim_memory()
+                return body
+        self.stats["misses"] += 1
+        return None
+
+    def size(self, digest: str):
+        """본문 크기 (바이트, 없으면 None)"""
+        body = self.memory.get(digest)
+        if body is not None:
+            return len(body)
+        return self.disk.get(digest)
+
+    async def diff(self, old_digest: str, new_digest: str, name: str = ""):
+        """두 본문의 unified diff 바이트 (둘 중 하나라도 없으면 None, 계산은 스레드에서)
+
+        두 본문 크기 합이 BLOB_DIFF_MAX_SIZE를 넘는지는 호출하는 쪽에서 size()로 먼저 확인한다.
+        """
+        key = (old_digest, new_digest)
+        cached = self.diffs.get(key)
+        if cached is not None:
+            self.diffs.move_to_end(key)
+            return cached
+        old, new = self.get(old_digest), self.get(new_digest)
+        if old is None or new is None:
+            return None
+        result = await asyncio.get_event_loop().run_in_executor(None, unified_diff, old, new, name)
+        self.diffs[key] = result
+        while len(self.diffs) > BLOB_DIFF_CACHE_SIZE:
+            self.diffs.popitem(last=False)
+        return result
+
+    # --------------------------------------------------------
+    # 메모리/디스크 한도
+    # --------------------------------------------------------
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def _trim_memory(self):
+        """메모리 한도를 넘으면 오래된 것부터 디스크로 이동 (디스크를 쓰지 않으면 삭제)"""
+        while self.memory_bytes > self.memory_limit and len(self.memory) > 1:
+            digest, body = self.memory.popitem(last=False)
+            self.memory_bytes -= len(body)
+            if digest in self.disk:
+                continue
+            if self.disk_enabled and self._spill(digest, body):
+                self.stats["spilled"] += 1
+            else:
+                self.stats["evicted"] += 1
+
+    def _spill(self, digest: str, body: bytes) -> bool:
+        """본문을 디스크에 쓰기 (임시 파일 후 이름 변경, 같은 해시는 같은 내용이므로 덮어써도 됨)"""
+        path = self._path(digest)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"[blob] 디스크 쓰기 실패: {e}")
+            return False
+        self.disk[digest] = len(body)
+        self.disk_bytes += len(body)
+        self._trim_disk()
+        return True
+
+    def _trim_disk(self):
+        while self.disk_bytes > self.disk_limit and self.disk:
+            digest = next(iter(self.disk))
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+            self._forget_disk(digest)
+            self.stats["evicted"] += 1
+
+    def _forget_disk(self, digest: str):
+        size = self.disk.pop(digest, None)
+        if size is not None:
+            self.disk_bytes -= size
+
+    # --------------------------------------------------------
+    # HTTP 응답
+    # --------------------------------------------------------
+
+    def response(self, request, body, etag: str, content_type: str = "text/plain"):
+        """본문 응답 (없으면 404, ETag 일치 시 304, gzip 압축)"""
+        if body is None:
+            return web.Response(text="blob not found", status=404, headers={"Cache-Control": "no-store"})
+        accepted = {part.split(";")[0].strip().lower()
+                    for part in request.headers.get("Accept-Encoding", "").split(",")}
+        encoding = "gzip" if "gzip" in accepted and len(body) >= BLOB_MIN_COMPRESS_SIZE else "identity"
+        etag = f'"{etag}"' if encoding == "identity" else f'"{etag}-gzip"'
+        headers = {"ETag": etag, "Cache-Control": BLOB_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("If-None-Match", ""), {etag}):
+            return web.Response(status=304, headers=headers)
+        if encoding == "gzip":
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, headers=headers, content_type=content_type, charset="utf-8")
+
+    def summary(self) -> dict:
+        """/usage 엔드포인트용 저장소 상태"""
+        return {
+            "memory": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+            "disk": len(self.disk),
+            "disk_bytes": self.disk_bytes,
+            "directory": self.directory if self.disk_enabled else None,
+            **self.stats
+        }
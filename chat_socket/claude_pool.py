@@ -0,0 +1,169 @@
+"""Claude CLI 예열(warm) 프로세스 풀
+
+Claude CLI는 요청마다 Node 시작 비용을 치른 뒤에야 첫 출력을 낸다.
+`-p -` 모드는 stdin이 닫힐 때까지 프롬프트를 기다리므로, 다음 요청에 쓰일
+명령줄(세션 ID/재개 여부 포함)로 프로세스를 미리 띄워 두었다가 요청이 오면
+프롬프트만 써 넣는다. 명령줄이 정확히 일치하는 프로세스만 재사용한다.
+
+첫 이벤트까지 걸린 시간을 cold/warm으로 나누어 기록하여 효과를 확인할 수 있다.
+프로세스는 예열 여부와 관계없이 새 세션(프로세스 그룹)으로 시작하고 자원 한도를
+건 뒤 대기시키며, 종료할 때는 자손까지 모두 종료한다 (process_tree.py).
+요청이 오지 않아도 TTL이 지난 예열 프로세스는 정리 태스크가 주기적으로 종료한다.
+"""
+import asyncio
+from collections import OrderedDict, deque
+
+from log_pipeline import get_logger
+from process_tree import kill_tree, spawn_options
+
+log = get_logger("pool")
+
+# 설정
+WARM_POOL_SIZE = 2  # 대기시킬 예열 프로세스 최대 수 (0이면 사용 안 함)
+WARM_PROCESS_TTL = 600  # 예열 프로세스 최대 대기 시간 (초, 초과 시 종료)
+WARM_REAP_INTERVAL = 30  # 만료/종료된 예열 프로세스 정리 주기 (초)
+STARTUP_SAMPLES = 100  # 첫 이벤트 시간 통계에 보관할 표본 수
+
+
+async def spawn_claude(cmd: list, limit: int, limits=None):
+    """Claude CLI 서브프로세스를 새 세션으로 시작 (stdin/stdout/stderr 파이프, limits: ResourceLimits)"""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=limit,
+        **spawn_options()
+    )
+    if limits is not None:
+        limits.apply(process.pid)
+    return process
+
+
+async def kill_process(process):
+    """프로세스와 자손 종료 후 회수"""
+    kill_tree(process)
+    try:
+        await asyncio.wait_for(process.wait(), timeout=5)
+    except (asyncio.TimeoutError, Exception):
+        pass
+
+
+class WarmPool:
+    """명령줄별 예열 프로세스 풀
+
+    - prewarm(cmd): 해당 명령줄의 프로세스를 백그라운드에서 미리 시작
+    - acquire(cmd): 일치하는 예열 프로세스를 꺼냄 (없거나 종료되었으면 None)
+    - record_startup(warm, seconds): 첫 이벤트까지 걸린 시간 기록
+    - start()/close(): 만료된 예열 프로세스 정리 태스크 시작/중지 (close는 모든 예열 프로세스 종료)
+    """
+
+    def __init__(self, size: int = WARM_POOL_SIZE, limit: int = 2 ** 16, ttl: float = WARM_PROCESS_TTL,
+                 limits=None):
+        self.size = size
+        self.limit = limit
+        self.ttl = ttl
+        self.limits = limits  # 프로세스 자원 한도 (process_tree.ResourceLimits)
+        self.idle = OrderedDict()  # 명령줄(tuple) -> (process, 시작 시각)
+        self.startup = {"cold": deque(maxlen=STARTUP_SAMPLES), "warm": deque(maxlen=STARTUP_SAMPLES)}
+        self.hits = 0
+        self.misses = 0
+        self.reaped = 0
+        self._spawning = set()
+        self._reaper = None
+
+    def acquire(self, cmd: list):
+        """명령줄이 일치하는 예열 프로세스 꺼내기"""
+        if self.size <= 0:
+            return None
+        key = tuple(cmd)
+        entry = self.idle.pop(key, None)
+        if entry is not None:
+            process, spawned_at = entry
+            loop = asyncio.get_event_loop()
+            if process.returncode is None and loop.time() - spawned_at < self.ttl:
+                self.hits += 1
+                return process
+            asyncio.ensure_future(kill_process(process))
+        self.misses += 1
+        return None
+
+    def prewarm(self, cmd: list):
+        """해당 명령줄의 예열 프로세스를 백그라운드에서 시작 (이미 있으면 무시)"""
+        if self.size <= 0:
+            return
+        key = tuple(cmd)
+        if key in self.idle or key in self._spawning:
+            return
+        self._spawning.add(key)
+        asyncio.ensure_future(self._spawn(key))
+
+    async def _spawn(self, key: tuple):
+        try:
+            process = await spawn_claude(list(key), self.limit, self.limits)
+        except Exception as e:
+            log.warning(f"[예열] 프로세스 시작 실패: {e}")
+            return
+        finally:
+            self._spawning.discard(key)
+
+        loop = asyncio.get_event_loop()
+        self.idle[key] = (process, loop.time())
+        # 한도를 넘으면 가장 오래된 예열 프로세스 종료
+        while len(self.idle) > self.size:
+            _, (old_process, _) = self.idle.popitem(last=False)
+            await kill_process(old_process)
+
+    def start(self):
+        """만료된 예열 프로세스 정리 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self._reaper is None:
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(min(WARM_REAP_INTERVAL, self.ttl))
+            await self.reap()
+
+    async def reap(self) -> int:
+        """TTL이 지났거나 이미 종료된 예열 프로세스 정리 (정리한 수)"""
+        now = asyncio.get_event_loop().time()
+        expired = [key for key, (process, spawned_at) in self.idle.items()
+                   if process.returncode is not None or now - spawned_at >= self.ttl]
+        processes = [self.idle.pop(key)[0] for key in expired]
+        if processes:
+            self.reaped += len(processes)
+            log.info(f"[예열] 만료된 프로세스 {len(processes)}개 종료")
+            await asyncio.gather(*(kill_process(process) for process in processes))
+        return len(processes)
+
+    def discard(self, predicate):
+        """조건에 맞는 예열 프로세스 종료 (세션 리셋 등으로 더 이상 쓰이지 않을 때)"""
+        for key in [key for key in self.idle if predicate(key)]:
+            process, _ = self.idle.pop(key)
+            asyncio.ensure_future(kill_process(process))
+
+    def record_startup(self, warm: bool, seconds: float):
+        """요청 시작부터 첫 이벤트까지 걸린 시간 기록"""
+        self.startup["warm" if warm else "cold"].append(seconds)
+
+    def summary(self) -> dict:
+        """예열 풀 상태와 첫 이벤트 시간 통계"""
+        result = {"size": self.size, "idle": len(self.idle), "hits": self.hits, "misses": self.misses,
+                  "reaped": self.reaped}
+        for kind, samples in self.startup.items():
+            if samples:
+                ordered = sorted(samples)
+                result[f"{kind}_first_event_avg_ms"] = round(sum(ordered) / len(ordered) * 1000, 1)
+                result[f"{kind}_first_event_p50_ms"] = round(ordered[len(ordered) // 2] * 1000, 1)
+                result[f"{kind}_samples"] = len(ordered)
+        return result
+
+    async def close(self):
+        """정리 태스크 중지 후 모든 예열 프로세스 종료"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        processes = [process for process, _ in self.idle.values()]
+        self.idle.clear()
+        await asyncio.gather(*(kill_process(process) for process in processes))
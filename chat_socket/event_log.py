@@ -0,0 +1,51 @@
+"""브로드캐스트 이벤트 로그 (재연결 시 놓친 프레임 재전송)
+
+모든 브로드캐스트에 단조 증가하는 순번(seq)을 붙이고, 인코딩된 프레임을
+크기가 제한된 링 버퍼에 보관한다. 다시 연결한 클라이언트가 마지막으로 받은
+seq를 알려 주면 그 이후의 프레임만 다시 보낸다.
+
+server_id는 서버 프로세스마다 달라지므로, 재시작 후에는 이전 seq로
+재개할 수 없음을 클라이언트가 알 수 있다.
+"""
+import uuid
+from collections import deque
+
+from fanout import encode
+
+# 설정
+EVENT_LOG_SIZE = 2000  # 보관할 최근 브로드캐스트 프레임 수
+
+
+class EventLog:
+    """seq가 붙은 최근 브로드캐스트 프레임 링 버퍼"""
+
+    def __init__(self, size: int = EVENT_LOG_SIZE):
+        self.server_id = uuid.uuid4().hex[:12]
+        self.seq = 0  # 마지막으로 부여한 seq
+        self.frames = deque(maxlen=size)  # (seq, room, text)
+
+    def record(self, message: dict, room: str = None) -> str:
+        """메시지에 seq를 붙여 인코딩하고 로그에 보관 (인코딩된 프레임 반환)"""
+        self.seq += 1
+        text = encode({"seq": self.seq, **message})
+        self.frames.append((self.seq, room, text))
+        return text
+
+    def since(self, last_seq: int, room: str = None, until: int = None):
+        """last_seq 이후(until 이하)의 프레임 중 room에 전달된 것
+
+        반환: (프레임 목록, 누락 없이 모두 찾았는지 여부)
+        """
+        if until is None:
+            until = self.seq
+        if last_seq > self.seq or last_seq < 0:
+            # 다른 서버 프로세스의 seq - 재개 불가
+            return [], False
+
+        oldest = self.frames[0][0] if self.frames else self.seq + 1
+        complete = last_seq + 1 >= oldest or last_seq >= until
+        frames = [
+            text for seq, frame_room, text in self.frames
+            if last_seq < seq <= until and (frame_room is None or frame_room == room)
+        ]
+        return frames, complete
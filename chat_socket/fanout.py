@@ -0,0 +1,225 @@
+"""WebSocket 브로드캐스트 팬아웃
+
+클라이언트마다 크기가 제한된 송신 큐와 전용 writer 태스크를 두어,
+느린 클라이언트(모바일/ngrok) 하나가 다른 클라이언트의 전송을 막지 않게 한다.
+
+- 메시지는 브로드캐스트당 한 번만 JSON으로 인코딩한다.
+- 큐가 가득 차면 버려도 되는(droppable) 진행 상황 프레임부터 버린다.
+- 버릴 수 없는 프레임이 한도를 넘거나 전송이 타임아웃되면 클라이언트를 제거한다.
+- 잦은 진행 상황 이벤트는 ProgressBatcher로 묶어 progress_batch 프레임 하나로 보낸다.
+"""
+import asyncio
+import json
+from collections import deque
+
+from log_pipeline import get_logger
+
+log = get_logger("fanout")
+
+# 설정
+FANOUT_QUEUE_SIZE = 256  # 클라이언트별 송신 큐 크기 (초과 시 droppable 프레임부터 버림)
+FANOUT_HARD_LIMIT = 1024  # 버릴 수 없는 프레임이 이 수를 넘으면 클라이언트 제거
+FANOUT_SEND_TIMEOUT = 10  # 프레임 하나 전송 타임아웃 (초, 초과 시 클라이언트 제거)
+PROGRESS_BATCH_WINDOW = 0.075  # 진행 상황 이벤트 묶음 전송 시간 창 (초, 0이면 묶지 않음)
+
+
+def encode(message: dict) -> str:
+    """브로드캐스트 메시지 JSON 인코딩 (클라이언트 수와 관계없이 한 번만)"""
+    return json.dumps(message, ensure_ascii=False)
+
+
+class ClientConnection:
+    """클라이언트 하나의 송신 큐와 writer 태스크"""
+
+    def __init__(self, ws, room: str, on_evict=None, max_queue: int = FANOUT_QUEUE_SIZE,
+                 hard_limit: int = FANOUT_HARD_LIMIT, send_timeout: float = FANOUT_SEND_TIMEOUT):
+        self.ws = ws
+        self.room = room
+        self.on_evict = on_evict
+        self.max_queue = max_queue
+        self.hard_limit = hard_limit
+        self.send_timeout = send_timeout
+        self.queue = deque()  # (text, droppable)
+        self.dropped = 0  # 버린 프레임 수
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """writer 태스크 시작"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._writer())
+
+    def send(self, text: str, droppable: bool = False) -> bool:
+        """송신 큐에 프레임 추가 (기다리지 않음, 버려진 경우 False)"""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.max_queue:
+            # 가장 오래된 droppable 프레임을 버려 자리를 만든다
+            for i, (_, queued_droppable) in enumerate(self.queue):
+                if queued_droppable:
+                    del self.queue[i]
+                    self.dropped += 1
+                    break
+            else:
+                if droppable:
+                    self.dropped += 1
+                    return False
+                if len(self.queue) >= self.hard_limit:
+                    log.warning(f"[팬아웃] 송신 큐 초과 - 클라이언트 제거 (ID: {id(self.ws)})")
+                    self.evict()
+                    return False
+
+        self.queue.append((text, droppable))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self):
+        """큐의 프레임을 순서대로 전송"""
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                text, _ = self.queue.popleft()
+                await asyncio.wait_for(self.ws.send_str(text), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not self.closed:
+                log.warning(f"[팬아웃] 전송 실패 - 클라이언트 제거 (ID: {id(self.ws)}): {type(e).__name__}")
+                self.evict()
+
+    def evict(self):
+        """전송 불가 클라이언트 제거 (연결 종료 후 on_evict 호출)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self._wakeup.set()
+        if self.on_evict:
+            self.on_evict(self)
+        asyncio.ensure_future(self._close_ws())
+
+    async def _close_ws(self):
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        """writer 태스크 정리 (연결 종료 시)"""
+        self.closed = True
+        self.queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+class ClientHub:
+    """연결된 클라이언트 목록과 방(room)별 브로드캐스트"""
+
+    def __init__(self, **connection_options):
+        self.connections = {}  # WebSocket -> ClientConnection
+        self.connection_options = connection_options
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def __contains__(self, ws) -> bool:
+        return ws in self.connections
+
+    def add(self, ws, room: str) -> ClientConnection:
+        """클라이언트 등록 및 writer 시작"""
+        conn = ClientConnection(ws, room, on_evict=self._evicted, **self.connection_options)
+        self.connections[ws] = conn
+        conn.start()
+        return conn
+
+    async def remove(self, ws):
+        """클라이언트 등록 해제"""
+        conn = self.connections.pop(ws, None)
+        if conn is not None:
+            await conn.close()
+
+    def _evicted(self, conn: ClientConnection):
+        self.connections.pop(conn.ws, None)
+
+    def get(self, ws) -> ClientConnection:
+        return self.connections.get(ws)
+
+    def has_room(self, room: str) -> bool:
+        """해당 방에 연결된 클라이언트가 있는지 여부"""
+        return any(conn.room == room for conn in self.connections.values())
+
+    def send_to(self, ws, text: str, droppable: bool = False) -> bool:
+        """특정 클라이언트에게 전송"""
+        conn = self.connections.get(ws)
+        if conn is None:
+            return False
+        return conn.send(text, droppable)
+
+    def broadcast(self, text: str, room: str = None, exclude=None, droppable: bool = False) -> int:
+        """인코딩된 프레임을 클라이언트 큐에 넣기 (전송 완료를 기다리지 않음, 대상 수 반환)"""
+        count = 0
+        for ws, conn in list(self.connections.items()):
+            if ws is exclude:
+                continue
+            if room is not None and conn.room != room:
+                continue
+            if conn.send(text, droppable):
+                count += 1
+        return count
+
+
+class ProgressBatcher:
+    """진행 상황 이벤트를 짧은 시간 창(window) 단위로 묶어 전송
+
+    tool_start/tool_end처럼 잦은 이벤트는 window초 동안 모았다가 한 번에 보내고,
+    immediate 이벤트(start/complete/error 등)는 모인 이벤트와 함께 즉시 보낸다.
+    emit(events)는 이벤트 목록을 받아 프레임을 전송하는 비동기 함수이다.
+    link()로 연결한 두 전송기(진행 상황과 응답 텍스트)는 한쪽에 추가하기 전에 다른 쪽에
+    모인 이벤트를 먼저 보내므로, 프레임이 이벤트가 생긴 순서대로 나간다.
+    """
+
+    def __init__(self, emit, window: float = PROGRESS_BATCH_WINDOW):
+        self.emit = emit
+        self.window = window
+        self.buffer = []
+        self.peer = None  # 전송 순서를 맞출 다른 전송기 (link)
+        self._timer = None
+
+    def link(self, other):
+        """other와 전송 순서를 맞춤 (각자 이전에 연결된 전송기는 해제)"""
+        self.peer, other.peer = other, self
+
+    async def add(self, event, immediate: bool = False):
+        """이벤트 추가 (immediate이거나 window가 0이면 즉시 전송)"""
+        if self.peer is not None and self.peer.buffer:
+            await self.peer.flush()  # 먼저 생긴 다른 종류의 이벤트가 뒤처지지 않도록
+        self.buffer.append(event)
+        if immediate or self.window <= 0:
+            await self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_event_loop()
+            self._timer = loop.call_later(self.window, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """모인 이벤트 전송"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.buffer:
+            return
+        events, self.buffer = self.buffer, []
+        await self.emit(events)
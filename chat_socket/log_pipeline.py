@@ -0,0 +1,157 @@
+"""큐 기반 로그 파이프라인 (이벤트 루프를 막지 않는 로깅)
+
+print()는 콘솔이 느리거나 파이프로 리디렉션되어 버퍼가 가득 차면 쓰기가 끝날
+때까지 이벤트 루프를 멈춘다. 여기서는 표준 logging의 QueueHandler/QueueListener로
+- 호출한 쪽(이벤트 루프)은 레코드를 메모리 큐에 넣기만 하고 (가득 차면 버리고 개수 기록)
+- 백그라운드 스레드가 콘솔/파일에 쓴다.
+
+- 로거: get_logger("claude") -> "chat.claude", 모듈별 레벨 지정 가능 (--log-module claude=DEBUG)
+- 문맥: bind(room=..., request_id=..., session_id=...)로 현재 태스크에 붙인 값을 레코드에 포함
+  (asyncio 태스크마다 contextvars가 복사되므로 다른 요청과 섞이지 않음)
+- 형식: 콘솔은 기존 print와 같은 메시지만, JSON(--log-json)은 시각/레벨/로거/문맥 포함 한 줄 JSON
+- 파일: --log-file 지정 시 크기 기준 순환 (RotatingFileHandler)
+- 통계: 레코드 수, 버린 수, 이벤트 루프 쪽에서 로그 처리에 쓴 시간 (/usage, /metrics)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+# 설정
+LOG_QUEUE_SIZE = 10000  # 쓰기 대기 레코드 최대 수 (넘으면 버림)
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024  # 로그 파일 하나의 최대 크기 (바이트)
+LOG_FILE_BACKUPS = 5  # 보관할 이전 로그 파일 수
+ROOT_LOGGER = "chat"
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+log_context = contextvars.ContextVar("log_context", default={})  # 현재 태스크의 문맥 (room, request_id, ...)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """모듈별 로거 (chat.{name})"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def bind(**fields):
+    """현재 태스크의 로그 문맥에 값 추가 (unbind에 넘길 토큰 반환)"""
+    return log_context.set({**log_context.get(), **fields})
+
+
+def unbind(token):
+    log_context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON (ts, level, logger, msg + 문맥 + 예외)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name[len(ROOT_LOGGER) + 1:] or record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "context", {})
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LoopQueueHandler(logging.handlers.QueueHandler):
+    """레코드를 큐에 넣기만 하는 핸들러 (호출한 쪽에서 쓴 시간과 버린 수 기록)"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.records = 0
+        self.dropped = 0
+        self.emit_seconds = 0.0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 메시지 인자와 예외는 지금 문자열로 만들고 (다른 스레드에서 바뀌지 않도록) 형식 적용은 쓰기 스레드에서
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = log_context.get()
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        started = time.perf_counter()
+        try:
+            self.queue.put_nowait(self.prepare(record))
+            self.records += 1
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+        self.emit_seconds += time.perf_counter() - started
+
+    def summary(self) -> dict:
+        return {
+            "records": self.records,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "emit_ms": round(self.emit_seconds * 1000, 2),
+            "emit_avg_us": round(self.emit_seconds / self.records * 1e6, 2) if self.records else 0
+        }
+
+
+class LogPipeline:
+    """chat.* 로거 설정과 백그라운드 쓰기 스레드"""
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+
+    def setup(self, level: str = "INFO", module_levels: dict = None, json_output: bool = False,
+              file_path: str = None, max_bytes: int = LOG_FILE_MAX_BYTES, backups: int = LOG_FILE_BACKUPS):
+        """로거 설정 후 쓰기 스레드 시작 (module_levels: {"claude": "DEBUG"})"""
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(JsonFormatter() if json_output else logging.Formatter("%(message)s"))
+        handlers = [console]
+        if file_path:
+            rotating = logging.handlers.RotatingFileHandler(
+                file_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            rotating.setFormatter(JsonFormatter() if json_output else logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s %(message)s"))
+            handlers.append(rotating)
+
+        self.handler = LoopQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers[:] = [self.handler]
+        root.setLevel(level.upper())
+        root.propagate = False
+        for name, module_level in (module_levels or {}).items():
+            get_logger(name).setLevel(module_level.upper())
+
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *handlers)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """남은 레코드를 모두 쓰고 쓰기 스레드 종료"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def summary(self) -> dict:
+        return self.handler.summary() if self.handler else {}
+
+
+def parse_module_levels(values: list) -> dict:
+    """["claude=DEBUG", "ws=WARNING"] -> {"claude": "DEBUG", "ws": "WARNING"} (형식이 틀리면 ValueError)"""
+    levels = {}
+    for value in values:
+        name, _, level = value.partition("=")
+        if not name.strip() or level.strip().upper() not in LEVELS:
+            raise ValueError(f"잘못된 모듈 로그 레벨: {value} (예: claude=DEBUG)")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+pipeline = LogPipeline()
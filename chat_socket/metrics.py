@@ -0,0 +1,155 @@
+"""Prometheus 텍스트 형식 지표
+
+외부 라이브러리 없이 카운터/게이지/히스토그램을 제공하고
+/metrics 엔드포인트에서 render()로 출력한다.
+"""
+import bisect
+
+# 기본 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """단조 증가 카운터 (callback 지정 시 다른 모듈이 세는 누적 값을 출력할 때마다 읽음, 레이블 없음)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return
+            yield self.name, "", value
+            return
+        for key, value in self.values.items():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge:
+    """현재 값 게이지 (callback 지정 시 출력할 때마다 값을 읽음)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self):
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return
+        yield self.name, "", value
+
+
+class Histogram:
+    """누적 구간 히스토그램"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # 레이블 -> [구간별 개수..., 합계, 개수]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative
+            yield f"{self.name}_bucket", _format_labels(self.labelnames, key, 'le="+Inf"'), series[-1]
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), series[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), series[-1]
+
+
+class Registry:
+    """지표 모음 (등록 순서대로 출력)"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = (), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus 텍스트 노출 형식 (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 서버 전체에서 사용하는 기본 레지스트리
+registry = Registry()
@@ -0,0 +1,232 @@
+"""Claude CLI 프로세스 트리 관리 (프로세스 세션, 자원 한도, /proc 자원 사용량)
+
+Claude CLI(Node)는 Bash 도구 등으로 자식 프로세스를 띄우므로, CLI 프로세스만
+종료하면 그 자식들이 남아 CPU와 메모리를 계속 쓴다. 그래서
+- 요청마다 새 세션(setsid, 프로세스 그룹 리더)으로 시작하고
+- 중단/타임아웃/서버 종료/정상 종료 시 프로세스 그룹을 종료하며 (측정 중 그룹을 벗어난
+  자손이 보였거나 그룹 종료가 실패했을 때만 /proc 전체에서 같은 세션의 프로세스를 찾아 종료)
+- 선택적으로 메모리(RLIMIT_DATA), CPU 시간(RLIMIT_CPU), 열린 파일 수(RLIMIT_NOFILE)
+  한도를 건다 (Linux prlimit, 이후 자식 프로세스도 상속)
+- /proc에서 트리 전체의 CPU 시간과 최대 RSS를 주기적으로 측정한다.
+
+Windows에서는 프로세스 그룹/한도/측정 없이 CLI 프로세스만 종료한다.
+"""
+import os
+import signal
+
+from log_pipeline import get_logger
+
+log = get_logger("process")
+
+try:
+    import resource  # POSIX 전용 (prlimit은 Linux)
+except ImportError:
+    resource = None
+
+# 설정
+PROC_SAMPLE_INTERVAL = 0.5  # /proc 자원 사용량 측정 간격 (초)
+
+POSIX = os.name == "posix"
+HAS_PROC = os.path.isdir("/proc/self/task")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if POSIX else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if POSIX else 4096
+
+
+def spawn_options() -> dict:
+    """create_subprocess_exec 추가 인자 (POSIX: 새 세션 = 새 프로세스 그룹)"""
+    return {"start_new_session": True} if POSIX else {}
+
+
+class ResourceLimits:
+    """Claude CLI 프로세스에 걸 자원 한도 (0이면 걸지 않음)"""
+
+    def __init__(self, memory_mb: int = 0, cpu_seconds: int = 0, open_files: int = 0):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.open_files = open_files
+        self._warned = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.memory_mb or self.cpu_seconds or self.open_files)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.memory_mb * 1024 * 1024
+
+    def apply(self, pid: int):
+        """실행 중인 프로세스에 한도 적용 (이후 생기는 자식 프로세스도 상속)
+
+        preexec_fn은 스레드(저널 기록 등)가 있는 프로세스에서 안전하지 않으므로
+        시작 직후 prlimit으로 건다.
+        """
+        if not self.enabled:
+            return
+        if resource is None or not hasattr(resource, "prlimit"):
+            if not self._warned:
+                self._warned = True
+                log.warning("[프로세스] 이 OS에서는 자원 한도(prlimit)를 지원하지 않음")
+            return
+        limits = []
+        if self.memory_mb:
+            # RLIMIT_AS는 가상 주소 공간을 크게 예약하는 Node(V8)가 시작하지 못하므로 데이터 영역으로 제한
+            limits.append((resource.RLIMIT_DATA, self.memory_bytes))
+        if self.cpu_seconds:
+            limits.append((resource.RLIMIT_CPU, self.cpu_seconds))
+        if self.open_files:
+            limits.append((resource.RLIMIT_NOFILE, self.open_files))
+        for kind, value in limits:
+            try:
+                resource.prlimit(pid, kind, (value, value))
+            except (OSError, ValueError) as e:
+                log.warning(f"[프로세스] 자원 한도 적용 실패 (pid {pid}): {e}")
+
+    def describe(self) -> str:
+        parts = []
+        if self.memory_mb:
+            parts.append(f"메모리 {self.memory_mb}MB")
+        if self.cpu_seconds:
+            parts.append(f"CPU {self.cpu_seconds}초")
+        if self.open_files:
+            parts.append(f"파일 {self.open_files}개")
+        return ", ".join(parts) or "없음"
+
+
+def read_stat(pid: int):
+    """/proc/{pid}/stat의 (프로세스 그룹 ID, 세션 ID, CPU 틱(user+system), RSS 페이지), 없으면 None"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # 프로세스 이름에 공백/괄호가 있을 수 있으므로 마지막 ')' 뒤부터 나눔 (필드 3부터)
+    fields = data[data.rfind(b")") + 2:].split()
+    try:
+        return int(fields[2]), int(fields[3]), int(fields[11]) + int(fields[12]), int(fields[21])
+    except (IndexError, ValueError):
+        return None
+
+
+def list_children(pid: int) -> list:
+    """/proc/{pid}/task/*/children의 자식 프로세스 ID 목록"""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", "rb") as f:
+                children.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return children
+
+
+def session_members(sid: int) -> list:
+    """세션 ID가 sid인 프로세스 목록 (/proc 전체 검색, 그룹 종료로 부족할 때만 사용)"""
+    members = []
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            stat = read_stat(int(name))
+            if stat is not None and stat[1] == sid:
+                members.append(int(name))
+    return members
+
+
+def kill_tree(process, escaped=()):
+    """CLI 프로세스와 그 자손 모두 종료 (프로세스 그룹, 필요하면 같은 세션에 남은 프로세스)
+
+    CLI가 이미 끝났어도 백그라운드로 남은 자손이 있을 수 있으므로 항상 호출한다.
+    escaped: 측정 중 그룹을 벗어난 것으로 보인 자손 (TreeUsage.escaped, setpgid/setsid)
+    보통은 그룹 종료만 하고, escaped가 있거나 그룹 종료가 실패했을 때만 /proc 전체를 검색한다.
+    """
+    if not POSIX:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        return
+    sid = process.pid
+    killed = True
+    try:
+        os.killpg(sid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        killed = False
+    # 자손이 새 프로세스 그룹을 만든 경우 (setpgid) 그룹 종료로 닿지 않으므로 세션으로 찾음
+    # (setsid로 세션까지 벗어난 자손은 측정에서 본 pid로만 종료 가능)
+    members = set(escaped)
+    if HAS_PROC and (escaped or not killed):
+        members.update(session_members(sid))
+    for pid in members:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+class TreeUsage:
+    """CLI 프로세스 트리의 CPU 시간/RSS 측정 (/proc 샘플링)
+
+    - CPU: 측정에 잡힌 프로세스별 user+system 시간의 합 (마지막 측정 이후 종료된
+      프로세스의 시간은 측정 간격만큼 빠질 수 있음)
+    - RSS: 측정 시점마다 트리 전체 RSS 합의 최댓값
+    - escaped: 측정에 잡힌 자손 중 CLI의 프로세스 그룹을 벗어난 것 (kill_tree에 전달)
+    """
+
+    def __init__(self, pid: int = None):
+        self.pid = pid
+        self.ticks = {}  # pid -> 마지막으로 측정한 CPU 틱
+        self.rss_bytes = 0  # 마지막 측정의 트리 RSS
+        self.peak_rss_bytes = 0
+        self.samples = 0
+        self.escaped = set()  # 프로세스 그룹이 CLI와 다른 자손 pid
+
+    @property
+    def available(self) -> bool:
+        return HAS_PROC and self.pid is not None
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(self.ticks.values()) / CLOCK_TICKS
+
+    def sample(self):
+        """트리 전체 한 번 측정 (CLI 프로세스부터 자식 목록을 따라감)"""
+        if not self.available:
+            return
+        pending = [self.pid]
+        seen = set()
+        rss_pages = 0
+        while pending:
+            pid = pending.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            stat = read_stat(pid)
+            if stat is None:
+                continue
+            pgid, _, ticks, rss = stat
+            if pgid != self.pid:
+                self.escaped.add(pid)
+            self.ticks[pid] = max(ticks, self.ticks.get(pid, 0))
+            rss_pages += rss
+            pending.extend(list_children(pid))
+        self.samples += 1
+        self.rss_bytes = rss_pages * PAGE_SIZE
+        self.peak_rss_bytes = max(self.peak_rss_bytes, self.rss_bytes)
+
+    def summary(self) -> dict:
+        """complete 진행 상황에 넣을 값 (측정하지 못했으면 빈 dict)"""
+        if not self.samples:
+            return {}
+        return {
+            "cpu_sec": round(self.cpu_seconds, 2),
+            "peak_rss_mb": round(self.peak_rss_bytes / 1024 / 1024, 1),
+            "processes": len(self.ticks)
+        }
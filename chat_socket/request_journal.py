@@ -0,0 +1,261 @@
+"""요청 큐 저널 (재시작/비정상 종료 후 대기 요청과 세션 복원)
+
+요청 큐와 방별 Claude 세션 ID는 메모리에만 있으므로 restart 명령(os._exit)이나
+비정상 종료 시 모두 사라진다. 큐에 들어간 요청(enqueue), 처리 시작(start),
+처리 완료(complete), 세션 변경(session), 세션 정리(session_end)를 JSON Lines 파일에 덧붙여 기록하고,
+서버 시작 시 다시 읽어 완료되지 않은 요청과 세션 ID를 복원한다.
+
+기록은 메모리 버퍼에 모았다가 짧은 간격으로 한 번에 파일에 쓰므로(쓰기/fsync와
+파일이 커졌을 때의 압축은 background_writer의 스레드에서 실행) 요청 추가 경로에
+디스크 대기 시간이 더해지지 않는다.
+비정상 종료 시에는 마지막 묶음(최대 JOURNAL_FLUSH_INTERVAL) 기록을 잃을 수 있다.
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+
+from background_writer import BackgroundWriter
+from log_pipeline import get_logger
+
+log = get_logger("journal")
+
+# 설정
+JOURNAL_FLUSH_INTERVAL = 0.05  # 기록을 모았다가 파일에 쓰는 간격 (초)
+JOURNAL_FSYNC = True  # 묶음마다 fsync 여부 (끄면 OS 장애 시 유실 가능)
+JOURNAL_MAX_ATTEMPTS = 2  # 처리 시작 후 완료되지 못한 요청을 다시 시도할 최대 횟수
+JOURNAL_COMPACT_SIZE = 1024 * 1024  # 저널 파일이 이 크기를 넘으면 현재 상태만 남기고 다시 씀 (바이트)
+
+
+class RequestJournal:
+    """요청 큐/세션 상태의 덧붙이기 전용 저널
+
+    - enqueue/start/complete/session/end_session: 기록 (버퍼에 추가, 백그라운드에서 묶어 씀)
+    - pending: 완료되지 않은 요청 (요청 ID -> 요청 정보, 추가 순서 유지)
+    - sessions: 방 이름 -> {"session_id", "started"}
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.pending = OrderedDict()
+        self.sessions = {}
+        self.buffer = []  # 아직 파일에 쓰지 않은 줄
+        self.stats = {"records": 0, "flushes": 0, "replayed": 0, "dropped": 0}
+        self._file = None
+        self._size = 0  # 저널 파일 크기 (쓰기 스레드가 갱신, 압축 여부 판단)
+        self._compact_requested = False
+        self.writer = BackgroundWriter("저널", JOURNAL_FLUSH_INTERVAL, self._collect, self._write)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    # --------------------------------------------------------
+    # 시작 시 복원
+    # --------------------------------------------------------
+
+    def load(self):
+        """저널 파일을 읽어 완료되지 않은 요청과 세션 상태 복원 후 압축하여 다시 씀
+
+        처리 시작 후 JOURNAL_MAX_ATTEMPTS번 이상 완료되지 못한 요청은 서버를
+        죽게 만든 요청일 수 있으므로 버린다.
+
+        무중단 재시작 인계 시에는 이 프로세스가 먼저 받은 기록(아직 파일에 쓰지
+        않음)이 있을 수 있으므로, 파일 내용 뒤에 이어 붙인다.
+        """
+        if not self.enabled:
+            return
+        own_pending, own_sessions = self.pending, self.sessions
+        self.pending, self.sessions = OrderedDict(), {}
+        lines = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"[저널] 읽기 실패: {e}")
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 비정상 종료로 잘린 마지막 줄
+                continue
+            self._apply(record)
+
+        for request_id, request in list(self.pending.items()):
+            if request["attempts"] >= JOURNAL_MAX_ATTEMPTS:
+                del self.pending[request_id]
+                self.stats["dropped"] += 1
+                log.warning(f"[저널] 반복 실패한 요청 버림 ({request['room']}): {request['message'][:50]}")
+        self.stats["replayed"] = len(self.pending)
+        self.pending.update(own_pending)
+        self.sessions.update(own_sessions)
+
+        self.compact()
+        if self.pending or self.sessions:
+            log.info(f"[저널] 복원: 대기 요청 {len(self.pending)}개, 세션 {len(self.sessions)}개 ({self.path})")
+
+    def _apply(self, record: dict):
+        """기록 한 줄을 메모리 상태에 반영"""
+        op = record.get("op")
+        request_id = record.get("id")
+        if op == "enqueue":
+            self.pending[request_id] = {
+                "id": request_id,
+                "room": record["room"],
+                "sender": record["sender"],
+                "owner": record.get("owner"),
+                "message": record["message"],
+                "priority": record.get("priority", "normal"),
+                "ts": record.get("ts", 0),
+                "attempts": record.get("attempts", 0)
+            }
+        elif op == "start":
+            request = self.pending.get(request_id)
+            if request is not None:
+                request["attempts"] += 1
+        elif op == "complete":
+            self.pending.pop(request_id, None)
+        elif op == "session":
+            self.sessions[record["room"]] = {
+                "session_id": record["session_id"],
+                "started": bool(record.get("started"))
+            }
+        elif op == "session_end":
+            self.sessions.pop(record["room"], None)
+
+    # --------------------------------------------------------
+    # 기록
+    # --------------------------------------------------------
+
+    def enqueue(self, request_id: str, room: str, sender: str, message: str, priority: str = "normal",
+                owner: str = None):
+        self._record({"op": "enqueue", "id": request_id, "room": room, "sender": sender, "owner": owner,
+                      "message": message, "priority": priority, "ts": time.time()})
+
+    def start(self, request_id: str):
+        self._record({"op": "start", "id": request_id})
+
+    def complete(self, request_id: str):
+        self._record({"op": "complete", "id": request_id})
+
+    def session(self, room: str, session_id: str, started: bool):
+        self._record({"op": "session", "room": room, "session_id": session_id, "started": started})
+
+    def end_session(self, room: str):
+        """유휴 세션을 메모리에서 정리함 (다음 시작 때 이 방의 세션을 복원하지 않음)"""
+        self._record({"op": "session_end", "room": room})
+
+    def _record(self, record: dict):
+        if not self.enabled:
+            return
+        self._apply(record)
+        self.buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stats["records"] += 1
+        self.writer.notify()
+
+    # --------------------------------------------------------
+    # 파일 쓰기
+    # --------------------------------------------------------
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _collect(self):
+        """쓰기 태스크가 꺼낼 묶음: (압축할 현재 상태 줄 또는 None, 덧붙일 줄)
+
+        파일이 JOURNAL_COMPACT_SIZE를 넘었으면 현재 상태로 다시 쓴다. 현재 상태에 버퍼의
+        기록이 이미 반영되어 있으므로 버퍼는 압축이 실패했을 때만 덧붙인다.
+        압축하는 동안 들어온 기록은 다음 묶음까지 버퍼에 남는다.
+        """
+        if self._compact_requested or self._size > JOURNAL_COMPACT_SIZE:
+            self._compact_requested = False
+            lines, self.buffer = self.buffer, []
+            return self._state_lines(), lines
+        if not self.buffer:
+            return None
+        lines, self.buffer = self.buffer, []
+        return None, lines
+
+    def _state_lines(self) -> list:
+        """현재 상태(세션 + 완료되지 않은 요청)를 저널 줄로"""
+        lines = [json.dumps({"op": "session", "room": room, **state}, ensure_ascii=False) + "\n"
+                 for room, state in self.sessions.items()]
+        for request in self.pending.values():
+            lines.append(json.dumps({"op": "enqueue", **request}, ensure_ascii=False) + "\n")
+        return lines
+
+    def _write(self, batch: tuple):
+        """쓰기 스레드: 줄 덧붙이기 또는 현재 상태로 다시 쓰기 (실패는 로그만 남김)"""
+        state, lines = batch
+        if state is not None:
+            try:
+                self._rewrite(state)
+                return
+            except OSError as e:
+                log.warning(f"[저널] 압축 실패: {e}")
+        if not lines:
+            return
+        try:
+            f = self._open()
+            f.write("".join(lines))
+            f.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(f.fileno())
+            self._size = f.tell()
+            self.stats["flushes"] += 1
+        except OSError as e:
+            log.warning(f"[저널] 쓰기 실패: {e}")
+
+    def _rewrite(self, lines: list):
+        """임시 파일에 쓴 뒤 이름을 바꿔 저널 파일 교체"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+            self._size = f.tell()
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """버퍼를 즉시 파일에 쓰기 (restart 명령으로 종료하기 직전 등 동기 호출용)"""
+        if self.enabled:
+            self.writer.flush()
+
+    def compact(self):
+        """현재 상태(세션 + 완료되지 않은 요청)만 남기고 저널 파일을 즉시 다시 씀 (시작 시 복원 직후)"""
+        if not self.enabled:
+            return
+        self._compact_requested = True
+        self.writer.flush()
+
+    def start_writer(self):
+        """백그라운드 쓰기 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self.enabled:
+            self.writer.start()
+
+    async def close(self):
+        """쓰기 태스크 중지, 남은 기록 쓰기 후 파일 닫기"""
+        await self.writer.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> dict:
+        """/usage 엔드포인트용 저널 상태"""
+        return {
+            "path": self.path,
+            "pending": len(self.pending),
+            "sessions": len(self.sessions),
+            "buffered": len(self.buffer),
+            **self.stats
+        }
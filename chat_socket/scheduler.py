@@ -0,0 +1,235 @@
+"""방별 요청 스케줄러 (보낸 사람별 공정 분배 + 우선순위 + 대기열 한도)
+
+같은 방의 요청은 여전히 하나씩 처리하지만, 다음에 처리할 요청은 단순 FIFO가
+아니라 다음 순서로 고른다.
+
+1. 우선순위 (high → normal → low)
+2. 같은 우선순위 안에서는 보낸 사람별 라운드 로빈 - 한 사람이 프롬프트를 10개
+   붙여 넣어도 다른 사람의 요청이 그 사이사이에 처리된다.
+
+보낸 사람은 클라이언트가 정하는 이름(sender)이 아니라 서버가 연결마다 정하는
+owner로 구분한다 (같은 이름을 쓰는 다른 연결이 한도를 나눠 쓰거나 남의 요청을
+취소/이동하지 못하도록). owner가 없는 요청은 sender로 구분한다.
+
+대기열 한도(방 전체, 보낸 사람별, 서버 전체)를 넘는 요청은 큐에 넣지 않고 거부한다.
+예상 대기 시간은 최근 요청 처리 시간의 평균으로 계산한다 (방 하나 기준).
+
+묶음 처리(--batch)를 켜면 pop_batch()가 위 순서대로 대기 요청을 여러 개 꺼내
+Claude CLI 한 번으로 처리할 묶음 요청을 만든다.
+"""
+from collections import OrderedDict, deque
+
+# 설정
+QUEUE_MAX_DEPTH = 20  # 방 하나의 최대 대기 요청 수 (처리 중인 요청 제외)
+QUEUE_MAX_PER_SENDER = 5  # 보낸 사람(연결) 하나가 한 방에 쌓을 수 있는 최대 대기 요청 수
+QUEUE_MAX_TOTAL = 100  # 서버 전체 최대 대기 요청 수
+QUEUE_DURATION_SAMPLES = 20  # 예상 대기 시간 계산에 쓸 최근 처리 시간 개수
+QUEUE_DEFAULT_DURATION = 60  # 처리 시간 기록이 없을 때 가정할 요청 하나의 처리 시간 (초)
+BATCH_MAX_REQUESTS = 5  # 묶음 하나에 넣을 최대 요청 수 (--batch-max)
+BATCH_MAX_CHARS = 8000  # 묶음 하나의 메시지 길이 합 상한 (첫 요청은 길어도 포함)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}  # 이름 -> 순위 (작을수록 먼저)
+DEFAULT_PRIORITY = "normal"
+
+REJECT_MESSAGES = {
+    "sender_quota": f"대기 중인 요청이 너무 많습니다. (한 사람당 최대 {QUEUE_MAX_PER_SENDER}개)",
+    "room_full": f"이 방의 대기열이 가득 찼습니다. (최대 {QUEUE_MAX_DEPTH}개)",
+    "server_full": f"서버 대기열이 가득 찼습니다. (최대 {QUEUE_MAX_TOTAL}개)",
+}
+
+
+def normalize_priority(value) -> str:
+    """클라이언트가 보낸 우선순위 이름 (알 수 없으면 기본값)"""
+    return value if value in PRIORITIES else DEFAULT_PRIORITY
+
+
+def owner_of(item: dict) -> str:
+    """요청을 보낸 쪽의 구분 키 (서버가 정한 owner, 없으면 보낸 사람 이름)"""
+    return item.get("owner") or item["sender"]
+
+
+class FairQueue:
+    """방 하나의 요청 대기열
+
+    요청(dict)은 id, sender, owner, message, priority, enqueued_at을 가진다.
+    - pop(): 다음 요청을 꺼내 current(처리 중)로 표시, finish()로 해제
+    - len(): 처리 중인 요청을 포함한 요청 수, waiting: 대기 중인 요청 수
+    - 순회: 처리 중인 요청, 대기 요청을 처리될 순서대로
+    """
+
+    def __init__(self):
+        self.levels = {}  # 우선순위 순위 -> OrderedDict(owner -> deque(요청)), 앞쪽 owner가 다음 차례
+        self.items = {}  # 요청 ID -> 대기 중인 요청
+        self.current = None  # 처리 중인 요청
+
+    def __len__(self) -> int:
+        return len(self.items) + (1 if self.current is not None else 0)
+
+    def __iter__(self):
+        if self.current is not None:
+            yield self.current
+        yield from self.ordered()
+
+    @property
+    def waiting(self) -> int:
+        return len(self.items)
+
+    def count_owner(self, owner: str) -> int:
+        return sum(len(owners.get(owner, ())) for owners in self.levels.values())
+
+    def reject_reason(self, owner: str, total_waiting: int):
+        """owner의 요청을 더 받을 수 없으면 거부 사유 (REJECT_MESSAGES 키), 받을 수 있으면 None"""
+        if self.count_owner(owner) >= QUEUE_MAX_PER_SENDER:
+            return "sender_quota"
+        if self.waiting >= QUEUE_MAX_DEPTH:
+            return "room_full"
+        if total_waiting >= QUEUE_MAX_TOTAL:
+            return "server_full"
+        return None
+
+    def push(self, item: dict, index: int = None):
+        """요청 추가 (index 지정 시 같은 owner/우선순위 안에서 그 위치에 끼워 넣음)"""
+        item["priority"] = normalize_priority(item.get("priority"))
+        owners = self.levels.setdefault(PRIORITIES[item["priority"]], OrderedDict())
+        queue = owners.setdefault(owner_of(item), deque())
+        if index is None:
+            queue.append(item)
+        else:
+            queue.insert(index, item)
+        self.items[item["id"]] = item
+
+    def pop(self):
+        """다음 차례 요청을 꺼내 처리 중으로 표시 (없으면 None)"""
+        if not self.levels:
+            return None
+        rank = min(self.levels)
+        owners = self.levels[rank]
+        owner, queue = next(iter(owners.items()))
+        item = queue.popleft()
+        if queue:
+            owners.move_to_end(owner)  # 다음 차례는 다른 보낸 사람
+        else:
+            del owners[owner]
+            if not owners:
+                del self.levels[rank]
+        del self.items[item["id"]]
+        self.current = item
+        return item
+
+    def peek(self):
+        """다음 차례 요청 (꺼내지 않음, 없으면 None)"""
+        if not self.levels:
+            return None
+        owners = self.levels[min(self.levels)]
+        return next(iter(owners.values()))[0]
+
+    def pop_batch(self, limit: int = BATCH_MAX_REQUESTS, max_chars: int = BATCH_MAX_CHARS):
+        """다음 차례부터 요청을 최대 limit개 꺼내 하나의 묶음 요청으로 처리 중 표시 (없으면 None)
+
+        요청이 하나뿐이면 그 요청을 그대로, 여러 개면 batch(원래 요청 목록)를 가진
+        묶음 요청을 반환한다. 묶음 요청의 id는 첫 요청의 id.
+        """
+        first = self.pop()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first["message"])
+        while len(batch) < limit and self.items:
+            following = self.peek()
+            if size + len(following["message"]) > max_chars:
+                break
+            batch.append(self.pop())
+            size += len(following["message"])
+        if len(batch) == 1:
+            self.current = first
+            return first
+        self.current = {
+            "id": first["id"],
+            "sender": ", ".join(dict.fromkeys(item["sender"] for item in batch)),
+            "message": " / ".join(item["message"] for item in batch),
+            "priority": first["priority"],
+            "enqueued_at": first["enqueued_at"],
+            "batch": batch
+        }
+        return self.current
+
+    def is_current(self, item_id: str) -> bool:
+        """처리 중인 요청(묶음이면 그 안의 요청 포함)의 ID인지 여부"""
+        if self.current is None:
+            return False
+        return any(item["id"] == item_id for item in self.current.get("batch", (self.current,)))
+
+    def finish(self, item: dict):
+        if self.current is item:
+            self.current = None
+
+    def remove(self, item_id: str):
+        """대기 중인 요청 제거 (없으면 None)"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return None
+        rank = PRIORITIES[item["priority"]]
+        owners = self.levels[rank]
+        queue = owners[owner_of(item)]
+        queue.remove(item)
+        if not queue:
+            del owners[owner_of(item)]
+            if not owners:
+                del self.levels[rank]
+        return item
+
+    def owned_by(self, item_id: str, owner: str) -> bool:
+        """요청이 owner의 것인지 여부 (처리 중인 묶음이면 묶음 안의 요청 모두)"""
+        if self.is_current(item_id):
+            return all(owner_of(item) == owner for item in self.current.get("batch", (self.current,)))
+        item = self.items.get(item_id)
+        return item is not None and owner_of(item) == owner
+
+    def move(self, item_id: str, index: int = 0, priority: str = None, owner: str = None) -> bool:
+        """대기 중인 요청을 같은 owner의 요청 중 index 위치로 옮기고, 우선순위 변경 (없으면 False)
+
+        index가 음수이거나 범위를 넘으면 맨 뒤로 옮긴다.
+        owner를 주면 그 owner의 요청만 옮긴다 (다른 사람의 요청이면 False).
+        """
+        if owner is not None and not self.owned_by(item_id, owner):
+            return False
+        item = self.remove(item_id)
+        if item is None:
+            return False
+        if priority is not None:
+            item["priority"] = normalize_priority(priority)
+        same = self.levels.get(PRIORITIES[item["priority"]], {}).get(owner_of(item), ())
+        self.push(item, index if index is not None and 0 <= index < len(same) else None)
+        return True
+
+    def ordered(self) -> list:
+        """대기 요청을 처리될 순서대로 (새 요청이 들어오지 않는다고 가정)"""
+        result = []
+        for rank in sorted(self.levels):
+            queues = list(self.levels[rank].values())
+            depth = max(len(queue) for queue in queues)
+            for round_index in range(depth):
+                for queue in queues:
+                    if round_index < len(queue):
+                        result.append(queue[round_index])
+        return result
+
+    def restore(self, items: list):
+        """저널 순서대로 대기열 다시 구성 (처리 중인 요청은 유지)"""
+        self.levels, self.items = {}, {}
+        for item in items:
+            if not self.is_current(item["id"]):
+                self.push(item)
+
+
+class DurationTracker:
+    """최근 요청 처리 시간 평균 (예상 대기 시간 계산용)"""
+
+    def __init__(self, samples: int = QUEUE_DURATION_SAMPLES):
+        self.values = deque(maxlen=samples)
+
+    def add(self, seconds: float):
+        self.values.append(seconds)
+
+    def average(self) -> float:
+        return sum(self.values) / len(self.values) if self.values else QUEUE_DEFAULT_DURATION
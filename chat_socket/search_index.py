@@ -0,0 +1,299 @@
+"""대화 검색 색인 (SQLite FTS5, 메시지/도구 실행/오류 전문 검색)
+
+대화 기록(transcript_store)은 세션별로 시간 순서대로만 읽을 수 있어서 "server.py 큐를
+고친 세션"을 찾으려면 스크롤해야 한다. 여기서는 브로드캐스트되는 기록 중
+- 메시지: 사용자 질문과 Claude 최종 응답 (본문, 보낸 사람)
+- 도구 실행: tool_start의 detail (파일 경로, Bash 명령, Grep 패턴 등, 도구 이름)
+- 오류 메시지
+를 FTS5 테이블(search_fts)에 색인하고, 세션 토큰/방/세션 ID/시각/대화 기록 번호는
+일반 테이블(search_meta)에 두어 필터와 함께 bm25 순으로 검색한다.
+
+- 색인: add()는 메모리에 모았다가 SEARCH_FLUSH_INTERVAL마다 스레드에서 한 트랜잭션으로 기록
+  (검색 직전에도 기록하므로 방금 보낸 메시지도 검색됨)
+- 검색: 흔한 단어는 일치하는 모든 기록의 bm25를 계산하므로 수십 ms까지 걸릴 수 있어
+  run_search()가 별도 읽기 연결로 스레드에서 실행 (WAL이므로 기록과 동시에 읽기 가능)
+- 검색어: 공백으로 나눈 단어를 모두 포함 (한글 단어는 접두어 일치, "따옴표"는 구문, -단어는 제외)
+- 결과 조각: snippet()으로 일치 부분 앞뒤만 잘라 HTML 이스케이프 후 <mark>로 강조
+- SQLite에 FTS5가 없으면 경고만 남기고 검색을 끈다 (/search는 503)
+"""
+import asyncio
+import functools
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from background_writer import BackgroundWriter
+from log_pipeline import get_logger
+
+log = get_logger("search")
+
+# 설정
+SEARCH_FLUSH_INTERVAL = 1.0  # 모은 색인 항목을 기록하는 간격 (초)
+SEARCH_PAGE_SIZE = 20  # /search 기본 결과 수
+SEARCH_MAX_PAGE = 100  # /search 최대 결과 수
+SEARCH_SNIPPET_TOKENS = 16  # 결과 조각에 포함할 단어 수
+SEARCH_BODY_MAX = 20000  # 색인할 본문 최대 길이 (문자, 긴 응답은 앞부분만)
+SEARCH_KINDS = ("message", "tool", "error")  # 색인할 기록 종류 (transcript_store.condense_frame 항목)
+
+MARK_START, MARK_END = "\x02", "\x03"  # snippet() 강조 표시 (이스케이프 후 <mark>로 바꿈)
+TERM_PATTERN = re.compile(r'(-?)"([^"]*)"|(\S+)')
+HANGUL_START, HANGUL_END = "\uac00", "\ud7a3"  # 한글 음절 범위
+
+
+def build_match(query: str) -> str:
+    """검색어 -> FTS5 MATCH 식 (FTS5 문법 문자는 모두 따옴표로 감싸므로 문법 오류가 나지 않음)
+
+    공백으로 나눈 단어를 모두 포함, "따옴표"는 구문 일치, -단어는 제외. 한글로 끝나는 단어와
+    *로 끝나는 단어는 접두어 일치 ("서버"는 "서버를"과도 일치, 조사가 붙은 경우).
+    포함할 단어가 없으면 ValueError.
+    """
+    include, exclude = [], []
+    for match in TERM_PATTERN.finditer(query):
+        negate, phrase, word = match.groups()
+        if phrase is not None:
+            text, prefix = phrase, ""
+        else:
+            if word.startswith("-") and len(word) > 1:
+                negate, word = "-", word[1:]
+            text = word.rstrip("*")
+            prefix = "*" if text != word or (text and HANGUL_START <= text[-1] <= HANGUL_END) else ""
+        if not text.strip():
+            continue
+        (exclude if negate else include).append('"' + text.replace('"', '""') + '"' + prefix)
+    if not include:
+        raise ValueError("검색어를 입력하세요")
+    return " ".join(include) + "".join(f" NOT {term}" for term in exclude)
+
+
+def parse_time(value: str, end: bool = False) -> float:
+    """필터 시각 (유닉스 시각 또는 YYYY-MM-DD[THH:MM], 날짜만 있고 end이면 그날 끝) -> 유닉스 시각"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"잘못된 시각: {value} (예: 2026-01-31, 2026-01-31T09:00)") from None
+    if end and len(value) <= 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+def render_snippet(text: str) -> str:
+    """snippet() 결과를 HTML 이스케이프 후 강조 부분을 <mark>로 표시"""
+    return html.escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class SearchIndex:
+    """메시지/도구 실행 전문 검색 색인 (db_path가 없거나 FTS5가 없으면 비활성)"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self.pending = []  # 아직 기록하지 않은 (메타 행, 본문, 라벨)
+        self.stats = {"indexed": 0, "queries": 0, "query_ms": 0.0, "errors": 0}
+        self._db = None
+        self._reader = None  # 검색용 연결 (스레드에서 사용)
+        self._read_lock = threading.Lock()
+        self.writer = BackgroundWriter("검색", SEARCH_FLUSH_INTERVAL, self._collect, self._write)
+        if db_path:
+            self.open_db(db_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def open_db(self, db_path: str):
+        """색인 DB 열기 (테이블이 없으면 생성)"""
+        self.db_path = db_path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_meta ("
+                "id INTEGER PRIMARY KEY, ts REAL, token TEXT, room TEXT, session_id TEXT, "
+                "kind TEXT, label TEXT, item INTEGER)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS search_meta_token ON search_meta (token)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS search_meta_ts ON search_meta (ts)")
+            # label: 보낸 사람 또는 도구 이름 (본문보다 낮은 가중치)
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+                "body, label, tokenize = \"unicode61 remove_diacritics 2 tokenchars '_'\")"
+            )
+            self._db.commit()
+            count = self._db.execute("SELECT COUNT(*) FROM search_meta").fetchone()[0]
+            self._reader = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        except sqlite3.Error as e:
+            if "fts5" in str(e):
+                log.warning(f"[검색] SQLite에 FTS5가 없어 검색을 끕니다 (SQLite {sqlite3.sqlite_version})")
+            else:
+                log.warning(f"[검색] 검색 색인 DB 열기 실패: {e}")
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+            return
+        log.info(f"[검색] 검색 색인: {count}건 ({db_path})")
+
+    # --------------------------------------------------------
+    # 색인
+    # --------------------------------------------------------
+
+    def add(self, entries: list, token: str, room: str, session_id: str, first_item: int = None):
+        """대화 기록 항목 색인 예약 (first_item: 첫 항목의 대화 기록 번호, /history의 before에 사용)"""
+        if not self.enabled:
+            return
+        for offset, entry in enumerate(entries):
+            kind = entry.get("type")
+            if kind not in SEARCH_KINDS:
+                continue
+            if kind == "tool":
+                body, label = entry.get("detail", ""), entry.get("tool", "")
+            else:
+                body, label = entry.get("message", ""), entry.get("username", "")
+            if not body and not label:
+                continue
+            item = first_item + offset if first_item is not None else None
+            self.pending.append(((entry.get("ts") or time.time(), token, room, session_id, kind, label, item),
+                                 body[:SEARCH_BODY_MAX], label))
+        if self.pending:
+            self.writer.notify()
+
+    def flush(self):
+        """모은 항목을 지금 기록 (삭제/종료 직전)"""
+        if self.enabled:
+            self.writer.flush()
+
+    def _collect(self):
+        """쓰기 태스크가 꺼낼 묶음: 모은 항목"""
+        if not self.pending:
+            return None
+        pending, self.pending = self.pending, []
+        return pending
+
+    def _write(self, pending: list):
+        """항목들을 한 트랜잭션으로 기록 (쓰기 스레드에서도 호출)"""
+        try:
+            with self._db:
+                for meta, body, label in pending:
+                    rowid = self._db.execute(
+                        "INSERT INTO search_meta (ts, token, room, session_id, kind, label, item) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", meta).lastrowid
+                    self._db.execute("INSERT INTO search_fts (rowid, body, label) VALUES (?, ?, ?)",
+                                     (rowid, body, label))
+            self.stats["indexed"] += len(pending)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            log.warning(f"[검색] 색인 기록 실패 ({len(pending)}건): {e}")
+
+    def remove(self, token: str):
+        """세션 토큰의 색인 삭제 (대화 기록과 함께 정리)
+
+        아직 기록하지 않은 항목은 버리고, 삭제는 쓰는 중인 묶음 뒤에 쓰기 스레드에서 실행한다
+        (먼저 꺼낸 묶음이 삭제 후에 기록되어 검색되는 행이 남지 않도록).
+        """
+        if not self.enabled or not token:
+            return
+        self.pending = [row for row in self.pending if row[0][1] != token]
+        self.writer.submit(self._delete, token)
+
+    def _delete(self, token: str):
+        """쓰기 스레드: 세션 토큰의 행 삭제"""
+        try:
+            with self._db:
+                self._db.execute("DELETE FROM search_fts WHERE rowid IN "
+                                 "(SELECT id FROM search_meta WHERE token = ?)", (token,))
+                self._db.execute("DELETE FROM search_meta WHERE token = ?", (token,))
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            log.warning(f"[검색] 색인 삭제 실패 ({token[:8]}): {e}")
+
+    def start_writer(self):
+        """주기적 기록 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self.enabled:
+            self.writer.start()
+
+    async def close(self):
+        """기록 태스크 중지 후 남은 항목 기록"""
+        await self.writer.close()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            with self._read_lock:
+                self._reader.close()
+                self._reader = None
+
+    # --------------------------------------------------------
+    # 검색
+    # --------------------------------------------------------
+
+    def search(self, query: str, token: str = None, room: str = None, session_id: str = None,
+               kind: str = None, since: float = None, until: float = None,
+               limit: int = SEARCH_PAGE_SIZE, offset: int = 0, all_sessions: bool = False) -> dict:
+        """관련도(bm25) 순 검색 결과 (검색어가 비었으면 ValueError, 아직 기록하지 않은 항목은 제외)
+
+        세션 토큰(token)의 기록만 검색하고, 모든 세션을 검색하려면 all_sessions를 켜야 한다.
+        결과에는 세션 토큰(/history 키이자 재접속 자격)을 넣지 않고 불투명한 id만 넣는다.
+        반환: items (id, ts, room, session_id, type, label, item, snippet, score), more, took_ms
+        """
+        if not token and not all_sessions:
+            raise ValueError("검색할 세션 토큰이 필요합니다")
+        match = build_match(query)
+        limit = max(1, min(limit, SEARCH_MAX_PAGE))
+        conditions, params = ["search_fts MATCH ?"], [match]
+        for column, value in (("m.token", token), ("m.room", room), ("m.session_id", session_id),
+                              ("m.kind", kind)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("m.ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("m.ts < ?")
+            params.append(until)
+        started = time.perf_counter()
+        with self._read_lock:
+            if self._reader is None:
+                raise sqlite3.ProgrammingError("검색 색인이 닫혔습니다")
+            rows = self._reader.execute(
+                "SELECT m.id, m.ts, m.room, m.session_id, m.kind, m.label, m.item, "
+                f"snippet(search_fts, 0, '{MARK_START}', '{MARK_END}', '…', {SEARCH_SNIPPET_TOKENS}), "
+                "bm25(search_fts, 1.0, 0.3) AS score "
+                "FROM search_fts JOIN search_meta m ON m.id = search_fts.rowid "
+                f"WHERE {' AND '.join(conditions)} ORDER BY score LIMIT ? OFFSET ?",
+                params + [limit + 1, max(0, offset)]
+            ).fetchall()
+        took_ms = (time.perf_counter() - started) * 1000
+        self.stats["queries"] += 1
+        self.stats["query_ms"] += took_ms
+        items = [{
+            "id": row_id, "ts": ts, "room": row_room, "session_id": row_session, "type": row_kind,
+            "label": label, "item": item, "snippet": render_snippet(snippet), "score": round(-score, 4)
+        } for row_id, ts, row_room, row_session, row_kind, label, item, snippet, score in rows[:limit]]
+        return {"items": items, "more": len(rows) > limit, "took_ms": round(took_ms, 2)}
+
+    async def run_search(self, query: str, **filters) -> dict:
+        """모은 항목을 기록한 뒤 search()를 실행 (둘 다 스레드에서, 이벤트 루프를 막지 않음)"""
+        await self.writer.run_now()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(self.search, query, **filters))
+
+    def summary(self) -> dict:
+        """/usage 엔드포인트용 색인 상태"""
+        queries = self.stats["queries"]
+        return {
+            "path": self.db_path,
+            "enabled": self.enabled,
+            "pending": len(self.pending),
+            **self.stats,
+            "query_ms": round(self.stats["query_ms"], 2),
+            "avg_query_ms": round(self.stats["query_ms"] / queries, 2) if queries else 0
+        }
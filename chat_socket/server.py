@@ -1,22 +1,49 @@
 import asyncio
 import json
 import subprocess
-import threading
+import shutil
 import uuid
 import sys
 import os
 import argparse
-from datetime import datetime
-from queue import Queue, Empty
+import hmac
+import signal
+import socket
+import sqlite3
+import time
 from aiohttp import web
 from collections import deque
 
+from event_log import EventLog
+from blob_store import BLOB_DIFF_MAX_SIZE, BlobStore, HASH_PATTERN
+from claude_pool import WarmPool, WARM_POOL_SIZE, spawn_claude
+from process_tree import ResourceLimits, TreeUsage, PROC_SAMPLE_INTERVAL, kill_tree
+from fanout import ClientHub, ProgressBatcher, PROGRESS_BATCH_WINDOW, encode
+from log_pipeline import (pipeline as log_pipeline, get_logger, bind, unbind, parse_module_levels, LEVELS,
+                          LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS)
+from metrics import registry, FAST_BUCKETS
+from request_journal import RequestJournal
+from session_registry import (SessionRegistry, new_token, select_evictions, SESSION_IDLE_MAX, SESSION_IDLE_TTL,
+                              SESSION_SWEEP_INTERVAL)
+from search_index import SearchIndex, parse_time, SEARCH_PAGE_SIZE
+from scheduler import (FairQueue, DurationTracker, REJECT_MESSAGES, BATCH_MAX_REQUESTS, BATCH_MAX_CHARS,
+                       PRIORITIES, DEFAULT_PRIORITY, normalize_priority)
+from static_assets import AssetCache
+from stream_parser import StreamParser, INIT, TOOL_USE, TEXT, TEXT_DELTA, TEXT_BLOCK, TOOL_RESULT, RESULT
+from supervisor import notify_ready, run_supervisor
+from transcript_store import TranscriptStore, condense_frame, HISTORY_PAGE_SIZE
+from usage import UsageService
+from usage_ledger import UsageLedger
+
 # Windows asyncio 호환성
+# Claude CLI를 asyncio 서브프로세스로 실행하므로 서브프로세스를 지원하는
+# Proactor 이벤트 루프(Python 3.8+ Windows 기본값)를 그대로 사용한다.
 if sys.platform == "win32":
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 # 설정
 CLAUDE_TIMEOUT = 300  # Claude CLI 타임아웃 (초)
+STREAM_LINE_LIMIT = 16 * 1024 * 1024  # stream-json 한 줄 최대 크기 (바이트, 큰 Write/Read 결과 대비)
 USD_TO_KRW = 1430  # 환율
 HOST = "0.0.0.0"
 DEFAULT_PORT = 8765
@@ -24,6 +51,12 @@ DEFAULT_PORT = 8765
 # 현재 스크립트 디렉토리
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 로거 (큐에 넣고 백그라운드 스레드가 출력, 모듈별 레벨: --log-module claude=DEBUG)
+log = get_logger("server")  # 세션, 워커, 재시작, 정적 파일
+claude_log = get_logger("claude")  # Claude CLI 실행과 stream-json 이벤트
+queue_log = get_logger("queue")  # 요청 큐
+ws_log = get_logger("ws")  # WebSocket 연결, 채팅 메시지, 명령
+
 # 프로젝트 루트 (chat_socket의 부모 디렉토리)
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 
@@ -46,129 +79,297 @@ def get_relative_path(file_path: str) -> str:
         return file_path
 
 
-# 연결된 클라이언트 관리
-connected_clients = set()
-
-# Claude 처리 상태
-claude_processing = False
-current_stop_event = None
-session_id = None
-session_started = False
-
-# 요청 큐 관리
-request_queue = deque()  # 대기 중인 요청 큐
-queue_lock = asyncio.Lock()  # 큐 접근 동기화
-
-
-def get_claude_usage():
-    """ccusage를 통해 오늘의 Claude 사용량 조회"""
-    try:
-        result = subprocess.run(
-            'npx ccusage@latest daily --json',
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            shell=True,
-            timeout=30
-        )
-        if result.returncode != 0:
-            print(f"[DEBUG] ccusage 실행 실패: {result.stderr}")
-            return None
-
-        data = json.loads(result.stdout)
-        daily_data = data.get("daily", [])
-        totals = data.get("totals", {})
-
-        # 오늘 날짜의 데이터 찾기
-        today = datetime.now().strftime("%Y-%m-%d")
-        today_usage = None
-        for day in daily_data:
-            if day.get("date") == today:
-                today_usage = day
-                break
-
-        return {
-            "today": today_usage,
-            "totals": totals,
-            "date": today
-        }
-    except subprocess.TimeoutExpired:
-        print("[DEBUG] ccusage 타임아웃")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"[DEBUG] ccusage JSON 파싱 실패: {e}")
-        return None
-    except Exception as e:
-        print(f"[DEBUG] ccusage 오류: {e}")
-        return None
-
-
-def get_claude_blocks():
-    """ccusage를 통해 5시간 블록 사용량 조회"""
-    try:
-        result = subprocess.run(
-            'npx ccusage@latest blocks --json',
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            shell=True,
-            timeout=30
-        )
-        if result.returncode != 0:
-            print(f"[DEBUG] ccusage blocks 실행 실패: {result.stderr}")
-            return None
-
-        data = json.loads(result.stdout)
-        blocks = data.get("blocks", [])
-
-        # 현재 활성 블록 찾기
-        active_block = None
-        for block in blocks:
-            if block.get("isActive") and not block.get("isGap"):
-                active_block = block
-                break
-
-        if not active_block:
-            return None
-
-        # 블록 정보 추출
-        projection = active_block.get("projection", {})
-        burn_rate = active_block.get("burnRate", {})
-
-        return {
-            "startTime": active_block.get("startTime"),
-            "endTime": active_block.get("endTime"),
-            "costUSD": active_block.get("costUSD", 0),
-            "totalTokens": active_block.get("totalTokens", 0),
-            "remainingMinutes": projection.get("remainingMinutes", 0) if projection else 0,
-            "projectedCost": projection.get("totalCost", 0) if projection else 0,
-            "costPerHour": burn_rate.get("costPerHour", 0) if burn_rate else 0,
-            "models": active_block.get("models", [])
+# Edit/Write 전체 본문 저장소 (프레임에는 해시/크기/미리보기만, 펼칠 때 /blob으로 받음)
+DEFAULT_BLOB_DIR = os.path.join(SCRIPT_DIR, "data", "blobs")
+blob_store = BlobStore()
+
+# 대화 기록 (세션 토큰별 덧붙이기 전용 파일, 새 탭은 /history로 이전 대화를 페이지 단위로 받음)
+DEFAULT_HISTORY_DIR = os.path.join(SCRIPT_DIR, "data", "transcripts")
+transcripts = TranscriptStore()
+
+# 대화 검색 색인 (메시지/도구 실행/오류를 SQLite FTS5에 색인, /search)
+DEFAULT_SEARCH_DB = os.path.join(SCRIPT_DIR, "data", "search.db")
+search_index = SearchIndex()
+
+# stream-json 줄 파서 (이벤트/도구별 처리 등록표, orjson 선택 사용, 무시할 이벤트는 디코딩 생략)
+stream_parser = StreamParser(relative_path=get_relative_path, blobs=blob_store)
+
+# 연결된 클라이언트 관리 (클라이언트별 송신 큐 + writer 태스크)
+connected_clients = ClientHub()
+
+# 브로드캐스트 이벤트 로그 (seq 부여, 재연결 시 놓친 프레임 재전송)
+event_log = EventLog()
+
+# 버려도 되는 진행 상황 (느린 클라이언트의 큐가 가득 차면 먼저 버림)
+DROPPABLE_PROGRESS = {"tool_start", "tool_end"}
+progress_window = PROGRESS_BATCH_WINDOW  # 진행 상황 묶음 전송 시간 창 (초, --progress-window)
+stream_text = True  # 응답 텍스트를 message_delta로 스트리밍할지 여부 (--no-stream-text로 끔)
+
+# 요청 큐 / 워커 풀 관리
+DEFAULT_ROOM = "default"  # room 파라미터 없이 접속한 클라이언트가 공유하는 방
+DEFAULT_WORKERS = 2  # 동시에 실행할 Claude CLI 워커 수
+worker_count = DEFAULT_WORKERS
+sessions = {}  # 방 이름 -> ClaudeSession
+ready_sessions = None  # 처리 대기 중인 방 이름 큐 (asyncio.Queue, 서버 시작 시 생성)
+worker_tasks = []
+shutting_down = False  # 종료 중이면 중단된 요청을 완료로 기록하지 않음 (다음 시작 때 다시 처리)
+request_durations = DurationTracker()  # 최근 요청 처리 시간 (queue_status 예상 대기 시간)
+
+# 묶음 처리 (--batch): 방에 쌓인 대기 요청을 Claude CLI 한 번으로 처리
+batch_max = 1  # 묶음 하나에 넣을 최대 요청 수 (1이면 묶지 않음, --batch/--batch-max)
+batch_window = 0.0  # 대기 요청이 하나뿐일 때 후속 요청을 기다릴 시간 (초, --batch-window)
+batch_stats = {"runs": 0, "requests": 0}  # 묶음 처리한 CLI 실행 수 / 요청 수
+BATCH_PROMPT_HEADER = "(여러 사용자의 메시지를 한 번에 전달합니다. 각 메시지의 보낸 사람을 밝혀 모두에게 답해 주세요.)"
+
+# 무중단 재시작 (--supervisor, supervisor.py)
+supervised = False  # 감독 프로세스가 띄운 워커인지 여부 (restart 명령이 감독 프로세스에 교체 요청)
+handoff_pending = False  # 이전 워커의 저널 인계를 기다리는 중 (요청 처리 보류)
+draining = False  # 교체되는 중 (새 요청 처리를 시작하지 않음)
+
+# 관리자 권한 (--admin-key): 다른 사람의 요청 취소/순서 변경, 우선순위 올리기
+admin_key = None  # 관리자 키 (없으면 관리자 권한 없음)
+
+# 요청 큐 저널 (재시작/비정상 종료 후 대기 요청과 세션 ID 복원, --journal/--no-journal)
+DEFAULT_JOURNAL_PATH = os.path.join(SCRIPT_DIR, "data", "request_journal.jsonl")
+request_journal = RequestJournal()
+
+# 세션 레지스트리 (마지막 클라이언트가 나가도 세션 유지, 토큰으로 다시 연결, --session-registry)
+DEFAULT_SESSION_REGISTRY_PATH = os.path.join(SCRIPT_DIR, "data", "sessions.json")
+session_registry = SessionRegistry()
+session_idle_max = SESSION_IDLE_MAX  # 메모리에 유지할 최대 유휴 세션 수 (--session-idle-max)
+session_idle_ttl = SESSION_IDLE_TTL  # 유휴 세션을 메모리에 유지할 시간 (초, --session-idle-ttl)
+session_sweeper = None  # 유휴 세션 정리 태스크
+
+# 지표 (/metrics, Prometheus 텍스트 형식)
+METRIC_QUEUE_WAIT = registry.histogram(
+    "chat_queue_wait_seconds", "요청이 큐에 들어간 뒤 워커가 처리를 시작하기까지 걸린 시간")
+METRIC_SPAWN = registry.histogram(
+    "claude_spawn_seconds", "Claude CLI 프로세스 생성 시간 (예열 프로세스 사용 시 제외)", buckets=FAST_BUCKETS + (0.25, 0.5, 1))
+METRIC_FIRST_EVENT = registry.histogram(
+    "claude_first_event_seconds", "요청 시작부터 CLI 첫 출력까지 걸린 시간", ("start",))
+METRIC_INIT = registry.histogram(
+    "claude_init_seconds", "요청 시작부터 system/init 이벤트까지 걸린 시간")
+METRIC_FIRST_ASSISTANT = registry.histogram(
+    "claude_first_assistant_seconds", "요청 시작부터 첫 assistant 이벤트(텍스트 델타 포함)까지 걸린 시간")
+METRIC_TOOL = registry.histogram(
+    "claude_tool_seconds", "도구 실행 시간 (tool_start부터 tool_end까지)", ("tool",))
+METRIC_REQUEST = registry.histogram(
+    "claude_request_seconds", "Claude 요청 전체 처리 시간", ("outcome",))
+METRIC_REQUESTS = registry.counter(
+    "claude_requests_total", "처리한 Claude 요청 수", ("outcome",))
+METRIC_CPU = registry.histogram(
+    "claude_cpu_seconds", "요청 하나의 Claude CLI 프로세스 트리 CPU 시간 (user+system)",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+METRIC_PEAK_RSS = registry.histogram(
+    "claude_peak_rss_bytes", "요청 하나의 Claude CLI 프로세스 트리 최대 RSS",
+    buckets=tuple(mb * 1024 * 1024 for mb in (64, 128, 256, 512, 1024, 2048, 4096)))
+METRIC_COST = registry.counter(
+    "claude_cost_usd_total", "result 이벤트로 보고된 Claude 비용 합계 (USD)")
+METRIC_QUEUE_REJECTED = registry.counter(
+    "chat_queue_rejected_total", "대기열 한도로 거부한 요청 수", ("reason",))
+METRIC_QUEUE_CANCELLED = registry.counter(
+    "chat_queue_cancelled_total", "cancel 명령으로 취소한 요청 수", ("state",))
+METRIC_BATCH_SIZE = registry.histogram(
+    "chat_batch_size", "Claude CLI 실행 한 번에 처리한 요청 수", buckets=(1, 2, 3, 5, 8, 13))
+METRIC_BROADCAST = registry.histogram(
+    "chat_broadcast_seconds", "브로드캐스트 한 번의 인코딩 + 클라이언트 큐 분배 시간", buckets=FAST_BUCKETS)
+METRIC_BROADCAST_FRAMES = registry.counter(
+    "chat_broadcast_frames_total", "클라이언트 큐에 넣은 프레임 수", ("type",))
+registry.gauge("chat_connected_clients", "연결된 WebSocket 클라이언트 수", lambda: len(connected_clients))
+registry.gauge("chat_queue_depth", "대기 중인 요청 수 (처리 중인 요청 포함)",
+               lambda: sum(len(session.queue) for session in sessions.values()))
+registry.gauge("chat_sessions_processing", "Claude 요청을 처리 중인 세션 수",
+               lambda: sum(1 for session in sessions.values() if session.processing))
+registry.gauge("chat_sessions_idle", "클라이언트 없이 메모리에 유지 중인 유휴 세션 수",
+               lambda: sum(1 for session in sessions.values() if session.idle))
+registry.gauge("claude_warm_processes", "대기 중인 예열 Claude CLI 프로세스 수", lambda: len(warm_pool.idle))
+registry.gauge("chat_blob_memory_bytes", "메모리에 보관 중인 Edit/Write 본문 크기", lambda: blob_store.memory_bytes)
+registry.gauge("chat_blob_disk_bytes", "디스크에 보관 중인 Edit/Write 본문 크기", lambda: blob_store.disk_bytes)
+registry.counter("claude_stream_lines_total", "처리한 stream-json 줄 수",
+                 callback=lambda: stream_parser.stats["lines"])
+registry.counter("claude_stream_lines_skipped_total", "디코딩 없이 건너뛴 stream-json 줄 수",
+                 callback=lambda: stream_parser.stats["skipped"])
+registry.counter("chat_log_records_total", "로그 큐에 넣은 레코드 수",
+                 callback=lambda: log_pipeline.summary().get("records", 0))
+registry.counter("chat_log_dropped_total", "로그 큐가 가득 차서 버린 레코드 수",
+                 callback=lambda: log_pipeline.summary().get("dropped", 0))
+registry.counter("chat_log_emit_seconds_total", "이벤트 루프 쪽에서 로그 처리(큐에 넣기)에 쓴 시간 합계",
+                 callback=lambda: log_pipeline.handler.emit_seconds if log_pipeline.handler else 0)
+
+
+class ClaudeSession:
+    """방(room)별 Claude 세션 상태와 요청 큐
+
+    같은 방의 요청은 순서대로 하나씩 처리되고, 서로 다른 방은 워커 풀에서 병렬 처리된다.
+    """
+
+    def __init__(self, room: str):
+        self.room = room
+        self.session_id = str(uuid.uuid4())
+        self.session_started = False
+        self.token = new_token()  # 다시 연결할 때 쓰는 세션 토큰 (hello 프레임으로 전달)
+        self.owner = None  # 첫 요청을 보낸 사람
+        self.last_active = time.time()
+        self.processing = False
+        self.stop_event = None
+        self.queue = FairQueue()  # 처리 중/대기 중인 요청 (보낸 사람별 공정 분배, scheduler.py)
+        self.scheduled = False  # ready_sessions에 등록되었거나 워커가 처리 중인지 여부
+        self.progress = None  # 진행 상황 묶음 전송기 (ProgressBatcher, 첫 전송 시 생성)
+
+    def reset(self) -> str:
+        """Claude 세션 리셋"""
+        old_session_id = self.session_id
+        # 이전 세션용 예열 프로세스는 더 이상 쓰이지 않음
+        warm_pool.discard(lambda cmd: old_session_id in cmd)
+        self.session_id = str(uuid.uuid4())
+        self.session_started = False
+        request_journal.session(self.room, self.session_id, False)
+        self.remember()
+        log.info(f"[세션] 리셋됨 ({self.room}): {self.session_id}")
+        return self.session_id
+
+    @property
+    def idle(self) -> bool:
+        """클라이언트도 처리할 요청도 없는 상태 (메모리에서 정리 가능)"""
+        return (not self.processing and not self.scheduled and not len(self.queue)
+                and not connected_clients.has_room(self.room))
+
+    def remember(self, touch: bool = True):
+        """레지스트리에 현재 상태 기록 (touch: 마지막 활동 시각 갱신, 아직 이어 갈 대화가 없으면 기록하지 않음)"""
+        if touch:
+            self.last_active = time.time()
+        if not self.session_started:
+            session_registry.remove(self.token)
+            return
+        session_registry.record(self.token, self.room, self.session_id, self.session_started,
+                                self.owner, self.last_active)
+
+    def stop(self):
+        """처리 중인 Claude 작업 중단"""
+        if self.processing and self.stop_event:
+            self.stop_event.set()
+            log.info(f"[정리] 처리 중인 Claude 작업 중단 ({self.room})")
+
+
+def get_session(room: str) -> ClaudeSession:
+    """방 이름으로 세션 조회 (없으면 생성)"""
+    session = sessions.get(room)
+    if session is None:
+        session = ClaudeSession(room)
+        sessions[room] = session
+        # 저널에 남은 세션이 있으면 이어서 사용 (첫 요청부터 -r로 재개)
+        saved = request_journal.sessions.get(room)
+        if saved:
+            session.session_id = saved["session_id"]
+            session.session_started = saved["started"]
+            # 레지스트리에 같은 세션이 있으면 그 토큰과 소유자를 이어서 사용
+            for token, entry in session_registry.entries.items():
+                if entry["session_id"] == session.session_id:
+                    session.token, session.owner = token, entry.get("owner")
+                    break
+            log.info(f"[세션] 복원됨 ({room}): {session.session_id} (재개: {session.session_started})")
+        else:
+            log.info(f"[세션] 생성됨 ({room}): {session.session_id}")
+        session.remember()
+    return session
+
+
+def attach_session(room: str, token: str = None):
+    """접속한 클라이언트의 세션 (토큰이 이 방의 저장된 세션이면 그 세션으로 다시 연결)
+
+    방에 다른 세션이 사용 중(클라이언트 접속/요청 처리 중)이면 그 세션에 참여한다.
+    반환: (세션, 토큰으로 다시 연결했는지 여부)
+    """
+    entry = session_registry.get(token)
+    session = sessions.get(room)
+    if entry is None or entry["room"] != room or (session is not None and session.token == token):
+        return get_session(room), False
+    if session is None:
+        session = ClaudeSession(room)
+        sessions[room] = session
+    elif session.idle:
+        old_session_id = session.session_id
+        warm_pool.discard(lambda cmd: old_session_id in cmd)
+    else:
+        return session, False
+    session.token = token
+    session.session_id = entry["session_id"]
+    session.session_started = entry["started"]
+    session.owner = entry.get("owner")
+    request_journal.session(room, session.session_id, session.session_started)
+    session.remember()
+    session_registry.stats["resumed"] += 1
+    log.info(f"[세션] 토큰으로 다시 연결 ({room}): {session.session_id} (재개: {session.session_started})")
+    return session, True
+
+
+def evict_idle_sessions():
+    """오래되었거나 개수를 넘은 유휴 세션을 메모리에서 정리 (레지스트리에는 남아 토큰으로 다시 연결 가능)"""
+    idle = [(room, session.last_active) for room, session in sessions.items() if session.idle]
+    for room in select_evictions(idle, time.time(), session_idle_max, session_idle_ttl):
+        session = sessions.pop(room)
+        session.remember(touch=False)
+        old_session_id = session.session_id
+        warm_pool.discard(lambda cmd: old_session_id in cmd)
+        request_journal.end_session(room)
+        session_registry.stats["evicted"] += 1
+        log.info(f"[세션] 유휴 세션 정리 ({room}): {session.session_id}")
+    # 토큰으로 다시 연결할 수 없게 된 세션의 대화 기록도 삭제
+    for token in session_registry.prune({session.token for session in sessions.values()}):
+        transcripts.remove(token)
+        search_index.remove(token)
+
+
+async def sweep_sessions():
+    """유휴 세션 주기적 정리 (TTL 경과 확인)"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        evict_idle_sessions()
+
+
+def restore_journal():
+    """저널에 남은 완료되지 않은 요청으로 방별 큐를 다시 구성하고 처리 예약
+
+    인계 중에 이 프로세스가 먼저 받은 요청도 저널에 들어 있으므로,
+    저널 순서(이전 워커가 받은 요청이 먼저)대로 큐를 다시 만든다.
+    """
+    queued = {request["id"]: request for session in sessions.values() for request in session.queue}
+    queues = {}
+    for request in request_journal.pending.values():
+        item = queued.get(request["id"]) or {
+            "id": request["id"],
+            "sender": request["sender"],
+            "owner": request.get("owner"),
+            "message": request["message"],
+            "priority": request.get("priority"),
+            "enqueued_at": asyncio.get_event_loop().time()
         }
-    except subprocess.TimeoutExpired:
-        print("[DEBUG] ccusage blocks 타임아웃")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"[DEBUG] ccusage blocks JSON 파싱 실패: {e}")
-        return None
-    except Exception as e:
-        print(f"[DEBUG] ccusage blocks 오류: {e}")
-        return None
+        queues.setdefault(request["room"], []).append(item)
+    for room, items in queues.items():
+        session = get_session(room)
+        restored = len(items) - sum(1 for item in session.queue if item["id"] in request_journal.pending)
+        session.queue.restore(items)
+        if not session.scheduled:
+            session.scheduled = True
+            ready_sessions.put_nowait(room)
+        if restored:
+            log.info(f"[저널] 대기 요청 다시 처리 ({room}): {restored}개")
 
 
 def test_claude_cli():
-    """Claude CLI 호출 테스트"""
+    """Claude CLI 실행 확인 (--version, 과금되는 프롬프트를 보내지 않음)"""
     try:
-        cmd = 'claude "test"'
-        print(f"[테스트] {cmd}")
+        cmd = [shutil.which("claude") or "claude", "--version"]
+        print(f"[테스트] {' '.join(cmd)}")
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
             encoding="utf-8",
-            shell=True,
-            timeout=60
+            timeout=15
         )
+        if result.returncode == 0 and result.stdout:
+            print(f"  버전: {result.stdout.strip()}")
         return result.returncode == 0 and result.stdout
     except subprocess.TimeoutExpired:
         print("  타임아웃: Claude CLI 응답 없음")
@@ -178,481 +379,889 @@ def test_claude_cli():
         return False
 
 
-def run_claude_stream(prompt: str, output_queue: Queue, stop_event: threading.Event,
-                      sess_id: str = None, is_resume: bool = False):
-    """별도 스레드에서 Claude CLI 스트리밍 실행"""
-    process = None
-    try:
-        cmd = 'claude --output-format stream-json --verbose --dangerously-skip-permissions'
-        if sess_id:
-            if is_resume:
-                cmd += f' -r "{sess_id}"'
-                print(f"[DEBUG] 세션 재개: {sess_id}")
-            else:
-                cmd += f' --session-id "{sess_id}"'
-                print(f"[DEBUG] 새 세션: {sess_id}")
-        cmd += ' -p -'
-        print(f"[실행] {cmd}")
+def build_claude_command(sess_id: str = None, is_resume: bool = False, partial: bool = False) -> list:
+    """Claude CLI 실행 인자 목록 생성 (partial이면 텍스트 델타 stream_event 포함)"""
+    claude_bin = shutil.which("claude") or "claude"
+    cmd = [claude_bin, "--output-format", "stream-json", "--verbose", "--dangerously-skip-permissions"]
+    if partial:
+        cmd.append("--include-partial-messages")
+    if sess_id:
+        if is_resume:
+            cmd += ["-r", sess_id]
+        else:
+            cmd += ["--session-id", sess_id]
+    cmd += ["-p", "-"]
+    return cmd
+
+
+# Claude CLI 프로세스 자원 한도 (--claude-memory/--claude-cpu/--claude-files, 0이면 없음)
+claude_limits = ResourceLimits()
+
+# Claude CLI 예열 프로세스 풀 (다음 요청의 명령줄로 미리 시작, --warm-pool)
+warm_pool = WarmPool(WARM_POOL_SIZE, limit=STREAM_LINE_LIMIT, limits=claude_limits)
+
+
+async def run_claude_stream(prompt: str, stop_event: asyncio.Event, sess_id: str = None,
+                            is_resume: bool = False, timeout: float = CLAUDE_TIMEOUT,
+                            partial: bool = False, usage: TreeUsage = None):
+    """Claude CLI를 asyncio 서브프로세스로 실행하고 출력 이벤트를 순서대로 반환 (async generator)
+
+    반환 이벤트: ("line", str), ("stderr", str), ("error", str), ("timeout", 초), ("done", returncode)
+    stop_event가 설정되거나 타임아웃되면 프로세스를 종료하고 generator를 끝낸다.
+    끝날 때는 CLI가 띄운 자손 프로세스까지 모두 종료한다.
+    usage를 주면 실행 중 프로세스 트리의 CPU 시간/RSS를 측정하고, 트리 RSS가
+    메모리 한도를 넘으면 종료 후 ("error", ...)를 보낸다.
+    """
+    cmd = build_claude_command(sess_id, is_resume, partial)
+    if sess_id:
+        claude_log.debug(f"[Claude] {'세션 재개' if is_resume else '새 세션'}: {sess_id}")
+
+    loop = asyncio.get_event_loop()
+    started_at = loop.time()
+    process = warm_pool.acquire(cmd)
+    warm = process is not None
+    claude_log.info(f"[실행] {' '.join(cmd)}{' (예열)' if warm else ''}")
+
+    if process is None:
+        try:
+            process = await spawn_claude(cmd, STREAM_LINE_LIMIT, claude_limits)
+        except Exception as e:
+            yield ("error", f"Claude CLI 실행 실패: {e}")
+            return
+        METRIC_SPAWN.observe(loop.time() - started_at)
 
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            shell=True,
-            text=True,
-            encoding="utf-8",
-            bufsize=1
-        )
+    events = asyncio.Queue()
 
-        # stdin으로 프롬프트 전달
-        process.stdin.write(prompt)
-        process.stdin.close()
-
-        # stderr 읽기 스레드
-        def read_stderr():
-            try:
-                while not stop_event.is_set():
-                    line = process.stderr.readline()
-                    if not line:
-                        break
-                    line = line.strip()
-                    if line:
-                        output_queue.put(("stderr", line))
-            except Exception:
-                pass
-
-        stderr_thread = threading.Thread(target=read_stderr, daemon=True)
-        stderr_thread.start()
-
-        # stdout 읽기
+    async def read_lines(stream, kind):
+        """스트림을 줄 단위로 읽어 이벤트 큐에 전달"""
         try:
-            while not stop_event.is_set():
-                line = process.stdout.readline()
-                if not line:
+            while True:
+                raw = await stream.readline()
+                if not raw:
                     break
-                line = line.strip()
+                line = raw.decode("utf-8", errors="replace").strip()
                 if line:
-                    output_queue.put(("line", line))
+                    events.put_nowait((kind, line))
         except Exception as e:
-            output_queue.put(("error", f"stdout 읽기 오류: {e}"))
+            events.put_nowait(("error", f"{kind} 읽기 오류: {e}"))
 
-        # 프로세스 종료 대기
+    async def write_prompt():
+        """stdin으로 프롬프트 전달 후 닫기"""
         try:
-            process.wait(timeout=10)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            process.wait()
-
-        output_queue.put(("done", process.returncode))
+            process.stdin.write(prompt.encode("utf-8"))
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            process.stdin.close()
+
+    async def wait_exit():
+        """stdout/stderr 종료 후 프로세스 종료 코드 전달"""
+        await asyncio.gather(stdout_task, stderr_task)
+        returncode = await process.wait()
+        events.put_nowait(("done", returncode))
+
+    async def sample_usage():
+        """프로세스 트리 자원 사용량 주기적 측정 (트리 전체 메모리 한도 확인)"""
+        while True:
+            usage.sample()
+            if claude_limits.memory_mb and usage.rss_bytes > claude_limits.memory_bytes:
+                rss_mb = usage.rss_bytes / 1024 / 1024
+                claude_log.warning(f"[Claude] 메모리 한도 초과 ({rss_mb:.0f}MB > {claude_limits.memory_mb}MB) - 종료")
+                kill_tree(process, usage.escaped)
+                events.put_nowait(("error", f"메모리 한도 초과 ({rss_mb:.0f}MB > {claude_limits.memory_mb}MB)"))
+                return
+            await asyncio.sleep(PROC_SAMPLE_INTERVAL)
+
+    stdout_task = asyncio.ensure_future(read_lines(process.stdout, "line"))
+    stderr_task = asyncio.ensure_future(read_lines(process.stderr, "stderr"))
+    tasks = [asyncio.ensure_future(write_prompt()), stdout_task, stderr_task]
+    tasks.append(asyncio.ensure_future(wait_exit()))
+    if usage is not None:
+        usage.pid = process.pid
+        if usage.available:
+            tasks.append(asyncio.ensure_future(sample_usage()))
+    stop_task = asyncio.ensure_future(stop_event.wait())
+
+    deadline = loop.time() + timeout
+    first_event = True
+    try:
+        while True:
+            # 중단 요청은 이미 쌓인 이벤트보다 먼저 처리 (이벤트를 꺼내기 전마다 확인)
+            if stop_event.is_set():
+                return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                yield ("timeout", timeout)
+                return
 
-    except Exception as e:
-        output_queue.put(("error", str(e)))
+            if not events.empty():
+                item = events.get_nowait()
+            else:
+                get_task = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait(
+                    {get_task, stop_task},
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if stop_task in done:
+                    get_task.cancel()
+                    return
+                if get_task not in done:
+                    get_task.cancel()
+                    continue
+                item = get_task.result()
+            if first_event and item[0] == "line":
+                first_event = False
+                elapsed = loop.time() - started_at
+                warm_pool.record_startup(warm, elapsed)
+                METRIC_FIRST_EVENT.observe(elapsed, start="warm" if warm else "cold")
+                claude_log.info(f"[Claude] 첫 이벤트까지 {elapsed:.2f}초 ({'예열' if warm else '콜드'})")
+            yield item
+            if item[0] == "done":
+                return
     finally:
-        if process and process.poll() is None:
-            try:
-                process.kill()
-                process.wait(timeout=5)
-            except:
-                pass
-
-
-async def broadcast(message: dict, exclude=None):
-    """모든 클라이언트에게 메시지 전송"""
+        stop_task.cancel()
+        if usage is not None:
+            usage.sample()  # 종료 직전 마지막 측정
+        # 정상 종료여도 백그라운드로 남은 자손이 있을 수 있으므로 항상 트리 전체 종료
+        kill_tree(process, usage.escaped if usage is not None else ())
+        for task in tasks:
+            task.cancel()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            pass
+
+
+async def broadcast(message: dict, exclude=None, room: str = None, droppable: bool = False):
+    """모든 클라이언트에게 메시지 전송 (room 지정 시 해당 방의 클라이언트에게만)
+
+    메시지는 seq가 붙어 한 번만 인코딩되고 이벤트 로그에 보관된 뒤(재연결 시 재전송용)
+    각 클라이언트의 송신 큐에 들어가며, 전송 완료를 기다리지 않는다.
+    droppable이면 느린 클라이언트의 큐가 가득 찼을 때 버려질 수 있다.
+    """
+    loop = asyncio.get_event_loop()
+    started_at = loop.time()
+    text = event_log.record(message, room)
+    # 방의 대화 기록에 요약하여 추가하고 검색 색인 (클라이언트가 없어도 기록)
+    session = sessions.get(room) if room else None
+    if session is not None:
+        entries = condense_frame(message)
+        if entries:
+            first_item = transcripts.append(session.token, entries)
+            search_index.add(entries, session.token, room, session.session_id, first_item)
     if not connected_clients:
         return
+    connected_clients.broadcast(text, room=room, exclude=exclude, droppable=droppable)
+    METRIC_BROADCAST.observe(loop.time() - started_at)
+    METRIC_BROADCAST_FRAMES.inc(type=message.get("type", ""))
+
+
+async def send_progress(session: ClaudeSession, progress_type: str, data: dict):
+    """진행 상황을 세션의 방에 브로드캐스트
+
+    tool_start/tool_end는 progress_window 동안 모아 progress_batch 프레임으로 보내고,
+    그 외 이벤트는 모인 이벤트와 함께 즉시 보낸다.
+    """
+    if session.progress is None:
+        session.progress = ProgressBatcher(lambda events: emit_progress(session, events), progress_window)
+    await session.progress.add(
+        {"progress_type": progress_type, **data},
+        immediate=progress_type not in DROPPABLE_PROGRESS
+    )
+
+
+async def emit_progress(session: ClaudeSession, events: list):
+    """모인 진행 상황 이벤트 전송 (1개면 progress, 여러 개면 progress_batch 프레임)"""
+    droppable = all(event["progress_type"] in DROPPABLE_PROGRESS for event in events)
+    if len(events) == 1:
+        await broadcast({"type": "progress", **events[0]}, room=session.room, droppable=droppable)
+    else:
+        await broadcast({
+            "type": "progress_batch",
+            "events": events
+        }, room=session.room, droppable=droppable)
+
+
+async def send_queue_status(session: ClaudeSession):
+    """세션의 큐 상태(처리 중인 요청, 대기 요청별 순서/예상 대기 시간)를 해당 방에 브로드캐스트
+
+    예상 대기 시간: 최근 요청 처리 시간 평균으로 처리 중인 요청의 남은 시간 + 앞선 대기 요청 수만큼
+    """
+    average = request_durations.average()
+    now = asyncio.get_event_loop().time()
+    remaining = 0.0
+    processing = None
+    current = session.queue.current
+    if current is not None:
+        elapsed = now - current.get("started_at", now)
+        remaining = max(0.0, average - elapsed)
+        processing = {
+            "id": current["id"],
+            "sender": current["sender"],
+            "message": current["message"][:50] + ("..." if len(current["message"]) > 50 else ""),
+            "elapsed_sec": round(elapsed)
+        }
 
-    message_str = json.dumps(message, ensure_ascii=False)
-    disconnected = set()
-    for client in connected_clients.copy():
-        if client != exclude:
-            try:
-                await client.send_str(message_str)
-            except Exception:
-                disconnected.add(client)
-
-    for client in disconnected:
-        connected_clients.discard(client)
-
-
-async def send_progress(progress_type: str, data: dict):
-    """진행 상황 브로드캐스트"""
-    await broadcast({
-        "type": "progress",
-        "progress_type": progress_type,
-        **data
-    })
-
-
-async def send_queue_status():
-    """현재 큐 상태를 모든 클라이언트에게 브로드캐스트"""
     items = []
-    for req in request_queue:
+    for position, req in enumerate(session.queue.ordered(), 1):
         items.append({
+            "id": req["id"],
             "sender": req["sender"],
-            "message": req["message"][:50] + ("..." if len(req["message"]) > 50 else "")
+            "message": req["message"][:50] + ("..." if len(req["message"]) > 50 else ""),
+            "priority": req["priority"],
+            "position": position,
+            "eta_sec": round(remaining + (position - 1) * average)
         })
 
     await broadcast({
         "type": "queue_status",
-        "count": len(request_queue),
-        "items": items
-    })
+        "count": len(session.queue),
+        "processing": processing,
+        "items": items,
+        "avg_duration_sec": round(average, 1)
+    }, room=session.room)
 
 
-async def send_usage_status():
-    """Claude 사용량 상태를 모든 클라이언트에게 브로드캐스트"""
-    try:
-        # 별도 스레드에서 ccusage 실행 (비동기) - daily와 blocks 병렬 실행
-        loop = asyncio.get_event_loop()
-        usage_task = loop.run_in_executor(None, get_claude_usage)
-        blocks_task = loop.run_in_executor(None, get_claude_blocks)
+async def send_usage_status(data: dict = None, client=None):
+    """Claude 사용량 상태 전송 (client 지정 시 해당 클라이언트에게만, 아니면 전체 브로드캐스트)
+
+    data가 없으면 캐시된 값 + 사용량 장부의 미반영 값을 사용하며, 외부 조회를 기다리지 않는다.
+    """
+    if data is None:
+        data = usage_service.snapshot()
+    if not data:
+        return
 
-        usage = await usage_task
-        blocks = await blocks_task
+    message = {"type": "usage_status", **data}
+    if client is not None:
+        connected_clients.send_to(client, encode(message))
+        return
 
-        # 데이터 병합
-        combined_data = {}
-        if usage:
-            combined_data["today"] = usage.get("today")
-            combined_data["totals"] = usage.get("totals")
-            combined_data["date"] = usage.get("date")
+    await broadcast(message)
 
-        if blocks:
-            combined_data["block"] = blocks
+    # 디버그 로그
+    today_cost = data.get("today", {})
+    if today_cost:
+        cost_usd = today_cost.get("totalCost", 0)
+        cost_krw = cost_usd * USD_TO_KRW
+        log.debug(f"[사용량] 사용량 전송: 오늘 ${cost_usd:.2f} (₩{cost_krw:,.0f})")
 
-        if combined_data:
-            await broadcast({
-                "type": "usage_status",
-                **combined_data
-            })
-
-            # 디버그 로그
-            today_cost = combined_data.get("today", {})
-            if today_cost:
-                cost_usd = today_cost.get("totalCost", 0)
-                cost_krw = cost_usd * USD_TO_KRW
-                print(f"[DEBUG] 사용량 전송: 오늘 ${cost_usd:.2f} (₩{cost_krw:,.0f})")
-
-            if blocks:
-                remaining = blocks.get("remainingMinutes", 0)
-                block_cost = blocks.get("costUSD", 0)
-                print(f"[DEBUG] 블록 전송: ${block_cost:.2f}, 남은 시간: {remaining}분")
+    blocks = data.get("block")
+    if blocks:
+        remaining = blocks.get("remainingMinutes", 0)
+        block_cost = blocks.get("costUSD", 0)
+        log.debug(f"[사용량] 블록 전송: ${block_cost:.2f}, 남은 시간: {remaining}분")
 
-    except Exception as e:
-        print(f"[경고] 사용량 상태 전송 실패: {e}")
 
+# 요청별 사용량 장부 (result 이벤트 누적, --ledger-db 지정 시 SQLite 저장)
+usage_ledger = UsageLedger()
 
-async def add_to_queue(message: str, sender: str):
-    """요청을 큐에 추가"""
-    async with queue_lock:
-        request_queue.append({
-            "sender": sender,
-            "message": message
-        })
-        print(f"[큐] 요청 추가: {sender} (대기: {len(request_queue)}개)")
-        await send_queue_status()
+# 사용량 서비스 (캐시/백그라운드 갱신, 값이 바뀔 때만 브로드캐스트)
+# 외부 조회 사이의 요청 사용량은 장부에서 더해 준다.
+usage_service = UsageService(on_change=send_usage_status, ledger=usage_ledger)
 
-    # 처리 시작 (처리 중이 아닐 때만)
-    if not claude_processing:
-        asyncio.create_task(process_queue())
 
+async def start_usage_service(app):
+    """서버 시작 시 사용량 백그라운드 갱신 시작"""
+    usage_service.start()
 
-async def process_queue():
-    """큐에서 요청을 꺼내 순차 처리"""
-    global claude_processing
 
+async def stop_usage_service(app):
+    """서버 종료 시 사용량 백그라운드 갱신 중지"""
+    await usage_service.stop()
+    usage_ledger.close()
+
+
+def is_admin(key) -> bool:
+    """관리자 키가 설정되어 있고 key와 일치하는지 여부"""
+    if not admin_key or not isinstance(key, str):
+        return False
+    return hmac.compare_digest(key.encode("utf-8"), admin_key.encode("utf-8"))
+
+
+def reject_reason(session: ClaudeSession, sender: str, owner: str):
+    """대기열 한도로 요청을 거부해야 하면 사유 (scheduler.REJECT_MESSAGES 키), 아니면 None"""
+    total_waiting = sum(s.queue.waiting for s in sessions.values())
+    reason = session.queue.reject_reason(owner, total_waiting)
+    if reason:
+        METRIC_QUEUE_REJECTED.inc(reason=reason)
+        queue_log.info(f"[큐] 요청 거부 ({session.room}): {sender} - {reason}")
+    return reason
+
+
+async def add_to_queue(session: ClaudeSession, message: str, sender: str, priority: str = None,
+                       owner: str = None):
+    """요청을 세션 큐에 추가하고 워커에 처리 예약 (owner: 요청을 보낸 연결의 서버 쪽 ID)"""
+    request_id = uuid.uuid4().hex[:12]
+    priority = normalize_priority(priority)
+    session.queue.push({
+        "id": request_id,
+        "sender": sender,
+        "owner": owner,
+        "message": message,
+        "priority": priority,
+        "enqueued_at": asyncio.get_event_loop().time()
+    })
+    # 저널 기록은 버퍼에만 추가 (파일 쓰기는 백그라운드에서 묶어 처리)
+    request_journal.enqueue(request_id, session.room, sender, message, priority, owner)
+    if session.owner is None:
+        session.owner = sender
+    session.remember()
+    queue_log.info(f"[큐] 요청 추가 ({session.room}): {sender} (대기: {session.queue.waiting}개, 우선순위: {priority})")
+
+    # 처리 예약 (이미 예약되었거나 처리 중이면 워커가 이어서 처리)
+    if not session.scheduled:
+        session.scheduled = True
+        ready_sessions.put_nowait(session.room)
+
+    await send_queue_status(session)
+
+
+async def cancel_request(session: ClaudeSession, request_id: str) -> bool:
+    """대기 중인 요청은 큐에서 제거, 처리 중인 요청은 Claude 작업 중단 (없으면 False)"""
+    if session.queue.is_current(request_id):
+        # 묶음 처리 중이면 묶음 전체를 중단
+        METRIC_QUEUE_CANCELLED.inc(state="processing")
+        queue_log.info(f"[큐] 처리 중인 요청 취소 ({session.room}): {session.queue.current['sender']}")
+        session.stop()
+        return True
+    request = session.queue.remove(request_id)
+    if request is None:
+        return False
+    METRIC_QUEUE_CANCELLED.inc(state="queued")
+    request_journal.complete(request_id)
+    queue_log.info(f"[큐] 대기 요청 취소 ({session.room}): {request['sender']} (대기: {session.queue.waiting}개)")
+    await send_queue_status(session)
+    return True
+
+
+async def claude_worker(worker_id: int):
+    """ready_sessions에서 방을 꺼내 해당 세션의 다음 차례 요청을 하나씩 처리하는 워커"""
+    loop = asyncio.get_event_loop()
     while True:
-        async with queue_lock:
-            if not request_queue:
-                print("[큐] 모든 요청 처리 완료")
-                return
-            request = request_queue[0]  # peek (아직 제거하지 않음)
+        room = await ready_sessions.get()
+        session = sessions.get(room)
+        if session is None or not session.queue.waiting or draining:
+            # 교체 중이면 남은 요청은 저널을 통해 새 워커가 처리
+            if session:
+                session.scheduled = False
+            continue
+
+        if batch_max > 1 and batch_window and session.queue.waiting == 1:
+            # 묶음 처리: 뒤이어 오는 요청을 잠시 기다림 (그 사이 취소/교체되면 다시 확인)
+            await asyncio.sleep(batch_window)
+            if not session.queue.waiting or draining:
+                session.scheduled = False
+                continue
 
-        # 요청 처리
-        await ask_claude(request["message"], request["sender"])
+        # 처리 중으로 표시 (완료 시 finish), 묶음 처리면 대기 요청 여러 개를 묶은 요청
+        request = session.queue.pop_batch(batch_max, BATCH_MAX_CHARS)
+        batch = request.get("batch")
+        originals = batch or [request]
+        request["started_at"] = loop.time()
+        log_token = bind(room=room, request_id=request["id"])
+        queue_log.info(f"[워커 {worker_id}] 처리 시작 ({room})" + (f" - 요청 {len(batch)}개 묶음" if batch else ""))
+        METRIC_BATCH_SIZE.observe(len(originals))
+        for original in originals:
+            METRIC_QUEUE_WAIT.observe(request["started_at"] - original["enqueued_at"])
+            request_journal.start(original["id"])
+        if batch:
+            batch_stats["runs"] += 1
+            batch_stats["requests"] += len(batch)
+        await send_queue_status(session)
+
+        try:
+            await ask_claude(session, request["message"], request["sender"], batch=batch)
+        finally:
+            session.queue.finish(request)
+            request_durations.add(loop.time() - request["started_at"])
+            queue_log.info(f"[큐] 요청 완료 ({room}, 남은: {session.queue.waiting}개)")
+            if not shutting_down:
+                for original in originals:
+                    request_journal.complete(original["id"])
+
+            # 남은 요청이 있으면 다시 예약 (다른 방과 번갈아 처리)
+            if session.queue.waiting:
+                ready_sessions.put_nowait(room)
+            else:
+                session.scheduled = False
+                queue_log.info(f"[큐] 모든 요청 처리 완료 ({room})")
+
+        await send_queue_status(session)
+        # 이 방의 다음 요청에 쓰일 Claude CLI 프로세스 예열
+        if not draining:
+            prewarm_session(session)
+        # 장부에 반영된 사용량 전송 (외부 조회는 백그라운드 주기에 맞춰 대조)
+        await send_usage_status()
+        unbind(log_token)
+
+
+def prewarm_session(session: ClaudeSession):
+    """세션의 다음 요청 명령줄로 예열 프로세스 시작"""
+    warm_pool.prewarm(build_claude_command(session.session_id, session.session_started, stream_text))
+
+
+async def start_workers(app):
+    """서버 시작 시 Claude 워커 풀 생성"""
+    global ready_sessions
+    ready_sessions = asyncio.Queue()
+    if handoff_pending:
+        # 이전 워커가 처리 중인 요청을 끝내고 저널을 넘겨줄 때까지 요청은 큐에만 쌓음
+        log.info("[워커] 이전 워커의 저널 인계 대기 - 요청 처리 보류")
+        return
+    launch_workers()
+
+
+def launch_workers():
+    """저널 복원 후 워커 생성"""
+    global session_sweeper
+    request_journal.start_writer()
+    session_registry.start_writer()
+    transcripts.start_writer()
+    search_index.start_writer()
+    warm_pool.start()
+    session_sweeper = asyncio.ensure_future(sweep_sessions())
+    restore_journal()
+    for worker_id in range(1, worker_count + 1):
+        worker_tasks.append(asyncio.ensure_future(claude_worker(worker_id)))
+    log.info(f"[워커] {worker_count}개 시작")
+    if claude_limits.enabled:
+        log.info(f"[워커] Claude CLI 자원 한도: {claude_limits.describe()}")
+    if batch_max > 1:
+        log.info(f"[워커] 묶음 처리: 최대 {batch_max}개, 대기 {int(batch_window * 1000)}ms")
+    # 기본 방의 첫 요청용 프로세스 예열
+    prewarm_session(get_session(DEFAULT_ROOM))
+
+
+def complete_handoff():
+    """이전 워커 종료 후 (SIGUSR1) 저널을 읽어 세션/대기 요청을 이어받고 처리 시작"""
+    global handoff_pending
+    if not handoff_pending:
+        return
+    handoff_pending = False
+    request_journal.load()
+    session_registry.load()  # 이전 워커가 종료하면서 쓴 최신 상태와 합침
+    # 인계 전에 생성된 세션은 저장된 세션 ID로 교체 (다음 요청이 -r로 이어서 실행)
+    for room, session in sessions.items():
+        saved = request_journal.sessions.get(room)
+        if saved and not session.session_started and saved["session_id"] != session.session_id:
+            old_session_id = session.session_id
+            warm_pool.discard(lambda cmd: old_session_id in cmd)
+            session.session_id = saved["session_id"]
+            session.session_started = saved["started"]
+            log.info(f"[세션] 복원됨 ({room}): {session.session_id} (재개: {session.session_started})")
+    log.info("[재시작] 저널 인계 완료")
+    launch_workers()
+
+
+async def drain_worker(site):
+    """교체되는 워커 정리 (SIGTERM): 수신 중단 → 처리 중인 요청 완료 → 재연결 안내
+
+    처리 중인 방의 클라이언트는 응답을 끝까지 받은 뒤에 재연결하도록 안내한다.
+    아직 시작하지 않은 요청은 저널을 통해 새 워커가 처리한다.
+    """
+    global draining
+    draining = True
+    await site.stop()
+    log.info("[재시작] 새 연결 수신 중단 - 처리 중인 요청 완료 대기")
+
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + CLAUDE_TIMEOUT + 30
+    notified = set()
+    reconnect_frame = encode({
+        "type": "reconnect",
+        "message": "서버가 교체되었습니다. 새 서버로 다시 연결합니다."
+    })
+    while True:
+        busy = {room for room, session in sessions.items() if session.processing}
+        for ws, conn in list(connected_clients.connections.items()):
+            if ws not in notified and conn.room not in busy:
+                notified.add(ws)
+                connected_clients.send_to(ws, reconnect_frame)
+        if not busy or loop.time() > deadline:
+            break
+        await asyncio.sleep(0.2)
+
+    # 클라이언트가 스스로 닫고 재연결할 시간을 준 뒤 남은 연결 종료
+    deadline = loop.time() + 5
+    while len(connected_clients) and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    for ws in list(connected_clients.connections):
+        await ws.close(code=1012, message=b"server restart")
+    log.info("[재시작] 정리 완료")
+
+
+async def serve_worker(sock: socket.socket, ready_fd: int):
+    """감독 프로세스가 넘겨준 소켓으로 서버 실행
+
+    - SIGTERM: 교체 (drain_worker 후 종료)
+    - SIGINT: 즉시 종료
+    - SIGUSR1: 이전 워커 종료 후 저널 인계
+    """
+    loop = asyncio.get_event_loop()
+    runner = web.AppRunner(await init_app())
+    await runner.setup()
+    site = web.SockSite(runner, sock)
+    await site.start()
+    notify_ready(ready_fd)
+
+    stop = asyncio.Event()
+    drain = False
+
+    def on_terminate():
+        nonlocal drain
+        drain = True
+        stop.set()
+
+    loop.add_signal_handler(signal.SIGTERM, on_terminate)
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+    loop.add_signal_handler(signal.SIGUSR1, complete_handoff)
+    try:
+        await stop.wait()
+        if drain:
+            await drain_worker(site)
+    finally:
+        await runner.cleanup()
+
+
+async def stop_workers(app):
+    """서버 종료 시 워커 및 처리 중인 Claude 작업 정리"""
+    global shutting_down
+    shutting_down = True
+    for session in sessions.values():
+        session.stop()
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    worker_tasks.clear()
+    await warm_pool.close()
+    await request_journal.close()
+    if session_sweeper is not None:
+        session_sweeper.cancel()
+    for session in sessions.values():
+        session.remember(touch=False)
+    await session_registry.close()
+    await transcripts.close()
+    await search_index.close()
+
+
+async def emit_text_delta(session: ClaudeSession, message_id: str, chunks: list):
+    """모인 응답 텍스트 조각을 message_delta 프레임 하나로 전송"""
+    await broadcast({
+        "type": "message_delta",
+        "id": message_id,
+        "username": "Claude",
+        "delta": "".join(chunks)
+    }, room=session.room)
 
-        # 처리 완료 후 큐에서 제거
-        async with queue_lock:
-            if request_queue and request_queue[0] == request:
-                request_queue.popleft()
-                print(f"[큐] 요청 완료 (남은: {len(request_queue)}개)")
-            await send_queue_status()
-            # 사용량 정보 전송
-            await send_usage_status()
 
+def batch_prompt(batch: list) -> str:
+    """묶음 요청의 프롬프트 (요청마다 `[보낸 사람]: 메시지`)"""
+    lines = [f"[{item['sender']}]: {item['message']}" for item in batch]
+    return BATCH_PROMPT_HEADER + "\n\n" + "\n\n".join(lines)
 
-async def ask_claude(message: str, sender: str, retry_count: int = 0):
-    """Claude CLI에 메시지 전달하고 응답 받기"""
-    global claude_processing, current_stop_event, session_id, session_started
 
+def split_evenly(value: int, parts: int) -> list:
+    """정수를 parts개로 나눔 (합이 원래 값과 같도록 나머지는 앞쪽부터 1씩)"""
+    base, extra = divmod(value, parts)
+    return [base + (1 if index < extra else 0) for index in range(parts)]
+
+
+async def ask_claude(session: ClaudeSession, message: str, sender: str, retry_count: int = 0,
+                     batch: list = None):
+    """Claude CLI에 메시지 전달하고 응답 받기
+
+    batch: 묶음 처리 시 원래 요청 목록 (프롬프트를 합치고, 응답 프레임의 reply_to와
+    사용량 장부를 요청별로 나눠 기록)
+    """
     MAX_RETRY = 1  # state error 시 최대 재시도 횟수
 
-    claude_processing = True
-    current_stop_event = threading.Event()
+    session.processing = True
+    session.stop_event = asyncio.Event()
+    log_token = bind(session_id=session.session_id)
+
+    loop = asyncio.get_event_loop()
+    started_at = loop.time()
+    outcome = "empty"  # 지표용 처리 결과: ok, empty, timeout, error, stopped, retry
+    recorded = False
+
+    def record_request():
+        """요청 처리 시간/결과 지표 기록 (한 번만)"""
+        nonlocal recorded
+        if not recorded:
+            recorded = True
+            METRIC_REQUEST.observe(loop.time() - started_at, outcome=outcome)
+            METRIC_REQUESTS.inc(outcome=outcome)
 
     try:
-        await send_progress("start", {"message": "Claude 처리 시작"})
-        print(f"[Claude] 처리 시작: {sender} - {message[:50]}...")
+        # 묶음 응답이 어떤 요청들에 대한 것인지 (클라이언트/벤치마크가 요청별로 짝지음)
+        reply_to = {"reply_to": [{"id": item["id"], "sender": item["sender"]} for item in batch]} if batch else {}
+        await send_progress(session, "start", {"message": "Claude 처리 시작", **reply_to})
+        claude_log.info(f"[Claude] 처리 시작: {sender} - {message[:50]}...")
 
-        prompt = f"[{sender}]: {message}"
-        output_queue = Queue()
+        prompt = batch_prompt(batch) if batch else f"[{sender}]: {message}"
 
-        # 별도 스레드에서 Claude 실행
-        thread = threading.Thread(
-            target=run_claude_stream,
-            args=(prompt, output_queue, current_stop_event, session_id, session_started)
-        )
-        thread.start()
+        # asyncio 서브프로세스로 Claude 실행 (stdout/stderr 이벤트를 직접 수신, 프로세스 트리 자원 측정)
+        resources = TreeUsage()
+        stream = run_claude_stream(prompt, session.stop_event, session.session_id, session.session_started,
+                                   partial=stream_text, usage=resources)
 
         final_result = ""
+        # 텍스트 스트리밍: 같은 id의 message_delta 프레임을 보내고 message_end로 마무리
+        message_id = uuid.uuid4().hex[:12]
+        streamed_text = []
+        text_stream = ProgressBatcher(lambda chunks: emit_text_delta(session, message_id, chunks), progress_window)
+        text_stream.link(session.progress)  # 텍스트와 진행 상황 프레임이 생긴 순서대로 나가도록
         current_turn = 0
-        start_time = asyncio.get_event_loop().time()
         session_error_detected = False  # 세션 에러 감지 플래그
+        retry_requested = False
+        first_assistant = True
+        running_tools = deque()  # (도구 이름, 시작 시각) - tool_end마다 앞에서부터 완료 처리
 
-        while True:
-            # 타임아웃 체크
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > CLAUDE_TIMEOUT:
-                print(f"[Claude] 타임아웃 ({CLAUDE_TIMEOUT}초)")
-                current_stop_event.set()
-                await send_progress("error", {"message": f"타임아웃 ({CLAUDE_TIMEOUT}초)"})
-                # 타임아웃 시 세션 리셋 (다음 요청에서 새 세션 시작)
-                reset_session()
-                break
-
-            # 큐에서 결과 가져오기
-            try:
-                item = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None, lambda: output_queue.get(timeout=1)
-                    ),
-                    timeout=2
-                )
-            except (asyncio.TimeoutError, Empty):
-                continue
-
-            msg_type, content = item
-
-            if msg_type == "done":
-                # 세션 에러가 감지되었고 재시도 가능하면 재시도
-                if session_error_detected and retry_count < MAX_RETRY:
-                    print(f"[Claude] 세션 에러로 인한 재시도 ({retry_count + 1}/{MAX_RETRY})")
-                    thread.join(timeout=5)
-                    reset_session()
-                    claude_processing = False
-                    await send_progress("retry", {"message": "세션 에러 - 새 세션으로 재시도 중..."})
-                    return await ask_claude(message, sender, retry_count + 1)
-                break
-            elif msg_type == "error":
-                print(f"[Claude 오류]: {content}")
-                await send_progress("error", {"message": content})
-                break
-            elif msg_type == "stderr":
-                # stderr에서 세션/상태 에러 감지
-                content_lower = content.lower()
-                if "state" in content_lower or "session" in content_lower or "invalid" in content_lower:
-                    print(f"[Claude] 세션 에러 감지: {content}")
-                    session_error_detected = True
-                else:
-                    print(f"[DEBUG] stderr: {content}")
-            elif msg_type == "line":
-                try:
-                    data = json.loads(content)
-                    json_type = data.get("type", "")
-
-                    if json_type == "system" and data.get("subtype") == "init":
-                        model = data.get("model", "unknown")
-                        print(f"[Claude] 모델: {model}")
-                        await send_progress("init", {
-                            "model": model,
-                            "session_id": data.get("session_id", "")
-                        })
-
-                    elif json_type == "assistant":
-                        msg = data.get("message", {})
-                        if isinstance(msg, dict):
-                            msg_content = msg.get("content", [])
-                            if isinstance(msg_content, list):
-                                for content_item in msg_content:
-                                    if not isinstance(content_item, dict):
-                                        continue
-
-                                    if content_item.get("type") == "tool_use":
-                                        tool_name = content_item.get("name", "unknown")
-                                        tool_input = content_item.get("input", {})
-                                        if not isinstance(tool_input, dict):
-                                            tool_input = {}
-                                        current_turn += 1
-
-                                        detail = ""
-                                        edit_info = None
-
-                                        if tool_name == "Read":
-                                            file_path = tool_input.get("file_path", "")
-                                            detail = get_relative_path(file_path) if file_path else ""
-                                        elif tool_name == "Bash":
-                                            cmd = tool_input.get("command", "")
-                                            detail = cmd[:100] if cmd else ""
-                                        elif tool_name == "Edit":
-                                            file_path = tool_input.get("file_path", "")
-                                            rel_path = get_relative_path(file_path)
-                                            detail = rel_path if file_path else ""
-                                            old_string = tool_input.get("old_string", "")
-                                            new_string = tool_input.get("new_string", "")
-                                            if old_string or new_string:
-                                                edit_info = {
-                                                    "type": "edit",
-                                                    "file": rel_path,
-                                                    "old": old_string[:500] if old_string else "",
-                                                    "new": new_string[:500] if new_string else ""
-                                                }
-                                        elif tool_name == "Write":
-                                            file_path = tool_input.get("file_path", "")
-                                            rel_path = get_relative_path(file_path)
-                                            detail = rel_path if file_path else ""
-                                            write_content = tool_input.get("content", "")
-                                            if write_content:
-                                                edit_info = {
-                                                    "type": "write",
-                                                    "file": rel_path,
-                                                    "content": write_content[:500] if write_content else ""
-                                                }
-                                        elif tool_name == "Grep":
-                                            detail = tool_input.get("pattern", "") or ""
-                                        elif tool_name == "TodoWrite":
-                                            todos = tool_input.get("todos", [])
-                                            if todos and isinstance(todos, list):
-                                                edit_info = {
-                                                    "type": "todo",
-                                                    "todos": todos
-                                                }
-                                                detail = f"{len(todos)}개 항목"
-
-                                        print(f"[Claude] [{current_turn}] {tool_name} {detail}")
-                                        progress_data = {
-                                            "turn": current_turn,
-                                            "tool": tool_name,
-                                            "detail": detail
-                                        }
-                                        if edit_info:
-                                            progress_data["edit_info"] = edit_info
-                                        await send_progress("tool_start", progress_data)
-
-                                    elif content_item.get("type") == "text":
-                                        final_result = content_item.get("text", "")
-
-                    elif json_type == "user":
-                        tool_result = data.get("tool_use_result", {})
-                        if tool_result and isinstance(tool_result, dict):
-                            file_info = tool_result.get("file", {})
-                            if file_info and isinstance(file_info, dict):
-                                lines = file_info.get("numLines", 0)
-                                await send_progress("tool_end", {
-                                    "turn": current_turn,
-                                    "lines": lines
-                                })
-                            else:
-                                await send_progress("tool_end", {"turn": current_turn})
-
-                    elif json_type == "result":
-                        total_turns = data.get("num_turns", 0)
-                        duration_ms = data.get("duration_ms", 0)
-                        cost_usd = data.get("total_cost_usd", 0)
-                        usage = data.get("usage", {})
-                        if not isinstance(usage, dict):
-                            usage = {}
-
-                        duration_sec = duration_ms / 1000
-                        input_tokens = usage.get("input_tokens", 0)
-                        output_tokens = usage.get("output_tokens", 0)
-                        cache_tokens = usage.get("cache_read_input_tokens", 0)
-
-                        final_result = data.get("result", final_result)
-
-                        cost_krw = cost_usd * USD_TO_KRW
-                        print(f"[Claude] 완료 | {duration_sec:.1f}초 | ${cost_usd:.4f} (₩{cost_krw:.0f})")
-                        await send_progress("complete", {
-                            "duration_sec": duration_sec,
-                            "cost_usd": cost_usd,
-                            "cost_krw": cost_krw,
-                            "input_tokens": input_tokens + cache_tokens,
-                            "output_tokens": output_tokens,
-                            "turns": total_turns
-                        })
-
-                except json.JSONDecodeError:
-                    continue
-
-        # 스레드 종료 대기
-        thread.join(timeout=10)
-
-        if final_result:
-            print(f"[Claude]: {final_result[:100]}...")
+        try:
+            async for msg_type, content in stream:
+                if msg_type == "done":
+                    # 세션 에러가 감지되었고 재시도 가능하면 재시도
+                    if session_error_detected and retry_count < MAX_RETRY:
+                        retry_requested = True
+                    break
+                elif msg_type == "timeout":
+                    outcome = "timeout"
+                    claude_log.warning(f"[Claude] 타임아웃 ({CLAUDE_TIMEOUT}초)")
+                    await send_progress(session, "error", {"message": f"타임아웃 ({CLAUDE_TIMEOUT}초)"})
+                    # 타임아웃 시 세션 리셋 (다음 요청에서 새 세션 시작)
+                    session.reset()
+                    break
+                elif msg_type == "error":
+                    outcome = "error"
+                    claude_log.error(f"[Claude 오류]: {content}")
+                    await send_progress(session, "error", {"message": content})
+                    break
+                elif msg_type == "stderr":
+                    # stderr에서 세션/상태 에러 감지
+                    content_lower = content.lower()
+                    if "state" in content_lower or "session" in content_lower or "invalid" in content_lower:
+                        claude_log.warning(f"[Claude] 세션 에러 감지: {content}")
+                        session_error_detected = True
+                    else:
+                        claude_log.debug(f"[Claude] stderr: {content}")
+                elif msg_type == "line":
+                    json_type, events = stream_parser.parse(content)
+
+                    if first_assistant and json_type in ("assistant", "stream_event"):
+                        first_assistant = False
+                        METRIC_FIRST_ASSISTANT.observe(loop.time() - started_at)
+
+                    for kind, payload in events:
+                        if kind == TEXT_DELTA:
+                            streamed_text.append(payload)
+                            await text_stream.add(payload)
+
+                        elif kind == TEXT_BLOCK:
+                            if streamed_text:
+                                # 도구 호출 사이의 새 텍스트 블록은 문단으로 구분
+                                streamed_text.append("\n\n")
+                                await text_stream.add("\n\n")
+
+                        elif kind == TEXT:
+                            final_result = payload
+
+                        elif kind == TOOL_USE:
+                            current_turn += 1
+                            tool_name = payload["tool"]
+                            detail = payload["detail"]
+                            claude_log.info(f"[Claude] [{current_turn}] {tool_name} {detail}")
+                            progress_data = {
+                                "turn": current_turn,
+                                "tool": tool_name,
+                                "detail": detail
+                            }
+                            if payload["edit_info"]:
+                                progress_data["edit_info"] = payload["edit_info"]
+                            running_tools.append((tool_name, loop.time()))
+                            await send_progress(session, "tool_start", progress_data)
+
+                        elif kind == TOOL_RESULT:
+                            if running_tools:
+                                tool_name, tool_started_at = running_tools.popleft()
+                                METRIC_TOOL.observe(loop.time() - tool_started_at, tool=tool_name)
+                            if payload is not None:
+                                await send_progress(session, "tool_end", {"turn": current_turn, **payload})
+
+                        elif kind == INIT:
+                            METRIC_INIT.observe(loop.time() - started_at)
+                            claude_log.info(f"[Claude] 모델: {payload['model']}")
+                            await send_progress(session, "init", payload)
+
+                        elif kind == RESULT:
+                            cost_usd = payload["cost_usd"]
+                            duration_sec = payload["duration_ms"] / 1000
+                            if payload["result"] is not None:
+                                final_result = payload["result"]
+                            METRIC_COST.inc(cost_usd)
+
+                            # 묶음이면 요청마다 균등하게 나눠 기록 (합계는 실제 CLI 실행과 같음)
+                            shares = batch or [{"sender": sender}]
+                            parts = len(shares)
+                            for share, input_tokens, output_tokens, cache_tokens, duration_ms, turns in zip(
+                                    shares,
+                                    split_evenly(payload["input_tokens"], parts),
+                                    split_evenly(payload["output_tokens"], parts),
+                                    split_evenly(payload["cache_tokens"], parts),
+                                    split_evenly(payload["duration_ms"], parts),
+                                    split_evenly(payload["turns"], parts)):
+                                usage_ledger.record(
+                                    session.session_id, session.room, share["sender"],
+                                    cost_usd=cost_usd / parts,
+                                    input_tokens=input_tokens,
+                                    output_tokens=output_tokens,
+                                    cache_read_tokens=cache_tokens,
+                                    duration_ms=duration_ms,
+                                    turns=turns
+                                )
+
+                            cost_krw = cost_usd * USD_TO_KRW
+                            claude_log.info(f"[Claude] 완료 | {duration_sec:.1f}초 | ${cost_usd:.4f} (₩{cost_krw:.0f})")
+                            resources.sample()
+                            await send_progress(session, "complete", {
+                                "duration_sec": duration_sec,
+                                "cost_usd": cost_usd,
+                                "cost_krw": cost_krw,
+                                "input_tokens": payload["input_tokens"] + payload["cache_tokens"],
+                                "output_tokens": payload["output_tokens"],
+                                "turns": payload["turns"],
+                                **resources.summary()
+                            })
+        finally:
+            # 서브프로세스 정리 (중단/타임아웃 시 프로세스 트리 종료)
+            await stream.aclose()
+            if resources.samples:
+                METRIC_CPU.observe(resources.cpu_seconds)
+                METRIC_PEAK_RSS.observe(resources.peak_rss_bytes)
+                claude_log.info(f"[Claude] 자원 | CPU {resources.cpu_seconds:.2f}초 | "
+                                f"최대 RSS {resources.peak_rss_bytes / 1024 / 1024:.1f}MB | 프로세스 {len(resources.ticks)}개")
+
+        # 스트리밍한 메시지 마무리 (재시도 시에는 빈 메시지로 끝내 클라이언트가 지우게 함)
+        if streamed_text:
+            await text_stream.flush()
+            if session.progress:
+                await session.progress.flush()
+            end_message = "" if retry_requested else (final_result or "".join(streamed_text))
             await broadcast({
-                "type": "message",
+                "type": "message_end",
+                "id": message_id,
                 "username": "Claude",
-                "message": final_result
-            })
+                "message": end_message,
+                **reply_to
+            }, room=session.room)
+
+        # 세션 에러가 감지되었고 재시도 가능하면 새 세션으로 재시도
+        if retry_requested:
+            outcome = "retry"
+            record_request()
+            claude_log.warning(f"[Claude] 세션 에러로 인한 재시도 ({retry_count + 1}/{MAX_RETRY})")
+            session.reset()
+            session.processing = False
+            await send_progress(session, "retry", {"message": "세션 에러 - 새 세션으로 재시도 중..."})
+            return await ask_claude(session, message, sender, retry_count + 1, batch)
+
+        if session.stop_event.is_set() and outcome == "empty":
+            outcome = "stopped"
+        if final_result:
+            if outcome == "empty":
+                outcome = "ok"
+            claude_log.info(f"[Claude]: {final_result[:100]}...")
+            if not streamed_text:
+                # 묶여 있던 진행 상황을 먼저 보내 메시지 순서 유지
+                if session.progress:
+                    await session.progress.flush()
+                await broadcast({
+                    "type": "message",
+                    "username": "Claude",
+                    "message": final_result,
+                    **reply_to
+                }, room=session.room)
             # 첫 번째 성공 후 세션 시작됨으로 표시
-            if not session_started:
-                session_started = True
-                print(f"[DEBUG] 세션 시작됨: {session_id}")
+            if not session.session_started:
+                session.session_started = True
+                request_journal.session(session.room, session.session_id, True)
+                session.remember()
+                claude_log.debug(f"[세션] 세션 시작됨 ({session.room}): {session.session_id}")
 
     except Exception as e:
-        print(f"[Claude 오류]: {type(e).__name__}: {e}")
-        await send_progress("error", {"message": str(e)})
+        outcome = "error"
+        claude_log.error(f"[Claude 오류]: {type(e).__name__}: {e}")
+        await send_progress(session, "error", {"message": str(e)})
     finally:
-        claude_processing = False
-
-
-def reset_session():
-    """Claude 세션 리셋"""
-    global session_id, session_started
-    session_id = str(uuid.uuid4())
-    session_started = False
-    print(f"[세션] 리셋됨: {session_id}")
-    return session_id
+        session.processing = False
+        record_request()
+        unbind(log_token)
 
 
 # ============================================================
 # HTTP + WebSocket 통합 서버 (aiohttp)
 # ============================================================
 
+# 정적 파일 메모리 캐시 (압축본 + ETag, 디스크 변경 시 다시 읽음)
+static_assets = AssetCache()
+
+registry.counter("chat_static_responses_total", "정적 파일 응답 수",
+                 callback=lambda: static_assets.stats["responses"])
+registry.counter("chat_static_not_modified_total", "ETag 일치로 304 응답한 수",
+                 callback=lambda: static_assets.stats["not_modified"])
+registry.counter("chat_static_bytes_sent_total", "정적 파일 본문 전송 바이트",
+                 callback=lambda: static_assets.stats["bytes_sent"])
+registry.counter("chat_static_bytes_saved_total", "압축/304로 전송하지 않은 바이트",
+                 callback=lambda: static_assets.stats["bytes_saved"])
+
+
+def load_static_assets():
+    """index.html, PWA 파일, 아이콘, 외부 라이브러리를 메모리에 올림"""
+    static_assets.add("index.html", os.path.join(SCRIPT_DIR, "index.html"), url="/")
+    static_assets.add("manifest.json", os.path.join(SCRIPT_DIR, "manifest.json"),
+                      content_type="application/manifest+json; charset=utf-8")
+    static_assets.add("service-worker.js", os.path.join(SCRIPT_DIR, "service-worker.js"))
+    # 아이콘은 잘 바뀌지 않으므로 하루 동안 재검증 없이 캐시
+    static_assets.add_directory("icons", os.path.join(SCRIPT_DIR, "icons"), cache_control="public, max-age=86400")
+    # CDN 대신 로컬에서 제공하는 라이브러리 (marked 등)
+    static_assets.add_directory("vendor", os.path.join(SCRIPT_DIR, "vendor"), cache_control="public, max-age=86400")
+    total = sum(asset.size for asset in static_assets.assets.values())
+    log.info(f"[정적 파일] {len(static_assets.assets)}개 로드 ({total:,} 바이트)")
+
+
 async def handle_index(request):
     """HTTP GET / - index.html 제공"""
-    index_path = os.path.join(SCRIPT_DIR, "index.html")
-    if os.path.exists(index_path):
-        return web.FileResponse(index_path)
-    return web.Response(text="index.html not found", status=404)
+    return static_assets.response(request, "index.html")
 
 
 async def handle_manifest(request):
     """HTTP GET /manifest.json - PWA 매니페스트 제공"""
-    manifest_path = os.path.join(SCRIPT_DIR, "manifest.json")
-    if os.path.exists(manifest_path):
-        return web.FileResponse(manifest_path, headers={"Content-Type": "application/manifest+json"})
-    return web.Response(text="manifest.json not found", status=404)
+    return static_assets.response(request, "manifest.json")
 
 
 async def handle_service_worker(request):
     """HTTP GET /service-worker.js - Service Worker 제공"""
-    sw_path = os.path.join(SCRIPT_DIR, "service-worker.js")
-    if os.path.exists(sw_path):
-        return web.FileResponse(sw_path, headers={"Content-Type": "application/javascript"})
-    return web.Response(text="service-worker.js not found", status=404)
+    return static_assets.response(request, "service-worker.js")
 
 
 async def handle_icon(request):
     """HTTP GET /icons/{filename} - 앱 아이콘 제공"""
     filename = request.match_info.get("filename", "")
-    icon_path = os.path.join(SCRIPT_DIR, "icons", filename)
-    if os.path.exists(icon_path):
-        content_type = "image/png"
-        if filename.endswith(".svg"):
-            content_type = "image/svg+xml"
-        return web.FileResponse(icon_path, headers={"Content-Type": content_type})
-    return web.Response(text=f"Icon {filename} not found", status=404)
+    return static_assets.response(request, f"icons/{filename}")
+
+
+async def handle_vendor(request):
+    """HTTP GET /vendor/{filename} - 로컬 라이브러리 제공"""
+    filename = request.match_info.get("filename", "")
+    return static_assets.response(request, f"vendor/{filename}")
+
+
+async def handle_asset_manifest(request):
+    """HTTP GET /asset-manifest.json - Service Worker용 URL별 내용 해시 목록"""
+    manifest = static_assets.manifest(exclude=("/service-worker.js",))
+    return web.json_response(manifest, headers={"Cache-Control": "no-store"})
 
 
 async def handle_ping(request):
@@ -660,23 +1269,175 @@ async def handle_ping(request):
     return web.Response(text="pong", headers={"Cache-Control": "no-store"})
 
 
+async def handle_metrics(request):
+    """HTTP GET /metrics - Prometheus 텍스트 형식 지표"""
+    return web.Response(
+        text=registry.render(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+async def handle_history(request):
+    """HTTP GET /history?session=토큰&before=번호&limit=개수 - 대화 기록 한 페이지 (오래된 것부터)"""
+    try:
+        before = int(request.query["before"]) if request.query.get("before") else None
+        limit = int(request.query.get("limit", HISTORY_PAGE_SIZE))
+    except ValueError:
+        return web.json_response({"error": "before/limit은 정수여야 합니다"}, status=400)
+    try:
+        page = transcripts.page(request.query.get("session", ""), before, limit)
+    except OSError as e:
+        log.warning(f"[기록] 읽기 실패: {e}")
+        return web.json_response({"error": "기록을 읽지 못했습니다"}, status=500)
+    return web.json_response(page, headers={"Cache-Control": "no-store"}, dumps=encode)
+
+
+async def handle_search(request):
+    """HTTP GET /search?q=검색어&session=토큰&type=종류&since=&until=&limit=&offset=
+
+    관련도 순 검색 결과 (snippet은 HTML 이스케이프 후 일치 부분을 <mark>로 표시)
+    기본은 session 토큰의 기록만 검색하고, all=1(모든 세션, room/session_id 필터)은
+    X-Admin-Key 헤더가 --admin-key와 같을 때만 허용
+    """
+    if not search_index.enabled:
+        return web.json_response({"error": "검색을 사용할 수 없습니다"}, status=503)
+    query = request.query
+    all_sessions = query.get("all") == "1"
+    if all_sessions and not is_admin(request.headers.get("X-Admin-Key")):
+        return web.json_response({"error": "모든 세션 검색은 관리자 키가 필요합니다"}, status=403)
+    try:
+        limit = int(query.get("limit", SEARCH_PAGE_SIZE))
+        offset = int(query.get("offset", 0))
+    except ValueError:
+        return web.json_response({"error": "limit/offset은 정수여야 합니다"}, status=400)
+    try:
+        result = await search_index.run_search(
+            query.get("q", ""),
+            token=query.get("session"),
+            room=query.get("room"),
+            session_id=query.get("session_id"),
+            kind=query.get("type"),
+            since=parse_time(query["since"]) if query.get("since") else None,
+            until=parse_time(query["until"], end=True) if query.get("until") else None,
+            limit=limit,
+            offset=offset,
+            all_sessions=all_sessions
+        )
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except sqlite3.Error as e:
+        log.warning(f"[검색] 검색 실패: {e}")
+        return web.json_response({"error": "검색하지 못했습니다"}, status=500)
+    return web.json_response(result, headers={"Cache-Control": "no-store"}, dumps=encode)
+
+
+async def handle_usage(request):
+    """HTTP GET /usage - 사용량 JSON (usage_status 데이터 + 세션/사용자/5시간 블록별 장부)"""
+    return web.json_response({
+        "status": usage_service.snapshot() or {},
+        "ledger": usage_ledger.summary(),
+        "warm_pool": warm_pool.summary(),
+        "journal": request_journal.summary(),
+        "blobs": blob_store.summary(),
+        "batch": {"max": batch_max, "window_ms": int(batch_window * 1000), **batch_stats},
+        "logging": log_pipeline.summary(),
+        "history": transcripts.summary(),
+        "search": search_index.summary(),
+        "sessions": {
+            "live": len(sessions),
+            "idle": sum(1 for session in sessions.values() if session.idle),
+            "idle_max": session_idle_max,
+            "idle_ttl_sec": session_idle_ttl,
+            **session_registry.summary()
+        }
+    }, headers={"Cache-Control": "no-store"})
+
+
+async def handle_blob(request):
+    """HTTP GET /blob/{hash} - Edit/Write 전체 본문 (카드를 펼칠 때 요청)"""
+    digest = request.match_info.get("digest", "")
+    body = blob_store.get(digest) if HASH_PATTERN.match(digest) else None
+    return blob_store.response(request, body, digest)
+
+
+async def handle_blob_diff(request):
+    """HTTP GET /blob/{old}/diff/{new}?file=경로 - 두 본문의 unified diff (너무 크면 413)"""
+    old, new = request.match_info.get("old", ""), request.match_info.get("new", "")
+    body = None
+    if HASH_PATTERN.match(old) and HASH_PATTERN.match(new):
+        if (blob_store.size(old) or 0) + (blob_store.size(new) or 0) > BLOB_DIFF_MAX_SIZE:
+            return web.Response(text="diff too large", status=413, headers={"Cache-Control": "no-store"})
+        body = await blob_store.diff(old, new, request.query.get("file", ""))
+    return blob_store.response(request, body, f"{old[:16]}{new[:16]}", content_type="text/x-diff")
+
+
+def send_resume(ws, room: str, last_seq, until: int):
+    """last_seq 이후 놓친 프레임을 재전송하고 resume_done으로 결과 알림"""
+    try:
+        last_seq = int(last_seq)
+    except (TypeError, ValueError):
+        last_seq = -1
+    frames, complete = event_log.since(last_seq, room, until)
+    for text in frames:
+        connected_clients.send_to(ws, text)
+    connected_clients.send_to(ws, encode({
+        "type": "resume_done",
+        "replayed": len(frames),
+        "complete": complete,
+        "seq": until
+    }))
+    ws_log.info(f"[연결] 재개 (ID: {id(ws)}, last_seq: {last_seq}, 재전송: {len(frames)}개, 누락 없음: {complete})")
+
+
 async def handle_websocket(request):
     """WebSocket /ws - 채팅 처리"""
     ws = web.WebSocketResponse(heartbeat=30)  # 30초마다 ping/pong으로 연결 유지
     await ws.prepare(request)
 
-    connected_clients.add(ws)
+    # 방(room) 결정 - 같은 방의 클라이언트는 하나의 Claude 세션을 공유
+    room = request.query.get("room", "").strip()[:64] or DEFAULT_ROOM
+    session, resumed = attach_session(room, request.query.get("token"))
+
+    # 이 연결의 요청 소유자 ID - 클라이언트가 정하는 이름 대신 이 값으로 대기열 한도를 세고
+    # 취소/순서 변경을 허락함 (같은 이름의 다른 연결은 남, 관리자는 모든 요청)
+    owner = uuid.uuid4().hex
+    admin = is_admin(request.query.get("admin_key"))
+
+    connected_clients.add(ws, room)
+    connected_seq = event_log.seq  # 이 seq 이후의 브로드캐스트는 실시간으로 전달됨
     client_id = id(ws)
-    print(f"[연결] 클라이언트 접속 (ID: {client_id}, 총 {len(connected_clients)}명)")
+    bind(room=room, client=client_id)  # 이 연결의 태스크에서 남기는 로그에 방/클라이언트 포함
+    ws_log.info(f"[연결] 클라이언트 접속 (ID: {client_id}, 방: {room}, 총 {len(connected_clients)}명)")
 
-    # 연결 확인 메시지
-    await ws.send_str(json.dumps({
+    # 연결 확인 메시지 + 재개 정보 (server_id가 같으면 seq 기준으로 이어 받을 수 있음)
+    connected_clients.send_to(ws, encode({
         "type": "system",
         "message": "WebSocket 서버에 연결되었습니다."
-    }, ensure_ascii=False))
-
-    # 접속 시 사용량 정보 전송
-    asyncio.create_task(send_usage_status())
+    }))
+    connected_clients.send_to(ws, encode({
+        "type": "hello",
+        "server_id": event_log.server_id,
+        "seq": connected_seq,
+        "history_total": transcripts.count(session.token),  # 이 번호부터는 실시간으로 받음 (/history의 before)
+        "session_token": session.token,
+        "session_resumed": resumed
+    }))
+    if resumed:
+        connected_clients.send_to(ws, encode({
+            "type": "system",
+            "message": f"이전 세션을 이어서 사용합니다. (세션: {session.session_id[:8]}...)"
+        }))
+    session.remember()
+
+    # 재연결: ?last_seq=&server_id= 로 접속하면 놓친 프레임을 실시간 프레임보다 먼저 전송
+    # (add 이후 await 없이 큐에 넣으므로 순서가 섞이지 않음)
+    if request.query.get("server_id") == event_log.server_id and "last_seq" in request.query:
+        send_resume(ws, room, request.query.get("last_seq"), connected_seq)
+
+    # 접속 시 캐시된 사용량 정보 전송 (ccusage 실행을 기다리지 않음)
+    await send_usage_status(client=ws)
 
     try:
         async for msg in ws:
@@ -688,90 +1449,279 @@ async def handle_websocket(request):
                     if msg_type == "message":
                         username = data.get("username", "익명")
                         content = data.get("message", "")
-                        print(f"[{username}]: {content}")
-
-                        # 모든 클라이언트에게 브로드캐스트
+                        priority = normalize_priority(data.get("priority"))
+                        ws_log.info(f"[{username}]: {content}")
+
+                        # 대기열 한도 초과 시 보낸 클라이언트에게만 거부 알림 (방에 브로드캐스트하지 않음)
+                        reason = reject_reason(session, username, owner) if username != "Claude" else None
+                        if reason:
+                            connected_clients.send_to(ws, encode({
+                                "type": "queue_rejected",
+                                "reason": reason,
+                                "message": REJECT_MESSAGES[reason],
+                                "text": content
+                            }))
+                            continue
+
+                        # 같은 방의 클라이언트에게 브로드캐스트
                         await broadcast({
                             "type": "message",
                             "username": username,
                             "message": content
-                        })
+                        }, room=room)
 
                         # Claude에게 전달 (Claude 자신의 메시지 제외)
                         if username != "Claude":
-                            await add_to_queue(content, username)
+                            # 기본보다 높은 우선순위는 관리자만 (다른 사람의 요청보다 먼저 처리되므로)
+                            if PRIORITIES[priority] < PRIORITIES[DEFAULT_PRIORITY] and not admin:
+                                priority = DEFAULT_PRIORITY
+                                connected_clients.send_to(ws, encode({
+                                    "type": "system",
+                                    "message": "우선순위 high는 관리자만 지정할 수 있습니다. 보통 우선순위로 추가합니다."
+                                }))
+                            await add_to_queue(session, content, username, priority, owner)
 
                     elif msg_type == "command":
                         command = data.get("command", "")
-                        print(f"[명령]: {command}")
+                        ws_log.info(f"[명령]: {command}")
 
                         if command == "clear":
-                            new_session = reset_session()
+                            new_session = session.reset()
+                            # 새 탭에서 이전 기록을 불러올 때 여기서 멈추도록 표시
+                            transcripts.append(session.token, [{"type": "clear", "ts": round(time.time(), 3)}])
                             await broadcast({
                                 "type": "system",
                                 "message": f"세션이 리셋되었습니다. (새 세션: {new_session[:8]}...)"
-                            })
+                            }, room=room)
+                        elif command == "cancel":
+                            # 요청 ID로 대기 요청 취소 또는 처리 중인 요청 중단 (자기 요청만, 관리자는 모두)
+                            request_id = str(data.get("id", ""))
+                            if not admin and not session.queue.owned_by(request_id, owner):
+                                if request_id in session.queue.items or session.queue.is_current(request_id):
+                                    queue_log.info(f"[큐] 취소 거부 ({room}): 다른 사람의 요청 ({request_id})")
+                                    connected_clients.send_to(ws, encode({
+                                        "type": "system",
+                                        "message": "다른 사람의 요청은 취소할 수 없습니다."
+                                    }))
+                                    continue
+                            if not await cancel_request(session, request_id):
+                                connected_clients.send_to(ws, encode({
+                                    "type": "system",
+                                    "message": "취소할 요청을 찾을 수 없습니다. (이미 처리되었을 수 있습니다)"
+                                }))
+                        elif command == "reorder":
+                            # 자기 대기 요청을 같은 보낸 사람의 요청 중 index 위치로 옮김
+                            # (우선순위 변경과 다른 사람의 요청 이동은 관리자만)
+                            index = data.get("index", 0)
+                            if data.get("priority") is not None and not admin:
+                                connected_clients.send_to(ws, encode({
+                                    "type": "system",
+                                    "message": "우선순위 변경은 관리자만 할 수 있습니다."
+                                }))
+                                continue
+                            moved = session.queue.move(str(data.get("id", "")),
+                                                       index if isinstance(index, int) else 0,
+                                                       data.get("priority"),
+                                                       owner=None if admin else owner)
+                            if moved:
+                                await send_queue_status(session)
+                            else:
+                                connected_clients.send_to(ws, encode({
+                                    "type": "system",
+                                    "message": "옮길 수 없는 요청입니다. (다른 사람의 요청이거나 이미 처리되었을 수 있습니다)"
+                                }))
+                        elif command == "resume":
+                            # 접속 전까지 놓친 프레임 재전송 (접속 이후 프레임은 이미 실시간으로 전달됨)
+                            if data.get("server_id", event_log.server_id) == event_log.server_id:
+                                send_resume(ws, room, data.get("last_seq"), connected_seq)
+                            else:
+                                send_resume(ws, room, -1, connected_seq)
                         elif command == "request_usage":
-                            # 사용량 조회 요청
-                            asyncio.create_task(send_usage_status())
+                            # 사용량 조회 요청 - 캐시 전송 후 갱신 예약 (동시 요청은 하나로 병합)
+                            await send_usage_status(client=ws)
+                            usage_service.request_refresh()
+                        elif command == "restart" and supervised:
+                            # 감독 프로세스에 교체 요청 (새 워커 준비 후 이 워커 정리, 연결 유지)
+                            ws_log.info("[명령] 서버 무중단 재시작 요청됨")
+                            await broadcast({
+                                "type": "system",
+                                "message": "새 서버를 시작합니다. 준비되면 자동으로 다시 연결됩니다."
+                            })
+                            os.kill(os.getppid(), signal.SIGHUP)
                         elif command == "restart":
-                            print("[명령] 서버 재시작 요청됨")
+                            ws_log.info("[명령] 서버 재시작 요청됨")
                             await broadcast({
                                 "type": "system",
                                 "message": "서버가 재시작됩니다. 잠시 후 페이지를 새로고침하세요."
                             })
                             # 잠시 대기 후 재시작 (메시지 전송 시간 확보)
                             await asyncio.sleep(1)
+                            # 대기 요청/세션 기록을 파일에 남긴 뒤 종료 (다음 시작 때 이어서 처리)
+                            request_journal.flush()
+                            transcripts.flush()
+                            search_index.flush()
                             # exit code 100으로 종료 → run.bat이 재시작
                             os._exit(100)
 
                 except json.JSONDecodeError:
-                    print(f"[오류] JSON 파싱 실패: {msg.data}")
+                    ws_log.warning(f"[오류] JSON 파싱 실패: {msg.data}")
 
             elif msg.type == web.WSMsgType.ERROR:
-                print(f"[오류] WebSocket 오류: {ws.exception()}")
+                ws_log.error(f"[오류] WebSocket 오류: {ws.exception()}")
 
     except Exception as e:
-        print(f"[오류] 클라이언트 처리 중 예외: {e}")
+        ws_log.error(f"[오류] 클라이언트 처리 중 예외: {e}")
     finally:
-        connected_clients.discard(ws)
-        print(f"[연결 해제] 클라이언트 종료 (ID: {client_id}, 남은 {len(connected_clients)}명)")
-
-        # 마지막 클라이언트가 나가면 세션 리셋
-        if len(connected_clients) == 0:
-            global claude_processing, current_stop_event
-            # 처리 중인 작업이 있으면 중단
-            if claude_processing and current_stop_event:
-                current_stop_event.set()
-                print("[정리] 처리 중인 Claude 작업 중단")
-            claude_processing = False
-            reset_session()
-            print("[정리] 모든 클라이언트 종료 - 세션 리셋 완료")
+        await connected_clients.remove(ws)
+        ws_log.info(f"[연결 해제] 클라이언트 종료 (ID: {client_id}, 남은 {len(connected_clients)}명)")
+
+        # 방의 마지막 클라이언트가 나가도 세션은 유지 (처리 중인 요청도 계속, 결과는 재연결 시 재전송)
+        # 유휴 세션은 개수/시간 한도를 넘으면 메모리에서 정리되고, 토큰으로 다시 연결할 수 있음
+        if not connected_clients.has_room(room):
+            session.remember()
+            ws_log.info(f"[정리] 방의 모든 클라이언트 종료 - 세션 유지 ({room})")
+            if not draining:
+                evict_idle_sessions()
 
     return ws
 
 
 async def init_app():
     """aiohttp 앱 초기화"""
+    load_static_assets()
     app = web.Application()
     app.router.add_get("/", handle_index)
     app.router.add_get("/ws", handle_websocket)
     app.router.add_get("/ping", handle_ping)  # Keep-alive 엔드포인트
+    app.router.add_get("/usage", handle_usage)  # 사용량 JSON
+    app.router.add_get("/metrics", handle_metrics)  # Prometheus 지표
+    app.router.add_get("/history", handle_history)  # 대화 기록 페이지
+    app.router.add_get("/search", handle_search)  # 대화 검색
+    app.router.add_get("/blob/{digest}", handle_blob)  # Edit/Write 전체 본문
+    app.router.add_get("/blob/{old}/diff/{new}", handle_blob_diff)  # Edit unified diff
     # PWA 지원
     app.router.add_get("/manifest.json", handle_manifest)
     app.router.add_get("/service-worker.js", handle_service_worker)
     app.router.add_get("/icons/{filename}", handle_icon)
+    app.router.add_get("/asset-manifest.json", handle_asset_manifest)  # Service Worker 캐시 목록
+    app.router.add_get("/vendor/{filename}", handle_vendor)
+    # Claude 워커 풀
+    app.on_startup.append(start_workers)
+    app.on_cleanup.append(stop_workers)
+    # 사용량 백그라운드 갱신
+    app.on_startup.append(start_usage_service)
+    app.on_cleanup.append(stop_usage_service)
     return app
 
 
 def main():
-    global session_id
+    global worker_count, progress_window, stream_text, supervised, handoff_pending, batch_max, batch_window
+    global session_idle_max, session_idle_ttl, admin_key
 
     # 명령줄 인자 파싱
     parser = argparse.ArgumentParser(description="Chat Socket 통합 서버")
     parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"서버 포트 (기본값: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"동시에 실행할 Claude CLI 워커 수 (기본값: {DEFAULT_WORKERS})")
+    parser.add_argument("--progress-window", type=int, default=int(PROGRESS_BATCH_WINDOW * 1000),
+                        help="진행 상황 이벤트 묶음 전송 시간 창 (ms, 0이면 묶지 않음)")
+    parser.add_argument("--no-stream-text", action="store_true",
+                        help="응답 텍스트 스트리밍(message_delta) 끄기 (완료 후 한 번에 전송)")
+    parser.add_argument("--batch", action="store_true",
+                        help="묶음 처리 - 방에 쌓인 대기 요청을 Claude CLI 한 번으로 처리")
+    parser.add_argument("--batch-max", type=int, default=BATCH_MAX_REQUESTS,
+                        help=f"묶음 하나에 넣을 최대 요청 수 (기본값: {BATCH_MAX_REQUESTS})")
+    parser.add_argument("--batch-window", type=int, default=0,
+                        help="대기 요청이 하나뿐일 때 후속 요청을 기다릴 시간 (ms, 기본값: 0)")
+    parser.add_argument("--claude-memory", type=int, default=0,
+                        help="Claude CLI 프로세스 트리 메모리 한도 (MB, 0이면 없음)")
+    parser.add_argument("--claude-cpu", type=int, default=0,
+                        help="Claude CLI 프로세스별 CPU 시간 한도 (초, 0이면 없음)")
+    parser.add_argument("--claude-files", type=int, default=0,
+                        help="Claude CLI 프로세스별 열린 파일 수 한도 (0이면 없음)")
+    parser.add_argument("--warm-pool", type=int, default=WARM_POOL_SIZE,
+                        help=f"미리 띄워 둘 Claude CLI 프로세스 수 (0이면 사용 안 함, 기본값: {WARM_POOL_SIZE})")
+    parser.add_argument("--ledger-db", default=None,
+                        help="사용량 장부 SQLite 파일 경로 (지정 시 재시작 후에도 집계 유지)")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH,
+                        help="요청 큐 저널 파일 경로 (재시작 후 대기 요청/세션 복원)")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="요청 큐 저널 끄기 (재시작 시 대기 요청과 세션이 사라짐)")
+    parser.add_argument("--session-registry", default=DEFAULT_SESSION_REGISTRY_PATH,
+                        help=f"세션 레지스트리 파일 경로 (기본값: {DEFAULT_SESSION_REGISTRY_PATH})")
+    parser.add_argument("--no-session-registry", action="store_true",
+                        help="세션 레지스트리를 파일에 저장하지 않음 (재시작하면 토큰으로 다시 연결할 수 없음)")
+    parser.add_argument("--session-idle-max", type=int, default=SESSION_IDLE_MAX,
+                        help=f"메모리에 유지할 최대 유휴 세션 수 (기본값: {SESSION_IDLE_MAX})")
+    parser.add_argument("--session-idle-ttl", type=int, default=SESSION_IDLE_TTL // 60,
+                        help=f"유휴 세션을 메모리에 유지할 시간 (분, 기본값: {SESSION_IDLE_TTL // 60})")
+    parser.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR,
+                        help=f"대화 기록 디렉토리 (기본값: {DEFAULT_HISTORY_DIR})")
+    parser.add_argument("--no-history", action="store_true", help="대화 기록을 남기지 않음 (/history는 빈 목록)")
+    parser.add_argument("--search-db", default=DEFAULT_SEARCH_DB,
+                        help=f"대화 검색 색인 SQLite 파일 경로 (기본값: {DEFAULT_SEARCH_DB})")
+    parser.add_argument("--no-search", action="store_true", help="대화 검색 색인 끄기 (/search는 503)")
+    parser.add_argument("--blob-dir", default=DEFAULT_BLOB_DIR,
+                        help="메모리 한도를 넘은 Edit/Write 본문을 옮겨 둘 디렉토리")
+    parser.add_argument("--no-blob-disk", action="store_true",
+                        help="Edit/Write 본문을 메모리에만 보관 (한도를 넘으면 오래된 것부터 삭제)")
+    parser.add_argument("--admin-key", default=None,
+                        help="관리자 키 - 다른 사람의 요청 취소/순서 변경, 우선순위 high, 모든 세션 검색 허용 "
+                             "(WebSocket은 ?admin_key=, /search는 X-Admin-Key 헤더)")
+    parser.add_argument("--log-level", default="INFO", choices=LEVELS, help="로그 레벨 (기본값: INFO)")
+    parser.add_argument("--log-module", action="append", default=[], metavar="이름=레벨",
+                        help="모듈별 로그 레벨 (예: claude=DEBUG, 반복 가능, 모듈: server/claude/queue/ws 등)")
+    parser.add_argument("--log-json", action="store_true", help="로그를 한 줄 JSON으로 출력 (방/요청/세션 ID 포함)")
+    parser.add_argument("--log-file", default=None, help="로그 파일 경로 (크기 기준 순환)")
+    parser.add_argument("--log-max-bytes", type=int, default=LOG_FILE_MAX_BYTES,
+                        help=f"로그 파일 하나의 최대 크기 (바이트, 기본값: {LOG_FILE_MAX_BYTES})")
+    parser.add_argument("--log-backups", type=int, default=LOG_FILE_BACKUPS,
+                        help=f"보관할 이전 로그 파일 수 (기본값: {LOG_FILE_BACKUPS})")
+    parser.add_argument("--supervisor", action="store_true",
+                        help="감독 프로세스 모드 - 소켓을 유지한 채 워커를 교체하는 무중단 재시작 (Linux/macOS)")
+    # 감독 프로세스가 워커를 띄울 때 사용하는 내부 인자
+    parser.add_argument("--listen-fd", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--ready-fd", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--handoff", action="store_true", help=argparse.SUPPRESS)
     args = parser.parse_args()
+    try:
+        module_levels = parse_module_levels(args.log_module)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.supervisor:
+        sys.exit(run_supervisor(sys.argv[1:], HOST, args.port))
+
+    log_pipeline.setup(args.log_level, module_levels, args.log_json, args.log_file,
+                       max(0, args.log_max_bytes), max(0, args.log_backups))
     port = args.port
+    worker_count = max(1, args.workers)
+    progress_window = max(0, args.progress_window) / 1000
+    stream_text = not args.no_stream_text
+    batch_max = max(1, args.batch_max) if args.batch else 1
+    batch_window = max(0, args.batch_window) / 1000
+    warm_pool.size = max(0, args.warm_pool)
+    claude_limits.memory_mb = max(0, args.claude_memory)
+    claude_limits.cpu_seconds = max(0, args.claude_cpu)
+    claude_limits.open_files = max(0, args.claude_files)
+    if args.ledger_db:
+        usage_ledger.open_db(args.ledger_db)
+    request_journal.path = None if args.no_journal else args.journal
+    session_registry.path = None if args.no_session_registry else args.session_registry
+    session_registry.load()
+    session_idle_max = max(0, args.session_idle_max)
+    session_idle_ttl = max(0, args.session_idle_ttl) * 60
+    blob_store.directory = None if args.no_blob_disk else args.blob_dir
+    transcripts.directory = None if args.no_history else args.history_dir
+    if not args.no_search:
+        search_index.open_db(args.search_db)
+    blob_store.load_index()
+    supervised = args.listen_fd is not None
+    admin_key = args.admin_key or None
+    # 인계 모드: 이전 워커가 아직 저널을 쓰고 있으므로 종료 후(SIGUSR1) 읽음
+    handoff_pending = args.handoff and request_journal.enabled
+    if not handoff_pending:
+        request_journal.load()
 
     print("=" * 50)
     print("Chat Socket 통합 서버 (HTTP + WebSocket)")
@@ -783,11 +1733,11 @@ def main():
         print("Claude CLI: OK")
     else:
         print("Claude CLI: 실패 - claude CLI를 확인하세요.")
-        return
+        sys.exit(1)
 
-    # 세션 ID 초기화
-    session_id = str(uuid.uuid4())
-    print(f"세션 ID: {session_id}")
+    # 기본 방 세션 초기화
+    print(f"세션 ID: {get_session(DEFAULT_ROOM).session_id}")
+    print(f"Claude 워커: {worker_count}개 (예열 프로세스: {warm_pool.size}개)")
 
     print("-" * 50)
     print(f"HTTP:      http://{HOST}:{port}/")
@@ -801,7 +1751,11 @@ def main():
     print("=" * 50)
 
     # 서버 실행
-    web.run_app(init_app(), host=HOST, port=port, print=None)
+    if supervised:
+        sock = socket.socket(fileno=args.listen_fd)
+        asyncio.run(serve_worker(sock, args.ready_fd))
+    else:
+        web.run_app(init_app(), host=HOST, port=port, print=None)
 
 
 if __name__ == "__main__":
@@ -809,3 +1763,5 @@ if __name__ == "__main__":
         main()
     except KeyboardInterrupt:
         print("\n서버 종료")
+    finally:
+        log_pipeline.stop()
@@ -1,37 +1,97 @@
 // Chat Socket Service Worker
-const CACHE_NAME = 'chat-socket-v1';
-const STATIC_ASSETS = [
-  '/',
-  '/index.html',
-  '/manifest.json',
-  '/icons/icon-72x72.png',
-  '/icons/icon-96x96.png',
-  '/icons/icon-128x128.png',
-  '/icons/icon-144x144.png',
-  '/icons/icon-152x152.png',
-  '/icons/icon-192x192.png',
-  '/icons/icon-384x384.png',
-  '/icons/icon-512x512.png'
-];
-
-// 외부 리소스 (CDN)
-const EXTERNAL_ASSETS = [
-  'https://cdn.jsdelivr.net/npm/marked/marked.min.js'
-];
-
-// 설치 이벤트 - 정적 리소스 캐싱
+//
+// 서버가 /asset-manifest.json 으로 URL별 내용 해시를 알려 준다.
+// 이전에 받은 목록과 비교하여 해시가 바뀐 파일만 다시 받고,
+// 목록에서 빠진 파일은 캐시에서 지운다. (버전 번호를 손으로 올릴 필요 없음)
+const CACHE_NAME = 'chat-socket-assets';
+const MANIFEST_URL = '/asset-manifest.json';
+
+let syncing = null;  // 진행 중인 동기화 (중복 실행 방지)
+
+// 캐시에 저장해 둔 이전 목록 읽기
+async function readStoredManifest(cache) {
+  const response = await cache.match(MANIFEST_URL);
+  if (!response) {
+    return { version: null, assets: {} };
+  }
+  try {
+    return await response.json();
+  } catch (e) {
+    return { version: null, assets: {} };
+  }
+}
+
+// 서버 목록과 캐시를 맞춤 - 바뀐 파일만 다시 받음
+async function syncAssets() {
+  const response = await fetch(MANIFEST_URL, { cache: 'no-store' });
+  if (!response.ok) {
+    throw new Error(`목록 요청 실패: ${response.status}`);
+  }
+  const manifest = await response.json();
+  const cache = await caches.open(CACHE_NAME);
+  const stored = await readStoredManifest(cache);
+  if (stored.version === manifest.version) {
+    return;
+  }
+
+  // 해시가 바뀌었거나 캐시에 없는 파일만 다시 받기
+  const changed = [];
+  for (const [url, hash] of Object.entries(manifest.assets)) {
+    if (stored.assets[url] !== hash || !(await cache.match(url))) {
+      changed.push(url);
+    }
+  }
+  const results = await Promise.allSettled(changed.map(async (url) => {
+    const assetResponse = await fetch(url, { cache: 'no-cache' });
+    if (!assetResponse.ok) {
+      throw new Error(`${url}: ${assetResponse.status}`);
+    }
+    await cache.put(url, assetResponse);
+  }));
+
+  // 받지 못한 파일은 다음 동기화 때 다시 시도하도록 이전 해시를 유지
+  const assets = { ...manifest.assets };
+  let complete = true;
+  results.forEach((result, i) => {
+    if (result.status === 'rejected') {
+      console.log('[ServiceWorker] 캐싱 실패:', result.reason);
+      complete = false;
+      if (changed[i] in stored.assets) {
+        assets[changed[i]] = stored.assets[changed[i]];
+      } else {
+        delete assets[changed[i]];
+      }
+    }
+  });
+
+  // 목록에서 빠진 파일 삭제
+  for (const url of Object.keys(stored.assets)) {
+    if (!(url in manifest.assets)) {
+      await cache.delete(url);
+    }
+  }
+
+  await cache.put(MANIFEST_URL, new Response(JSON.stringify({
+    version: complete ? manifest.version : null,
+    assets
+  }), { headers: { 'Content-Type': 'application/json' } }));
+  console.log(`[ServiceWorker] 동기화 완료: ${changed.length}개 갱신 (${manifest.version})`);
+}
+
+function syncAssetsOnce() {
+  if (!syncing) {
+    syncing = syncAssets()
+      .catch((error) => console.log('[ServiceWorker] 동기화 실패:', error))
+      .finally(() => { syncing = null; });
+  }
+  return syncing;
+}
+
+// 설치 이벤트 - 목록 기준으로 정적 리소스 캐싱
 self.addEventListener('install', (event) => {
   console.log('[ServiceWorker] 설치 중...');
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then((cache) => {
-        console.log('[ServiceWorker] 정적 리소스 캐싱');
-        // 정적 리소스 캐싱 (실패해도 계속 진행)
-        return Promise.allSettled([
-          ...STATIC_ASSETS.map(url => cache.add(url).catch(() => console.log(`캐싱 실패: ${url}`))),
-          ...EXTERNAL_ASSETS.map(url => cache.add(url).catch(() => console.log(`캐싱 실패: ${url}`)))
-        ]);
-      })
+    syncAssetsOnce()
       .then(() => {
         console.log('[ServiceWorker] 설치 완료');
         return self.skipWaiting();
@@ -39,7 +99,7 @@ self.addEventListener('install', (event) => {
   );
 });
 
-// 활성화 이벤트 - 오래된 캐시 정리
+// 활성화 이벤트 - 이전 방식(버전 이름)의 캐시 정리
 self.addEventListener('activate', (event) => {
   console.log('[ServiceWorker] 활성화 중...');
   event.waitUntil(
@@ -61,52 +121,50 @@ self.addEventListener('activate', (event) => {
   );
 });
 
-// Fetch 이벤트 - 네트워크 우선, 캐시 폴백
+// Fetch 이벤트
+// - 페이지 이동: 네트워크 우선 (채팅 앱은 항상 최신 화면 필요), 실패 시 캐시
+//   이동할 때마다 백그라운드에서 목록을 확인하여 바뀐 파일만 갱신
+// - 목록에 있는 정적 리소스: 캐시 우선 (해시로 무효화되므로 항상 최신)
+// - 그 외 (WebSocket, /usage, /metrics 등): 관여하지 않음
 self.addEventListener('fetch', (event) => {
-  const url = new URL(event.request.url);
+  const request = event.request;
+  const url = new URL(request.url);
 
-  // WebSocket 요청은 무시
-  if (url.protocol === 'ws:' || url.protocol === 'wss:') {
+  if (request.method !== 'GET' || url.origin !== self.location.origin) {
     return;
   }
 
-  // API 요청이나 WebSocket 업그레이드는 네트워크로
-  if (event.request.url.includes('/ws') ||
-      event.request.headers.get('Upgrade') === 'websocket') {
+  // WebSocket 업그레이드는 네트워크로
+  if (url.pathname === '/ws' || request.headers.get('Upgrade') === 'websocket') {
+    return;
+  }
+
+  // 대화 기록/검색 결과는 계속 바뀌므로 캐시하지 않음
+  if (url.pathname === '/history' || url.pathname === '/search') {
+    return;
+  }
+
+  if (request.mode === 'navigate') {
+    event.waitUntil(syncAssetsOnce());
+    event.respondWith(
+      fetch(request)
+        .catch(() => caches.match('/'))
+        .then((response) => response || new Response('오프라인 상태입니다.', {
+          status: 503,
+          statusText: 'Service Unavailable'
+        }))
+    );
+    return;
+  }
+
+  if (url.pathname === MANIFEST_URL) {
     return;
   }
 
   event.respondWith(
-    // 네트워크 우선 전략 (채팅 앱은 항상 최신 데이터 필요)
-    fetch(event.request)
-      .then((response) => {
-        // 성공적인 응답은 캐시에 저장
-        if (response.status === 200) {
-          const responseClone = response.clone();
-          caches.open(CACHE_NAME)
-            .then((cache) => {
-              cache.put(event.request, responseClone);
-            });
-        }
-        return response;
-      })
-      .catch(() => {
-        // 네트워크 실패 시 캐시에서 제공
-        return caches.match(event.request)
-          .then((response) => {
-            if (response) {
-              return response;
-            }
-            // 캐시에도 없으면 오프라인 페이지 표시
-            if (event.request.mode === 'navigate') {
-              return caches.match('/');
-            }
-            return new Response('오프라인 상태입니다.', {
-              status: 503,
-              statusText: 'Service Unavailable'
-            });
-          });
-      })
+    caches.open(CACHE_NAME)
+      .then((cache) => cache.match(url.pathname))
+      .then((cached) => cached || fetch(request))
   );
 });
 
@@ -0,0 +1,157 @@
+"""Claude 세션 레지스트리 (연결이 끊겨도 세션 유지 + 토큰으로 다시 연결)
+
+방의 마지막 클라이언트가 나가도 세션을 리셋하지 않고 유휴 상태로 남겨 두므로,
+휴대폰 화면이 잠깐 꺼졌다 켜져도 다음 요청이 -r로 이전 대화를 이어 간다.
+
+- 메모리(서버의 sessions): 클라이언트도 요청도 없는 유휴 세션은 최근 사용 순으로
+  SESSION_IDLE_MAX개까지, SESSION_IDLE_TTL 동안만 유지 (넘으면 메모리에서 제거)
+- 디스크(이 레지스트리): 세션마다 토큰 -> 방, 세션 ID, 시작 여부, 소유자, 마지막 활동 시각
+  SESSION_REGISTRY_MAX개까지, SESSION_REGISTRY_TTL 동안 보관 (JSON 파일, 임시 파일 후 이름 변경)
+- 클라이언트는 hello 프레임으로 받은 토큰을 보관했다가 ?token=으로 접속하면,
+  메모리에서 제거된 세션이나 서버 재시작 전 세션도 같은 세션 ID로 이어서 사용한다.
+
+변경 사항은 표시만 해 두었다가 SESSION_SAVE_INTERVAL마다 한 번에 쓴다 (쓰기는 스레드에서 실행).
+"""
+import json
+import os
+import secrets
+import time
+
+from background_writer import BackgroundWriter
+from log_pipeline import get_logger
+
+log = get_logger("sessions")
+
+# 설정
+SESSION_IDLE_MAX = 20  # 메모리에 유지할 최대 유휴 세션 수 (최근 사용 순)
+SESSION_IDLE_TTL = 30 * 60  # 유휴 세션을 메모리에 유지할 시간 (초)
+SESSION_REGISTRY_MAX = 500  # 레지스트리에 보관할 최대 세션 수 (최근 사용 순)
+SESSION_REGISTRY_TTL = 7 * 24 * 60 * 60  # 토큰으로 다시 연결할 수 있는 기간 (마지막 활동 기준, 초)
+SESSION_SAVE_INTERVAL = 2.0  # 변경 사항을 모았다가 파일에 쓰는 간격 (초)
+SESSION_SWEEP_INTERVAL = 60  # 유휴 세션 정리 주기 (초)
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def select_evictions(entries: list, now: float, max_count: int, ttl: float) -> list:
+    """(키, 마지막 활동 시각) 목록 중 제거할 키 (ttl이 지난 것 + max_count를 넘는 오래된 것)"""
+    ordered = sorted(entries, key=lambda entry: entry[1], reverse=True)
+    evicted = [key for key, last_active in ordered[max_count:]]
+    evicted.extend(key for key, last_active in ordered[:max_count] if now - last_active > ttl)
+    return evicted
+
+
+class SessionRegistry:
+    """토큰 -> 세션 정보 (room, session_id, started, owner, created, last_active)"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.entries = {}
+        self.stats = {"resumed": 0, "evicted": 0, "expired": 0}
+        self._dirty = False
+        self.writer = BackgroundWriter("세션", SESSION_SAVE_INTERVAL, self._collect, self._write)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def load(self):
+        """파일에서 읽어 현재 항목과 합침 (같은 토큰은 마지막 활동이 나중인 쪽 사용)"""
+        if not self.enabled:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning(f"[세션] 레지스트리 읽기 실패: {e}")
+            return
+        for token, entry in saved.items():
+            current = self.entries.get(token)
+            if current is None or entry.get("last_active", 0) > current.get("last_active", 0):
+                self.entries[token] = entry
+        self.prune()
+        if self.entries:
+            log.info(f"[세션] 레지스트리 복원: {len(self.entries)}개 ({self.path})")
+
+    # --------------------------------------------------------
+    # 조회/기록
+    # --------------------------------------------------------
+
+    def get(self, token: str):
+        """토큰의 세션 정보 (없거나 만료되었으면 None)"""
+        entry = self.entries.get(token) if token else None
+        if entry is None or time.time() - entry["last_active"] > SESSION_REGISTRY_TTL:
+            return None
+        return entry
+
+    def record(self, token: str, room: str, session_id: str, started: bool, owner: str = None,
+               last_active: float = None):
+        """세션 정보 기록 (처음이면 생성 시각도 기록)"""
+        entry = self.entries.setdefault(token, {"room": room, "created": time.time()})
+        entry.update(room=room, session_id=session_id, started=started, owner=owner,
+                     last_active=last_active or time.time())
+        self._mark_dirty()
+
+    def remove(self, token: str):
+        if self.entries.pop(token, None) is not None:
+            self._mark_dirty()
+
+    def prune(self, live: set = frozenset()) -> list:
+        """보관 기간/개수를 넘은 항목 삭제 후 삭제한 토큰 목록 반환 (live: 메모리에 있는 세션의 토큰, 삭제하지 않음)"""
+        now = time.time()
+        candidates = [(token, entry.get("last_active", 0)) for token, entry in self.entries.items()
+                      if token not in live]
+        removed = select_evictions(candidates, now, max(0, SESSION_REGISTRY_MAX - len(live)), SESSION_REGISTRY_TTL)
+        for token in removed:
+            del self.entries[token]
+        if removed:
+            self.stats["expired"] += len(removed)
+            self._mark_dirty()
+        return removed
+
+    # --------------------------------------------------------
+    # 파일 쓰기
+    # --------------------------------------------------------
+
+    def _mark_dirty(self):
+        self._dirty = True
+        self.writer.notify()
+
+    def _collect(self):
+        """쓰기 태스크가 꺼낼 묶음: 변경이 있으면 전체 항목의 JSON"""
+        if not self.enabled or not self._dirty:
+            return None
+        self._dirty = False
+        return json.dumps(self.entries, ensure_ascii=False)
+
+    def _write(self, data: str):
+        """임시 파일에 쓴 뒤 이름 변경 (쓰기 스레드에서 실행, 실패는 로그만 남김)"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"[세션] 레지스트리 쓰기 실패: {e}")
+
+    def save(self):
+        """변경 사항을 즉시 파일에 쓰기 (종료 직전 등 동기 호출용)"""
+        self.writer.flush()
+
+    def start_writer(self):
+        """백그라운드 쓰기 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self.enabled:
+            self.writer.start()
+
+    async def close(self):
+        """쓰기 태스크 중지 후 남은 변경 사항 쓰기"""
+        await self.writer.close()
+
+    def summary(self) -> dict:
+        """/usage 엔드포인트용 레지스트리 상태"""
+        return {"path": self.path, "entries": len(self.entries), **self.stats}
@@ -0,0 +1,193 @@
+"""정적 파일 메모리 캐시
+
+index.html, PWA 파일, 아이콘을 시작 시 한 번 읽어 메모리에 두고
+gzip(brotli 패키지가 설치되어 있으면 br도) 압축본을 미리 만들어 둔다.
+요청마다 디스크를 읽지 않으며, 강한 ETag와 Cache-Control을 붙이고
+If-None-Match가 일치하면 304로 응답한다.
+
+파일이 디스크에서 바뀌면(mtime/크기) 다음 요청 때 다시 읽는다.
+
+manifest()는 공개 URL별 내용 해시 목록을 만든다. Service Worker는 이 목록을
+이전에 받은 목록과 비교하여 해시가 바뀐 파일만 다시 받는다.
+"""
+import gzip
+import hashlib
+import os
+import time
+
+from aiohttp import web
+
+from log_pipeline import get_logger
+
+log = get_logger("static")
+
+try:
+    import brotli  # 선택 의존성 (pip install brotli)
+except ImportError:
+    brotli = None
+
+# 설정
+STATIC_RECHECK_INTERVAL = 2  # 디스크 변경 확인 최소 간격 (초)
+STATIC_MIN_COMPRESS_SIZE = 512  # 이보다 작은 파일은 압축하지 않음 (바이트)
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".webmanifest": "application/manifest+json; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".css": "text/css; charset=utf-8",
+}
+COMPRESSIBLE = {".html", ".js", ".json", ".webmanifest", ".svg", ".css"}
+
+
+class Asset:
+    """메모리에 올린 정적 파일 하나 (원본 + 압축본 + ETag)"""
+
+    def __init__(self, path: str, content_type: str = None, cache_control: str = "no-cache"):
+        self.path = path
+        self.cache_control = cache_control
+        ext = os.path.splitext(path)[1].lower()
+        self.content_type = content_type or CONTENT_TYPES.get(ext, "application/octet-stream")
+        self.compressible = ext in COMPRESSIBLE
+        self.stamp = None  # (mtime, size)
+        self.checked_at = 0.0
+        self.bodies = {}  # 인코딩("identity"/"gzip"/"br") -> 바이트
+        self.digest = ""
+        self.load()
+
+    def load(self):
+        """디스크에서 읽고 압축본/ETag 생성"""
+        stat = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            body = f.read()
+        self.stamp = (stat.st_mtime, stat.st_size)
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.bodies = {"identity": body}
+        if self.compressible and len(body) >= STATIC_MIN_COMPRESS_SIZE:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body)
+
+    def refresh(self) -> bool:
+        """일정 간격으로 디스크 변경을 확인하여 다시 읽기 (파일이 사라졌으면 False)"""
+        now = time.monotonic()
+        if now - self.checked_at < STATIC_RECHECK_INTERVAL:
+            return True
+        self.checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_mtime, stat.st_size) != self.stamp:
+            self.load()
+            log.info(f"[정적 파일] 다시 읽음: {os.path.basename(self.path)}")
+        return True
+
+    def etag(self, encoding: str) -> str:
+        """표현(인코딩)별 강한 ETag"""
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest[:20]}{suffix}"'
+
+    @property
+    def size(self) -> int:
+        return len(self.bodies["identity"])
+
+
+def choose_encoding(asset: Asset, accept_encoding: str) -> str:
+    """Accept-Encoding에 맞는 가장 작은 압축본 선택"""
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in asset.bodies and encoding in accepted:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: str, etags: set) -> bool:
+    """If-None-Match 헤더가 현재 ETag 중 하나와 일치하는지 여부"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        candidates.add(tag[2:] if tag.startswith("W/") else tag)
+    return bool(candidates & etags)
+
+
+class AssetCache:
+    """이름 -> Asset 캐시와 HTTP 응답 생성
+
+    stats: 응답 수, 304 수, 전송 바이트, 압축/304로 절약한 바이트
+    """
+
+    def __init__(self):
+        self.assets = {}
+        self.urls = {}  # 공개 URL -> 이름
+        self.stats = {"responses": 0, "not_modified": 0, "bytes_sent": 0, "bytes_saved": 0}
+
+    def add(self, name: str, path: str, content_type: str = None, cache_control: str = "no-cache",
+            url: str = None):
+        """파일 등록 (없거나 읽을 수 없으면 건너뜀), url 기본값은 /이름"""
+        try:
+            self.assets[name] = Asset(path, content_type, cache_control)
+        except OSError as e:
+            log.warning(f"[정적 파일] 읽기 실패: {path} ({e})")
+            return
+        self.urls[url or f"/{name}"] = name
+
+    def add_directory(self, prefix: str, directory: str, cache_control: str = "no-cache"):
+        """디렉토리의 파일을 prefix/파일명으로 등록"""
+        if not os.path.isdir(directory):
+            return
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if os.path.isfile(path) and os.path.splitext(filename)[1].lower() in CONTENT_TYPES:
+                self.add(f"{prefix}/{filename}", path, cache_control=cache_control)
+
+    def manifest(self, exclude: tuple = ()) -> dict:
+        """공개 URL -> 내용 해시 목록과 전체 버전 (디스크 변경 반영)
+
+        exclude: 목록에서 뺄 URL (Service Worker 자신 등)
+        """
+        assets = {}
+        for url, name in sorted(self.urls.items()):
+            asset = self.assets.get(name)
+            if url in exclude or asset is None or not asset.refresh():
+                continue
+            assets[url] = asset.digest[:20]
+        version = hashlib.sha256(
+            "\n".join(f"{url} {digest}" for url, digest in assets.items()).encode("utf-8")
+        ).hexdigest()[:20]
+        return {"version": version, "assets": assets}
+
+    def response(self, request, name: str):
+        """캐시된 파일로 응답 (304/압축 처리), 없으면 404"""
+        asset = self.assets.get(name)
+        if asset is None or not asset.refresh():
+            return web.Response(text=f"{name} not found", status=404)
+
+        encoding = choose_encoding(asset, request.headers.get("Accept-Encoding", ""))
+        etag = asset.etag(encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        self.stats["responses"] += 1
+
+        all_etags = {asset.etag(enc) for enc in asset.bodies}
+        if etag_matches(request.headers.get("If-None-Match", ""), all_etags):
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += asset.size
+            return web.Response(status=304, headers=headers)
+
+        body = asset.bodies[encoding]
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        self.stats["bytes_sent"] += len(body)
+        self.stats["bytes_saved"] += asset.size - len(body)
+        return web.Response(body=body, headers=headers, content_type=asset.content_type.split(";")[0],
+                            charset="utf-8" if "charset" in asset.content_type else None)
@@ -0,0 +1,324 @@
+"""Claude CLI stream-json 이벤트 파서
+
+Claude CLI(`--output-format stream-json`)가 출력하는 한 줄을 서버가 처리할
+정규화된 이벤트 목록으로 바꾼다. 이벤트 종류별 처리 함수와 도구별 표시 정보
+추출 함수는 등록표(EVENT_HANDLERS, STREAM_EVENT_HANDLERS, TOOL_EXTRACTORS)에
+데코레이터로 등록하므로, 새 도구는 추출 함수 하나만 추가하면 된다.
+
+빠른 경로:
+- orjson 패키지가 설치되어 있으면 json 대신 orjson으로 디코딩 (선택 사항, `pip install orjson`)
+- 줄 앞부분(`{"type":"..."`)만 보고 처리하지 않는 이벤트는 디코딩하지 않고 건너뜀
+  (message_start/stop, content_block_stop, input_json_delta 등 partial 메시지의 대부분)
+
+반환 이벤트 (종류, 내용):
+- ("init", {"model", "session_id"})
+- ("tool_use", {"tool", "detail", "edit_info"}): edit_info의 old/new/content는 미리보기,
+  blob 저장소가 있으면 old_blob/new_blob/content_blob에 {"hash", "size"}
+- ("text", 텍스트): assistant 메시지의 텍스트 블록
+- ("text_delta", 텍스트): partial 메시지의 텍스트 조각
+- ("text_block", None): 새 텍스트 블록 시작 (partial 메시지)
+- ("tool_result", None 또는 {"lines"?}): 도구 결과 (None이면 표시할 결과 없음)
+- ("result", {"turns", "duration_ms", "cost_usd", "input_tokens", "output_tokens", "cache_tokens", "result"})
+"""
+import json
+import re
+
+try:
+    import orjson  # 선택 의존성 (pip install orjson)
+except ImportError:
+    orjson = None
+
+# 설정
+TOOL_DETAIL_MAX = 100  # 진행 상황에 표시할 명령/설명/URL 최대 길이
+EDIT_PREVIEW_MAX = 500  # Edit/Write 미리보기 최대 길이 (blob 저장소가 없을 때)
+BLOB_PREVIEW_MAX = 200  # blob 저장소가 있을 때 미리보기 길이 (전체 본문은 /blob에서)
+BLOB_FIELDS = ("old", "new", "content")  # edit_info 중 blob으로 저장하는 본문 필드
+
+# 정규화된 이벤트 종류
+INIT = "init"
+TOOL_USE = "tool_use"
+TEXT = "text"
+TEXT_DELTA = "text_delta"
+TEXT_BLOCK = "text_block"
+TOOL_RESULT = "tool_result"
+RESULT = "result"
+
+EVENT_HANDLERS = {}  # 최상위 type -> 처리 함수(parser, data) -> 이벤트 목록
+STREAM_EVENT_HANDLERS = {}  # stream_event의 event.type -> 처리 함수(parser, event) -> 이벤트 목록
+TOOL_EXTRACTORS = {}  # 도구 이름 -> 추출 함수(tool_input, relative_path) -> (detail, edit_info)
+
+
+def event_handler(event_type: str):
+    """최상위 이벤트 처리 함수 등록 데코레이터"""
+    def register(func):
+        EVENT_HANDLERS[event_type] = func
+        return func
+    return register
+
+
+def stream_event_handler(event_type: str):
+    """stream_event(partial 메시지) 처리 함수 등록 데코레이터"""
+    def register(func):
+        STREAM_EVENT_HANDLERS[event_type] = func
+        return func
+    return register
+
+
+def tool_extractor(*names: str):
+    """도구 표시 정보 추출 함수 등록 데코레이터"""
+    def register(func):
+        for name in names:
+            TOOL_EXTRACTORS[name] = func
+        return func
+    return register
+
+
+def skip_pattern():
+    """디코딩하지 않아도 되는 줄의 앞부분에만 일치하는 정규식 (그룹 1: 최상위 type)
+
+    등록표에 없는 최상위 type, 등록표에 없는 stream_event, 텍스트가 아닌 content_block_delta
+    (input_json_delta, thinking_delta 등)에 일치한다. 키 순서가 실제 CLI 출력과 다르면
+    일치하지 않으므로 전체 디코딩으로 처리된다. JSON.stringify/json.dumps 구분자 모두 허용.
+    """
+    known = "|".join(map(re.escape, EVENT_HANDLERS))
+    stream_known = "|".join(map(re.escape, STREAM_EVENT_HANDLERS))
+    return re.compile(
+        r'\{"type": ?"('
+        rf'(?!(?:{known})")\w+'
+        r'|stream_event(?=", ?"event": ?\{"type": ?"(?:'
+        rf'(?!(?:{stream_known})")\w+"'
+        r'|content_block_delta", ?"index": ?\d+, ?"delta": ?\{"type": ?"(?!text_delta")'
+        r')))'
+    )
+
+
+def _clip(value, limit: int = TOOL_DETAIL_MAX) -> str:
+    return value[:limit] if isinstance(value, str) else ""
+
+
+class StreamParser:
+    """stream-json 한 줄 -> (최상위 type, 정규화된 이벤트 목록)
+
+    relative_path: 파일 경로 표시용 변환 함수 (기본값: 그대로)
+    loads: JSON 디코딩 함수 (기본값: orjson이 있으면 orjson.loads, 없으면 json.loads)
+    blobs: Edit/Write 전체 본문을 저장할 BlobStore (없으면 미리보기만 프레임에 포함)
+    """
+
+    def __init__(self, relative_path=None, loads=None, blobs=None):
+        self.relative_path = relative_path or (lambda path: path or "")
+        self.blobs = blobs
+        self.loads = loads or (orjson.loads if orjson is not None else json.loads)
+        # 처리 함수 등록은 모듈 읽을 때 끝나므로 생성 시 한 번만 만듦
+        self._skip = skip_pattern().match
+        self.decoded = 0
+        self.skipped = 0
+        self.errors = 0
+
+    @property
+    def stats(self) -> dict:
+        return {"lines": self.decoded + self.skipped + self.errors, "decoded": self.decoded,
+                "skipped": self.skipped, "errors": self.errors}
+
+    def parse(self, line: str):
+        """한 줄 처리 (잘못된 JSON/처리하지 않는 이벤트는 빈 목록)"""
+        skip = self._skip(line)
+        if skip is not None:
+            self.skipped += 1
+            return skip.group(1), ()
+        try:
+            data = self.loads(line)
+        except ValueError:  # json.JSONDecodeError, orjson.JSONDecodeError 모두 ValueError
+            self.errors += 1
+            return None, ()
+        self.decoded += 1
+        if not isinstance(data, dict):
+            return None, ()
+        json_type = data.get("type", "")
+        handler = EVENT_HANDLERS.get(json_type)
+        if handler is None:
+            return json_type, ()
+        return json_type, handler(self, data)
+
+    def tool_use(self, name: str, tool_input) -> dict:
+        """도구 호출의 진행 상황 표시 정보"""
+        if not isinstance(tool_input, dict):
+            tool_input = {}
+        detail, edit_info = "", None
+        extractor = TOOL_EXTRACTORS.get(name)
+        if extractor is not None:
+            detail, edit_info = extractor(tool_input, self.relative_path)
+        if edit_info:
+            self.shorten(edit_info)
+        return {"tool": name, "detail": detail, "edit_info": edit_info}
+
+    def shorten(self, edit_info: dict):
+        """추출 함수가 넣은 전체 본문을 미리보기로 줄임 (blob 저장소가 있으면 {필드}_blob에 해시/크기)"""
+        limit = BLOB_PREVIEW_MAX if self.blobs is not None else EDIT_PREVIEW_MAX
+        for field in BLOB_FIELDS:
+            text = edit_info.get(field)
+            if not isinstance(text, str):
+                continue
+            if self.blobs is not None:
+                edit_info[f"{field}_blob"] = self.blobs.put(text)
+            edit_info[field] = text[:limit]
+
+
+# ============================================================
+# 이벤트 종류별 처리
+# ============================================================
+
+@event_handler("system")
+def _system(parser: StreamParser, data: dict):
+    if data.get("subtype") != "init":
+        return ()
+    return ((INIT, {"model": data.get("model", "unknown"), "session_id": data.get("session_id", "")}),)
+
+
+@event_handler("assistant")
+def _assistant(parser: StreamParser, data: dict):
+    msg = data.get("message")
+    if not isinstance(msg, dict):
+        return ()
+    items = msg.get("content")
+    if not isinstance(items, list):
+        return ()
+    events = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get("type")
+        if item_type == "tool_use":
+            events.append((TOOL_USE, parser.tool_use(item.get("name", "unknown"), item.get("input"))))
+        elif item_type == "text":
+            events.append((TEXT, item.get("text", "")))
+    return events
+
+
+@event_handler("stream_event")
+def _stream_event(parser: StreamParser, data: dict):
+    event = data.get("event")
+    if not isinstance(event, dict):
+        return ()
+    handler = STREAM_EVENT_HANDLERS.get(event.get("type"))
+    return handler(parser, event) if handler is not None else ()
+
+
+@stream_event_handler("content_block_delta")
+def _content_block_delta(parser: StreamParser, event: dict):
+    delta = event.get("delta")
+    if isinstance(delta, dict) and delta.get("type") == "text_delta":
+        text = delta.get("text", "")
+        if text:
+            return ((TEXT_DELTA, text),)
+    return ()
+
+
+@stream_event_handler("content_block_start")
+def _content_block_start(parser: StreamParser, event: dict):
+    block = event.get("content_block")
+    if isinstance(block, dict) and block.get("type") == "text":
+        return ((TEXT_BLOCK, None),)
+    return ()
+
+
+@event_handler("user")
+def _user(parser: StreamParser, data: dict):
+    tool_result = data.get("tool_use_result")
+    if not tool_result or not isinstance(tool_result, dict):
+        return ((TOOL_RESULT, None),)
+    file_info = tool_result.get("file")
+    if file_info and isinstance(file_info, dict):
+        return ((TOOL_RESULT, {"lines": file_info.get("numLines", 0)}),)
+    return ((TOOL_RESULT, {}),)
+
+
+@event_handler("result")
+def _result(parser: StreamParser, data: dict):
+    usage = data.get("usage")
+    if not isinstance(usage, dict):
+        usage = {}
+    return ((RESULT, {
+        "turns": data.get("num_turns") or 0,
+        "duration_ms": data.get("duration_ms") or 0,
+        "cost_usd": data.get("total_cost_usd") or 0,
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cache_tokens": usage.get("cache_read_input_tokens") or 0,
+        "result": data.get("result")
+    }),)
+
+
+# ============================================================
+# 도구별 표시 정보 (detail: 한 줄 설명, edit_info: 펼쳐 보이는 추가 정보)
+# ============================================================
+
+@tool_extractor("Read")
+def _read(tool_input: dict, relative_path):
+    return relative_path(tool_input.get("file_path", "")), None
+
+
+@tool_extractor("Bash")
+def _bash(tool_input: dict, relative_path):
+    return _clip(tool_input.get("command")), None
+
+
+@tool_extractor("Edit")
+def _edit(tool_input: dict, relative_path):
+    rel_path = relative_path(tool_input.get("file_path", ""))
+    old_string = tool_input.get("old_string") or ""
+    new_string = tool_input.get("new_string") or ""
+    edit_info = None
+    if old_string or new_string:
+        edit_info = {
+            "type": "edit",
+            "file": rel_path,
+            "old": old_string,
+            "new": new_string
+        }
+    return rel_path, edit_info
+
+
+@tool_extractor("Write")
+def _write(tool_input: dict, relative_path):
+    rel_path = relative_path(tool_input.get("file_path", ""))
+    write_content = tool_input.get("content") or ""
+    edit_info = None
+    if write_content:
+        edit_info = {"type": "write", "file": rel_path, "content": write_content}
+    return rel_path, edit_info
+
+
+@tool_extractor("Grep", "Glob")
+def _search(tool_input: dict, relative_path):
+    pattern = tool_input.get("pattern") or ""
+    path = tool_input.get("path")
+    if pattern and path:
+        return f"{pattern} ({relative_path(path)})", None
+    return pattern, None
+
+
+@tool_extractor("TodoWrite")
+def _todo_write(tool_input: dict, relative_path):
+    todos = tool_input.get("todos")
+    if todos and isinstance(todos, list):
+        return f"{len(todos)}개 항목", {"type": "todo", "todos": todos}
+    return "", None
+
+
+@tool_extractor("Task")
+def _task(tool_input: dict, relative_path):
+    agent = tool_input.get("subagent_type") or ""
+    description = _clip(tool_input.get("description"))
+    if agent and description:
+        return f"{agent}: {description}", None
+    return agent or description, None
+
+
+@tool_extractor("WebFetch")
+def _web_fetch(tool_input: dict, relative_path):
+    return _clip(tool_input.get("url")), None
+
+
+@tool_extractor("WebSearch")
+def _web_search(tool_input: dict, relative_path):
+    return _clip(tool_input.get("query")), None
@@ -0,0 +1,181 @@
+"""무중단 재시작 감독(supervisor) 프로세스 (Linux/macOS)
+
+감독 프로세스가 수신 소켓을 열어 계속 들고 있고, 실제 서버(워커)는 그 소켓을
+물려받아 실행된다. 재시작 요청(SIGHUP) 시 순서:
+
+1. 같은 소켓으로 새 워커 시작 (--handoff: 저널을 아직 읽지 않고 요청 처리도 보류)
+2. 새 워커가 준비 완료를 알릴 때까지 대기 (준비 파이프)
+3. 이전 워커에 SIGTERM - 수신 중단, 처리 중인 Claude 요청 완료 후 클라이언트에
+   재연결 안내, 저널 기록 후 종료
+4. 새 워커에 SIGUSR1 - 저널(대기 요청/세션)을 이어받아 처리 시작
+
+소켓은 감독 프로세스가 계속 열고 있으므로 교체 중에도 새 연결이 거부되지 않고
+(커널 backlog에서 대기) 두 워커 중 하나가 받는다.
+
+워커가 스스로 종료되면(비정상 종료, exit code 100) 새 워커를 다시 띄운다.
+Ctrl+C(SIGINT/SIGTERM)는 워커에 SIGINT를 전달하여 즉시 종료시킨다.
+"""
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# 설정
+SUPERVISOR_READY_TIMEOUT = 60  # 새 워커 준비 완료 대기 시간 (초, 초과 시 교체 취소)
+SUPERVISOR_DRAIN_TIMEOUT = 360  # 이전 워커 정리 대기 시간 (초, 초과 시 강제 종료)
+SUPERVISOR_RESPAWN_DELAY = 2  # 워커가 스스로 종료된 뒤 다시 띄우기까지 대기 시간 (초)
+
+
+def create_listen_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    """워커들이 물려받을 수신 소켓 생성"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def notify_ready(ready_fd: int):
+    """워커: 준비 완료를 감독 프로세스에 알림"""
+    try:
+        os.write(ready_fd, b"1")
+        os.close(ready_fd)
+    except OSError:
+        pass
+
+
+class Supervisor:
+    """수신 소켓을 들고 워커를 교체하는 감독 프로세스"""
+
+    def __init__(self, worker_cmd: list, host: str, port: int):
+        self.worker_cmd = worker_cmd
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.worker = None
+        self.restart_requested = False
+        self.stop_requested = False
+
+    def spawn(self, handoff: bool):
+        """소켓을 물려준 워커 시작, 준비 완료까지 대기 (실패 시 None)"""
+        ready_read, ready_write = os.pipe()
+        cmd = self.worker_cmd + ["--listen-fd", str(self.sock.fileno()), "--ready-fd", str(ready_write)]
+        if handoff:
+            cmd.append("--handoff")
+        # 새 세션으로 띄워 터미널 Ctrl+C는 감독 프로세스만 받게 함
+        process = subprocess.Popen(cmd, pass_fds=(self.sock.fileno(), ready_write), start_new_session=True)
+        os.close(ready_write)
+        print(f"[감독] 워커 시작 (PID: {process.pid}{', 인계 대기' if handoff else ''})", flush=True)
+
+        ready = False
+        deadline = time.monotonic() + SUPERVISOR_READY_TIMEOUT
+        try:
+            while not self.stop_requested and process.poll() is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    readable, _, _ = select.select([ready_read], [], [], min(remaining, 0.5))
+                except InterruptedError:
+                    continue
+                if readable:
+                    ready = os.read(ready_read, 1) == b"1"
+                    break
+        finally:
+            os.close(ready_read)
+
+        if not ready:
+            print(f"[감독] 워커 준비 실패 (PID: {process.pid})", flush=True)
+            self.terminate(process, signal.SIGINT, 10)
+            return None
+        print(f"[감독] 워커 준비 완료 (PID: {process.pid})", flush=True)
+        return process
+
+    @staticmethod
+    def terminate(process, sig, timeout: float):
+        """워커에 신호를 보내고 종료 대기 (시간 초과 시 강제 종료)"""
+        if process.poll() is None:
+            try:
+                process.send_signal(sig)
+            except ProcessLookupError:
+                pass
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[감독] 워커 강제 종료 (PID: {process.pid})", flush=True)
+            process.kill()
+            process.wait()
+
+    def restart(self):
+        """새 워커를 준비시킨 뒤 이전 워커를 정리하고 저널 인계"""
+        print("[감독] 무중단 재시작 시작", flush=True)
+        new_worker = self.spawn(handoff=True)
+        if new_worker is None:
+            print("[감독] 재시작 취소 - 이전 워커 유지", flush=True)
+            return
+        old_worker, self.worker = self.worker, new_worker
+        # 이전 워커: 수신 중단 → 처리 중인 요청 완료 → 클라이언트 재연결 안내 → 종료
+        self.terminate(old_worker, signal.SIGTERM, SUPERVISOR_DRAIN_TIMEOUT)
+        # 새 워커: 이전 워커가 남긴 저널을 읽고 요청 처리 시작
+        try:
+            new_worker.send_signal(signal.SIGUSR1)
+        except ProcessLookupError:
+            pass
+        print(f"[감독] 재시작 완료 (PID: {old_worker.pid} → {new_worker.pid})", flush=True)
+
+    def _on_restart(self, signum, frame):
+        self.restart_requested = True
+
+    def _on_stop(self, signum, frame):
+        if self.stop_requested and self.worker is not None:
+            # 두 번째 Ctrl+C - 강제 종료
+            self.worker.kill()
+        self.stop_requested = True
+
+    def run(self) -> int:
+        if not hasattr(signal, "SIGHUP"):
+            print("[감독] 이 플랫폼에서는 --supervisor를 지원하지 않습니다. (Linux/macOS 전용)")
+            return 1
+        self.sock = create_listen_socket(self.host, self.port)
+        signal.signal(signal.SIGHUP, self._on_restart)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        print(f"[감독] 수신 소켓: {self.host}:{self.port} (재시작: kill -HUP {os.getpid()})", flush=True)
+
+        self.worker = self.spawn(handoff=False)
+        if self.worker is None:
+            return 1
+
+        while not self.stop_requested:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.restart()
+                continue
+            code = self.worker.poll()
+            if code is not None:
+                # 워커가 스스로 종료됨 (비정상 종료 또는 exit code 100) - 다시 띄움
+                print(f"[감독] 워커 종료됨 (exit code: {code}) - {SUPERVISOR_RESPAWN_DELAY}초 후 다시 시작",
+                      flush=True)
+                time.sleep(SUPERVISOR_RESPAWN_DELAY)
+                worker = self.spawn(handoff=False)
+                if worker is None:
+                    continue
+                self.worker = worker
+                continue
+            time.sleep(0.2)
+
+        print("[감독] 종료 중...", flush=True)
+        self.terminate(self.worker, signal.SIGINT, 30)
+        self.sock.close()
+        return 0
+
+
+def run_supervisor(argv: list, host: str, port: int) -> int:
+    """현재 스크립트를 워커로 실행하는 감독 프로세스 시작 (--supervisor 인자는 제외)"""
+    worker_args = [arg for arg in argv if arg != "--supervisor"]
+    worker_cmd = [sys.executable, os.path.abspath(sys.argv[0])] + worker_args
+    return Supervisor(worker_cmd, host, port).run()
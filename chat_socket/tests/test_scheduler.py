@@ -0,0 +1,73 @@
+"""scheduler.FairQueue 테스트 (요청 소유자, 보낸 사람별 한도, 라운드 로빈)
+
+실행: python -m pytest chat_socket/tests (또는 python -m unittest discover chat_socket/tests)
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import QUEUE_MAX_PER_SENDER, FairQueue  # noqa: E402
+
+
+def request(request_id: str, sender: str, owner: str = None, priority: str = "normal") -> dict:
+    """add_to_queue가 큐에 넣는 요청 (owner는 서버가 연결마다 정하는 ID)"""
+    return {"id": request_id, "sender": sender, "owner": owner, "message": f"{sender} {request_id}",
+            "priority": priority, "enqueued_at": 0.0}
+
+
+class FairQueueOwnerTest(unittest.TestCase):
+    """같은 이름을 쓰는 두 연결은 서로 다른 보낸 사람으로 취급"""
+
+    def setUp(self):
+        self.queue = FairQueue()
+        self.queue.push(request("a1", "alice", owner="conn-1"))
+        self.queue.push(request("a2", "alice", owner="conn-1"))
+        self.queue.push(request("a3", "alice", owner="conn-1"))
+
+    def test_same_username_does_not_own(self):
+        self.assertTrue(self.queue.owned_by("a1", "conn-1"))
+        self.assertFalse(self.queue.owned_by("a1", "conn-2"))
+        self.assertFalse(self.queue.owned_by("a1", "alice"))
+
+    def test_same_username_cannot_reorder(self):
+        self.assertFalse(self.queue.move("a3", 0, owner="conn-2"))
+        self.assertEqual([item["id"] for item in self.queue.ordered()], ["a1", "a2", "a3"])
+        self.assertTrue(self.queue.move("a3", 0, owner="conn-1"))
+        self.assertEqual([item["id"] for item in self.queue.ordered()], ["a3", "a1", "a2"])
+
+    def test_same_username_cannot_cancel_current(self):
+        self.queue.pop_batch(limit=2)
+        self.assertTrue(self.queue.is_current("a2"))
+        self.assertFalse(self.queue.owned_by("a2", "conn-2"))
+        self.assertTrue(self.queue.owned_by("a2", "conn-1"))
+
+    def test_batch_with_other_owner_not_owned(self):
+        self.queue.push(request("b1", "alice", owner="conn-2"))
+        self.queue.pop_batch(limit=5)
+        self.assertTrue(self.queue.is_current("b1"))
+        self.assertFalse(self.queue.owned_by("a1", "conn-1"))
+        self.assertFalse(self.queue.owned_by("b1", "conn-2"))
+
+    def test_quota_is_per_owner(self):
+        for index in range(3, QUEUE_MAX_PER_SENDER):
+            self.queue.push(request(f"a{index + 1}", "alice", owner="conn-1"))
+        self.assertEqual(self.queue.reject_reason("conn-1", self.queue.waiting), "sender_quota")
+        self.assertIsNone(self.queue.reject_reason("conn-2", self.queue.waiting))
+
+    def test_round_robin_by_owner(self):
+        self.queue.push(request("b1", "alice", owner="conn-2"))
+        self.assertEqual([item["id"] for item in self.queue.ordered()], ["a1", "b1", "a2", "a3"])
+
+    def test_owner_falls_back_to_sender(self):
+        queue = FairQueue()
+        queue.push(request("x1", "carol"))
+        self.assertTrue(queue.owned_by("x1", "carol"))
+        self.assertEqual(queue.count_owner("carol"), 1)
+        self.assertIsNotNone(queue.remove("x1"))
+        self.assertEqual(len(queue), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""stream_parser.StreamParser 테스트 (이벤트 처리 함수, 도구 추출 함수, 건너뛰기 정규식, 디코더)
+
+실행: python -m pytest chat_socket/tests (또는 python -m unittest discover chat_socket/tests)
+"""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stream_parser  # noqa: E402
+from blob_store import BlobStore  # noqa: E402
+from stream_parser import (BLOB_PREVIEW_MAX, EDIT_PREVIEW_MAX, EVENT_HANDLERS, INIT, RESULT,  # noqa: E402
+                           STREAM_EVENT_HANDLERS, TEXT, TEXT_BLOCK, TEXT_DELTA, TOOL_DETAIL_MAX,
+                           TOOL_EXTRACTORS, TOOL_RESULT, TOOL_USE, StreamParser)
+
+
+def line(data: dict, compact: bool = True) -> str:
+    """CLI 출력과 같은 한 줄 (compact: JSON.stringify 구분자, 아니면 json.dumps 기본 구분자)"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":") if compact else None)
+
+
+def reordered(data):
+    """키 순서를 뒤집은 같은 내용 (중첩 dict 포함)"""
+    if isinstance(data, dict):
+        return {key: reordered(data[key]) for key in reversed(list(data))}
+    if isinstance(data, list):
+        return [reordered(item) for item in data]
+    return data
+
+
+def stream(event: dict) -> dict:
+    return {"type": "stream_event", "event": event, "session_id": "s1", "uuid": "u1"}
+
+
+def tool_call(name: str, tool_input: dict) -> dict:
+    return {"type": "assistant", "message": {"id": "msg_1", "role": "assistant", "content": [
+        {"type": "tool_use", "id": "toolu_1", "name": name, "input": tool_input}]}}
+
+
+def relative(path: str) -> str:
+    return path.replace("/work/", "") if path else ""
+
+
+# 처리 함수별 입력 줄과 기대 이벤트
+HANDLED = [
+    ({"type": "system", "subtype": "init", "model": "claude-sonnet-4", "session_id": "s1", "tools": []},
+     [(INIT, {"model": "claude-sonnet-4", "session_id": "s1"})]),
+    ({"type": "system", "subtype": "compact_boundary"}, []),
+    ({"type": "assistant", "message": {"content": [{"type": "text", "text": "안녕"},
+                                                   {"type": "thinking", "thinking": "..."}]}},
+     [(TEXT, "안녕")]),
+    (stream({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "조각"}}),
+     [(TEXT_DELTA, "조각")]),
+    (stream({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": ""}}), []),
+    (stream({"type": "content_block_start", "index": 1, "content_block": {"type": "text", "text": ""}}),
+     [(TEXT_BLOCK, None)]),
+    (stream({"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "name": "Bash"}}),
+     []),
+    ({"type": "user", "message": {"content": []}}, [(TOOL_RESULT, None)]),
+    ({"type": "user", "tool_use_result": {"file": {"filePath": "/work/a.py", "numLines": 42}}},
+     [(TOOL_RESULT, {"lines": 42})]),
+    ({"type": "user", "tool_use_result": {"stdout": "ok"}}, [(TOOL_RESULT, {})]),
+    ({"type": "result", "subtype": "success", "num_turns": 3, "duration_ms": 1500, "total_cost_usd": 0.02,
+      "usage": {"input_tokens": 10, "output_tokens": 20, "cache_read_input_tokens": 30}, "result": "끝"},
+     [(RESULT, {"turns": 3, "duration_ms": 1500, "cost_usd": 0.02, "input_tokens": 10, "output_tokens": 20,
+                "cache_tokens": 30, "result": "끝"})]),
+    ({"type": "result", "usage": None}, [(RESULT, {"turns": 0, "duration_ms": 0, "cost_usd": 0, "input_tokens": 0,
+                                                   "output_tokens": 0, "cache_tokens": 0, "result": None})]),
+]
+
+# 도구별 입력과 기대 (detail, edit_info)
+TOOLS = [
+    ("Read", {"file_path": "/work/src/a.py"}, "src/a.py", None),
+    ("Bash", {"command": "ls -la " + "x" * 200}, ("ls -la " + "x" * 200)[:TOOL_DETAIL_MAX], None),
+    ("Edit", {"file_path": "/work/a.py", "old_string": "a = 1", "new_string": "a = 2"}, "a.py",
+     {"type": "edit", "file": "a.py", "old": "a = 1", "new": "a = 2"}),
+    ("Edit", {"file_path": "/work/a.py", "old_string": "", "new_string": ""}, "a.py", None),
+    ("Write", {"file_path": "/work/b.py", "content": "print(1)\n"}, "b.py",
+     {"type": "write", "file": "b.py", "content": "print(1)\n"}),
+    ("Write", {"file_path": "/work/b.py", "content": ""}, "b.py", None),
+    ("Grep", {"pattern": "def main", "path": "/work/src"}, "def main (src)", None),
+    ("Grep", {"pattern": "def main"}, "def main", None),
+    ("Glob", {"pattern": "**/*.py", "path": "/work/tests"}, "**/*.py (tests)", None),
+    ("Glob", {"pattern": "*.md"}, "*.md", None),
+    ("TodoWrite", {"todos": [{"content": "테스트", "status": "pending"}]}, "1개 항목",
+     {"type": "todo", "todos": [{"content": "테스트", "status": "pending"}]}),
+    ("TodoWrite", {"todos": []}, "", None),
+    ("Task", {"subagent_type": "general-purpose", "description": "코드 검토"}, "general-purpose: 코드 검토", None),
+    ("Task", {"description": "코드 검토"}, "코드 검토", None),
+    ("Task", {"subagent_type": "explore"}, "explore", None),
+    ("WebFetch", {"url": "https://example.com/" + "p" * 200}, ("https://example.com/" + "p" * 200)[:TOOL_DETAIL_MAX],
+     None),
+    ("WebSearch", {"query": "asyncio subprocess"}, "asyncio subprocess", None),
+    ("WebSearch", {"query": 3}, "", None),
+    ("UnknownTool", {"x": 1}, "", None),
+]
+
+# 건너뛰기 정규식에 일치해야 하는 줄 (처리할 이벤트가 없음)
+SKIPPED = [
+    {"type": "rate_limit_event", "rate_limit_info": {"status": "allowed"}},
+    stream({"type": "message_start", "message": {"id": "msg_1", "content": []}}),
+    stream({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 5}}),
+    stream({"type": "message_stop"}),
+    stream({"type": "content_block_stop", "index": 0}),
+    stream({"type": "content_block_delta", "index": 2, "delta": {"type": "input_json_delta", "partial_json": "{\""}}),
+    stream({"type": "content_block_delta", "index": 0, "delta": {"type": "thinking_delta", "thinking": "음"}}),
+]
+
+
+class StreamParserTest(unittest.TestCase):
+
+    def parser(self, **kwargs) -> StreamParser:
+        return StreamParser(relative_path=relative, **kwargs)
+
+    def full(self, **kwargs) -> StreamParser:
+        """건너뛰기 없이 모든 줄을 디코딩하는 파서"""
+        parser = self.parser(**kwargs)
+        parser._skip = lambda text: None
+        return parser
+
+    def test_registries_covered(self):
+        self.assertEqual(set(EVENT_HANDLERS), {"system", "assistant", "stream_event", "user", "result"})
+        self.assertEqual(set(STREAM_EVENT_HANDLERS), {"content_block_delta", "content_block_start"})
+        self.assertEqual(set(TOOL_EXTRACTORS) - {name for name, _, _, _ in TOOLS}, set())
+        handled_types = {data["type"] for data, _ in HANDLED}
+        stream_types = {data["event"]["type"] for data, _ in HANDLED if data["type"] == "stream_event"}
+        self.assertEqual(handled_types, set(EVENT_HANDLERS))
+        self.assertEqual(stream_types, set(STREAM_EVENT_HANDLERS))
+
+    def test_event_handlers(self):
+        for data, expected in HANDLED:
+            for compact in (True, False):
+                with self.subTest(data=data, compact=compact):
+                    json_type, events = self.parser().parse(line(data, compact))
+                    self.assertEqual(json_type, data["type"])
+                    self.assertEqual(list(events), expected)
+
+    def test_tool_extractors(self):
+        for name, tool_input, detail, edit_info in TOOLS:
+            with self.subTest(tool=name, tool_input=tool_input):
+                _, events = self.parser().parse(line(tool_call(name, tool_input)))
+                self.assertEqual(list(events), [(TOOL_USE, {"tool": name, "detail": detail, "edit_info": edit_info})])
+
+    def test_edit_preview(self):
+        body = "가" * (EDIT_PREVIEW_MAX + 50)
+        _, events = self.parser().parse(line(tool_call("Write", {"file_path": "/work/c.py", "content": body})))
+        self.assertEqual(events[0][1]["edit_info"]["content"], body[:EDIT_PREVIEW_MAX])
+        self.assertNotIn("content_blob", events[0][1]["edit_info"])
+
+    def test_edit_blobs(self):
+        blobs = BlobStore()
+        old, new = "a" * 300, "b" * 300
+        _, events = self.parser(blobs=blobs).parse(
+            line(tool_call("Edit", {"file_path": "/work/a.py", "old_string": old, "new_string": new})))
+        edit_info = events[0][1]["edit_info"]
+        self.assertEqual(edit_info["old"], old[:BLOB_PREVIEW_MAX])
+        self.assertEqual(blobs.get(edit_info["old_blob"]["hash"]), old.encode("utf-8"))
+        self.assertEqual(blobs.get(edit_info["new_blob"]["hash"]), new.encode("utf-8"))
+        self.assertEqual(edit_info["new_blob"]["size"], 300)
+
+    def test_invalid_lines(self):
+        parser = self.parser()
+        self.assertEqual(parser.parse("not json"), (None, ()))
+        self.assertEqual(parser.parse("[1, 2]"), (None, ()))
+        self.assertEqual(parser.parse(line({"type": "assistant", "message": "x"})), ("assistant", ()))
+        self.assertEqual(parser.stats, {"lines": 3, "decoded": 2, "skipped": 0, "errors": 1})
+
+    def test_skipped_match_full_decode(self):
+        for data in SKIPPED:
+            for compact in (True, False):
+                with self.subTest(data=data, compact=compact):
+                    text = line(data, compact)
+                    parser = self.parser()
+                    skipped = parser.parse(text)
+                    self.assertEqual(parser.stats["skipped"], 1)
+                    json_type, events = self.full().parse(text)
+                    self.assertEqual((skipped[0], list(skipped[1])), (json_type, list(events)))
+
+    def test_handled_not_skipped(self):
+        for data, _ in HANDLED:
+            for compact in (True, False):
+                with self.subTest(data=data, compact=compact):
+                    parser = self.parser()
+                    parser.parse(line(data, compact))
+                    self.assertEqual(parser.stats["skipped"], 0)
+
+    def test_reordered_keys(self):
+        """키 순서가 달라도 (건너뛰기 정규식에 일치하지 않더라도) 결과는 원래 줄과 같음"""
+        for data in SKIPPED + [data for data, _ in HANDLED]:
+            with self.subTest(data=data):
+                expected_type, expected = self.full().parse(line(data))
+                json_type, events = self.parser().parse(line(reordered(data)))
+                self.assertEqual((json_type, list(events)), (expected_type, list(expected)))
+        for name, tool_input, _, _ in TOOLS:
+            with self.subTest(tool=name):
+                data = tool_call(name, tool_input)
+                self.assertEqual(self.parser().parse(line(reordered(data))), self.parser().parse(line(data)))
+
+    @unittest.skipIf(stream_parser.orjson is None, "orjson이 설치되지 않음")
+    def test_orjson_matches_json(self):
+        lines = [line(data, compact) for data, _ in HANDLED for compact in (True, False)]
+        lines += [line(tool_call(name, tool_input)) for name, tool_input, _, _ in TOOLS]
+        lines += [line(data) for data in SKIPPED] + ["not json", "[1]", '{"type": "x"}']
+        fast = self.full(loads=stream_parser.orjson.loads)
+        slow = self.full(loads=json.loads)
+        for text in lines:
+            with self.subTest(line=text):
+                fast_type, fast_events = fast.parse(text)
+                slow_type, slow_events = slow.parse(text)
+                self.assertEqual((fast_type, list(fast_events)), (slow_type, list(slow_events)))
+        self.assertEqual(fast.stats, slow.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
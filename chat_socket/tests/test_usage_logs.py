@@ -0,0 +1,116 @@
+"""usage_logs.UsageLogIndex 테스트 (합성 세션 JSONL 로그)
+
+실행: python -m pytest chat_socket/tests (또는 python -m unittest discover chat_socket/tests)
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from usage_logs import UsageLogIndex  # noqa: E402
+
+NOW = datetime(2026, 3, 10, 12, 30, tzinfo=timezone.utc)
+
+
+def log_line(ts: datetime, message_id: str, input_tokens: int = 100, output_tokens: int = 50,
+             cost: float = 0.01, model: str = "claude-sonnet-4") -> str:
+    """Claude CLI 세션 로그의 assistant 응답 한 줄"""
+    return json.dumps({
+        "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "requestId": f"req_{message_id}",
+        "costUSD": cost,
+        "message": {
+            "id": f"msg_{message_id}",
+            "model": model,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        }
+    }) + "\n"
+
+
+class UsageLogIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="usage_logs_")
+        self.project = os.path.join(self.root, "project-a")
+        os.makedirs(self.project)
+        self.index = UsageLogIndex([self.root])
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.project, name)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_daily_and_block_shapes(self):
+        self.write("s1.jsonl", log_line(NOW - timedelta(hours=2), "a") + log_line(NOW - timedelta(hours=1), "b")
+                   + json.dumps({"type": "user", "message": {"content": "hi"}}) + "\n")
+        self.assertEqual(self.index.update(NOW), 2)
+
+        daily = self.index.daily(NOW.astimezone())
+        self.assertEqual(set(daily), {"today", "totals", "date"})
+        self.assertEqual(daily["totals"]["totalTokens"], 300)
+        self.assertAlmostEqual(daily["totals"]["totalCost"], 0.02)
+        today = daily["today"]
+        self.assertEqual(today["modelsUsed"], ["claude-sonnet-4"])
+        self.assertEqual(today["modelBreakdowns"][0]["modelName"], "claude-sonnet-4")
+
+        block = self.index.active_block(NOW)
+        self.assertEqual(set(block), {"startTime", "endTime", "costUSD", "totalTokens", "remainingMinutes",
+                                      "projectedCost", "costPerHour", "models"})
+        self.assertEqual(block["startTime"], "2026-03-10T10:00:00.000Z")
+        self.assertEqual(block["endTime"], "2026-03-10T15:00:00.000Z")
+        self.assertEqual(block["totalTokens"], 300)
+        self.assertEqual(block["remainingMinutes"], 150)
+
+    def test_incremental_offsets(self):
+        first = log_line(NOW - timedelta(minutes=30), "a")
+        path = self.write("s1.jsonl", first)
+        self.assertEqual(self.index.update(NOW), 1)
+        self.assertEqual(self.index.offsets[path], len(first.encode("utf-8")))
+
+        # 쓰는 중인(줄바꿈 없는) 마지막 줄은 다음 갱신까지 읽지 않음
+        second = log_line(NOW - timedelta(minutes=10), "b")
+        self.write("s1.jsonl", second[:40])
+        self.assertEqual(self.index.update(NOW), 0)
+        self.assertEqual(self.index.offsets[path], len(first.encode("utf-8")))
+
+        self.write("s1.jsonl", second[40:])
+        self.assertEqual(self.index.update(NOW), 1)
+        self.assertEqual(self.index.offsets[path], os.path.getsize(path))
+        self.assertEqual(self.index.update(NOW), 0)
+
+        # 재개된 세션이 같은 응답을 다른 파일에 다시 기록해도 한 번만 집계
+        self.write("s2.jsonl", second + log_line(NOW - timedelta(minutes=5), "c"))
+        self.assertEqual(self.index.update(NOW), 1)
+        self.assertEqual(self.index.daily(NOW.astimezone())["totals"]["totalTokens"], 450)
+        self.assertEqual(self.index.active_block(NOW)["totalTokens"], 450)
+
+    def test_prunes_entries_outside_reported_windows(self):
+        old = [log_line(NOW - timedelta(days=3, hours=hour), f"old{hour}") for hour in range(5)]
+        self.write("s1.jsonl", "".join(old) + log_line(NOW - timedelta(minutes=20), "new"))
+        self.assertEqual(self.index.update(NOW), 6)
+
+        self.assertEqual(len(self.index.entries), 1)
+        self.assertEqual(list(self.index.seen), ["msg_new:req_new"])
+        self.assertEqual(list(self.index.days), [NOW.astimezone().strftime("%Y-%m-%d")])
+        # 전체 합계는 정리와 관계없이 유지
+        self.assertEqual(self.index.daily(NOW.astimezone())["totals"]["totalTokens"], 6 * 150)
+        self.assertEqual(self.index.active_block(NOW)["totalTokens"], 150)
+
+        # 정리한 범위의 항목이 다시 나타나면 (재개된 세션) 중복으로 보고 집계하지 않음
+        self.write("s2.jsonl", old[0])
+        self.assertEqual(self.index.update(NOW), 0)
+        self.assertEqual(self.index.daily(NOW.astimezone())["totals"]["totalTokens"], 6 * 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
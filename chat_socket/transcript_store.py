@@ -0,0 +1,333 @@
+"""대화 기록 저장소 (세션별 덧붙이기 전용 세그먼트 파일 + 오프셋 인덱스, mmap 읽기)
+
+서버는 메시지와 진행 상황을 브로드캐스트한 뒤 잊어버리므로 새로 연 탭은 빈 채팅으로
+시작한다. 여기서는 세션(토큰)마다 메시지와 요약한 진행 상황(도구 시작, 완료 통계, 오류)을
+다음 두 파일에 덧붙여 기록한다.
+
+- {토큰}.seg: 기록 하나가 한 줄인 압축 JSON (덧붙이기만 함)
+- {토큰}.idx: 기록마다 세그먼트에서 끝나는 위치 (8바이트 리틀 엔디언, 고정 크기)
+
+읽을 때는 두 파일을 mmap으로 열어 인덱스에서 페이지 범위의 시작/끝 위치를 바로 찾으므로,
+`/history?session=&before=&limit=` 한 페이지를 읽는 시간은 기록 길이와 관계없이 일정하다.
+비정상 종료로 인덱스나 세그먼트 끝이 잘렸으면 열 때 마지막 완전한 기록까지로 맞춘다.
+
+기록은 번호만 바로 매기고 메모리 버퍼에 모았다가 HISTORY_FLUSH_INTERVAL마다 스레드에서
+한 번에 쓰므로 브로드캐스트 경로에 파일 쓰기가 더해지지 않는다. 아직 쓰지 않은 기록도
+페이지 조회에 포함되고, 비정상 종료 시에는 마지막 묶음을 잃을 수 있다.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from background_writer import BackgroundWriter
+from log_pipeline import get_logger
+
+log = get_logger("history")
+
+# 설정
+TRANSCRIPT_OPEN_MAX = 64  # 열어 둘 최대 대화 기록 수 (파일 핸들/mmap, 최근 사용 순)
+HISTORY_FLUSH_INTERVAL = 0.1  # 기록을 모았다가 파일에 쓰는 간격 (초)
+HISTORY_PAGE_SIZE = 50  # /history 기본 페이지 크기
+HISTORY_MAX_PAGE = 200  # /history 최대 페이지 크기
+TRANSCRIPT_PROGRESS = ("tool_start", "complete", "error")  # 기록에 남길 진행 상황 종류
+
+INDEX_ENTRY = struct.Struct("<Q")
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def condense_frame(frame: dict) -> list:
+    """브로드캐스트 프레임을 기록할 항목 목록으로 요약 (기록하지 않을 프레임이면 빈 목록)
+
+    스트리밍 조각(message_delta), 큐/사용량 상태, tool_end 등은 남기지 않는다.
+    """
+    kind = frame.get("type")
+    now = round(time.time(), 3)
+    if kind in ("message", "message_end"):
+        if not frame.get("message"):
+            return []  # 재시도로 지운 스트리밍 메시지
+        entry = {"type": "message", "ts": now, "username": frame.get("username", ""), "message": frame["message"]}
+        if frame.get("reply_to"):
+            entry["reply_to"] = frame["reply_to"]
+        return [entry]
+    if kind == "system":
+        return [{"type": "system", "ts": now, "message": frame.get("message", "")}]
+    if kind == "progress":
+        events = [frame]
+    elif kind == "progress_batch":
+        events = frame.get("events", [])
+    else:
+        return []
+    entries = []
+    for event in events:
+        progress_type = event.get("progress_type")
+        if progress_type not in TRANSCRIPT_PROGRESS:
+            continue
+        if progress_type == "tool_start":
+            entries.append({"type": "tool", "ts": now, "tool": event.get("tool", ""),
+                            "detail": event.get("detail", "")})
+        elif progress_type == "complete":
+            entries.append({"type": "complete", "ts": now, **{key: event[key] for key in (
+                "duration_sec", "cost_usd", "cost_krw", "input_tokens", "output_tokens", "turns") if key in event}})
+        else:
+            entries.append({"type": "error", "ts": now, "message": event.get("message", "")})
+    return entries
+
+
+class Transcript:
+    """세션 하나의 세그먼트/인덱스 파일"""
+
+    def __init__(self, seg_path: str, idx_path: str):
+        self.seg = open(seg_path, "a+b")
+        self.idx = open(idx_path, "a+b")
+        self.count, self.size = self._recover()
+        self.written = self.count  # 파일에 쓴 기록 수 (나머지는 pending)
+        self.pending = []  # 아직 쓰지 않은 기록 (인코딩한 줄, 번호 written부터)
+        self.lock = threading.Lock()  # written/size/pending 갱신 (쓰기 스레드와 읽기)
+        self.seg_map = None
+        self.idx_map = None
+        self.mapped = 0  # mmap에 들어 있는 기록 수
+
+    def _recover(self):
+        """마지막 완전한 기록까지로 두 파일 길이를 맞춤 (기록 수, 세그먼트 크기)"""
+        seg_size = os.fstat(self.seg.fileno()).st_size
+        count = os.fstat(self.idx.fileno()).st_size // INDEX_ENTRY.size
+        end = 0
+        while count:
+            self.idx.seek((count - 1) * INDEX_ENTRY.size)
+            end = INDEX_ENTRY.unpack(self.idx.read(INDEX_ENTRY.size))[0]
+            if end <= seg_size:
+                break
+            count -= 1
+            end = 0
+        self.idx.truncate(count * INDEX_ENTRY.size)
+        self.seg.truncate(end)
+        return count, end
+
+    @property
+    def closed(self) -> bool:
+        return self.seg.closed
+
+    def append(self, entry: dict) -> int:
+        """기록을 버퍼에 추가하고 번호 반환 (파일에는 write()에서 씀)"""
+        data = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self.lock:
+            self.pending.append(data)
+        self.count += 1
+        return self.count - 1
+
+    def write(self) -> int:
+        """버퍼의 기록을 세그먼트, 인덱스 순서로 한 번에 쓰고 쓴 기록 수 반환
+
+        쓰기 실패 시 두 파일을 쓰기 전 길이로 되돌리고 기록은 버퍼에 남긴다 (다음 쓰기에서 재시도).
+        """
+        with self.lock:
+            lines = self.pending[:]
+            size = self.size
+        if not lines:
+            return 0
+        ends = []
+        end = size
+        for line in lines:
+            end += len(line)
+            ends.append(INDEX_ENTRY.pack(end))
+        try:
+            self.seg.write(b"".join(lines))
+            self.seg.flush()
+            self.idx.write(b"".join(ends))
+            self.idx.flush()
+        except OSError:
+            self.seg.truncate(size)
+            self.idx.truncate(self.written * INDEX_ENTRY.size)
+            raise
+        with self.lock:
+            del self.pending[:len(lines)]
+            self.size = end
+            self.written += len(lines)
+        return len(lines)
+
+    def _remap(self, written: int, size: int):
+        self._unmap()
+        if written:
+            self.seg_map = mmap.mmap(self.seg.fileno(), size, access=mmap.ACCESS_READ)
+            self.idx_map = mmap.mmap(self.idx.fileno(), written * INDEX_ENTRY.size, access=mmap.ACCESS_READ)
+        self.mapped = written
+
+    def _unmap(self):
+        for mapped in (self.seg_map, self.idx_map):
+            if mapped is not None:
+                mapped.close()
+        self.seg_map = self.idx_map = None
+
+    def _end(self, index: int) -> int:
+        return INDEX_ENTRY.unpack_from(self.idx_map, index * INDEX_ENTRY.size)[0] if index >= 0 else 0
+
+    def read(self, start: int, stop: int) -> list:
+        """start 이상 stop 미만 번호의 기록 목록 (각 항목에 번호 "i" 포함, 쓰지 않은 기록은 버퍼에서)"""
+        if start >= stop:
+            return []
+        with self.lock:
+            written, size = self.written, self.size
+            pending = self.pending[max(0, start - written):max(0, stop - written)]
+        lines = []
+        if start < written:
+            if min(stop, written) > self.mapped:
+                self._remap(written, size)
+            lines = self.seg_map[self._end(start - 1):self._end(min(stop, written) - 1)].splitlines()
+        return [{"i": start + offset, **json.loads(line)} for offset, line in enumerate(lines + pending)]
+
+    def close(self):
+        self._unmap()
+        self.seg.close()
+        self.idx.close()
+
+
+class TranscriptStore:
+    """세션 토큰 -> 대화 기록 (directory가 없으면 기록하지 않음)"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.transcripts = OrderedDict()  # 토큰 -> Transcript (오래 사용하지 않은 것부터)
+        self.stats = {"appends": 0, "flushes": 0, "pages": 0, "errors": 0}
+        self.writer = BackgroundWriter("기록", HISTORY_FLUSH_INTERVAL, self._collect, self._write)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _get(self, key: str, create: bool = False):
+        """열린 대화 기록 (없으면 파일을 열고, create가 아니면 파일이 없을 때 None)"""
+        if not self.enabled or not key or not KEY_PATTERN.match(key):
+            return None
+        transcript = self.transcripts.get(key)
+        if transcript is not None:
+            self.transcripts.move_to_end(key)
+            return transcript
+        seg_path = os.path.join(self.directory, f"{key}.seg")
+        if not create and not os.path.exists(seg_path):
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        transcript = Transcript(seg_path, os.path.join(self.directory, f"{key}.idx"))
+        self._evict(key)
+        self.transcripts[key] = transcript
+        return transcript
+
+    def _evict(self, opening: str):
+        """열린 기록이 TRANSCRIPT_OPEN_MAX를 넘지 않도록 오래 사용하지 않은 것부터 닫기 (쓰기 스레드에서)
+
+        버퍼에 쓰지 않은 기록이 있는 것은 닫지 않는다 (다시 열 때 파일이 완전하도록).
+        """
+        excess = len(self.transcripts) + 1 - TRANSCRIPT_OPEN_MAX
+        if excess <= 0:
+            return
+        clean = [key for key, transcript in self.transcripts.items() if not transcript.pending and key != opening]
+        for key in clean[:excess]:
+            self.writer.submit(self.transcripts.pop(key).close)
+
+    def _write_one(self, transcript: Transcript):
+        """쓰기 스레드에서 호출"""
+        if transcript.closed:
+            return
+        try:
+            if transcript.write():
+                self.stats["flushes"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            log.warning(f"[기록] 쓰기 실패 ({os.path.basename(transcript.seg.name)[:8]}): {e}")
+
+    def _collect(self):
+        """쓰기 태스크가 꺼낼 묶음: 버퍼에 기록이 있는 대화 기록 목록"""
+        batch = [transcript for transcript in self.transcripts.values() if transcript.pending]
+        return batch or None
+
+    def _write(self, batch: list):
+        """쓰기 스레드: 버퍼에 기록이 있는 대화 기록들을 파일에 쓰기"""
+        for transcript in batch:
+            self._write_one(transcript)
+
+    def flush(self):
+        """버퍼의 기록을 지금 모두 쓰기 (종료 직전, 벤치마크)"""
+        self.writer.flush()
+
+    def append(self, key: str, entries: list):
+        """기록 추가 후 첫 항목의 번호 반환 (기록하지 않았으면 None, 파일 열기 실패는 로그만 남기고 무시)
+
+        파일 쓰기는 백그라운드 쓰기 태스크가 묶어서 처리한다.
+        """
+        if not entries or not self.enabled:
+            return None
+        try:
+            transcript = self._get(key, create=True)
+        except OSError as e:
+            self.stats["errors"] += 1
+            log.warning(f"[기록] 파일 열기 실패 ({key[:8]}): {e}")
+            return None
+        if transcript is None:
+            return None
+        first = transcript.count
+        for entry in entries:
+            transcript.append(entry)
+        self.stats["appends"] += len(entries)
+        self.writer.notify()
+        return first
+
+    def remove(self, key: str):
+        """대화 기록 파일 삭제 (쓰는 중인 묶음 뒤에 쓰기 스레드에서 실행)"""
+        if not self.enabled or not key or not KEY_PATTERN.match(key):
+            return
+        self.writer.submit(self._delete, key, self.transcripts.pop(key, None))
+
+    def _delete(self, key: str, transcript):
+        """쓰기 스레드: 닫고 파일 삭제 (그 사이 다시 열린 기록이면 파일은 남김)"""
+        if transcript is not None:
+            transcript.close()
+        if key in self.transcripts:
+            return
+        for suffix in (".seg", ".idx"):
+            try:
+                os.remove(os.path.join(self.directory, key + suffix))
+            except OSError:
+                pass
+
+    def count(self, key: str) -> int:
+        try:
+            transcript = self._get(key)
+        except OSError:
+            return 0
+        return transcript.count if transcript is not None else 0
+
+    def page(self, key: str, before: int = None, limit: int = HISTORY_PAGE_SIZE) -> dict:
+        """before 번호 앞의 기록 최대 limit개 (오래된 것부터)
+
+        반환: items, before(다음 페이지 요청에 쓸 번호), total, more(더 오래된 기록이 있는지)
+        """
+        transcript = self._get(key)
+        if transcript is None:
+            return {"items": [], "before": 0, "total": 0, "more": False}
+        total = transcript.count
+        stop = total if before is None else max(0, min(before, total))
+        start = max(0, stop - max(1, min(limit, HISTORY_MAX_PAGE)))
+        self.stats["pages"] += 1
+        return {"items": transcript.read(start, stop), "before": start, "total": total, "more": start > 0}
+
+    def start_writer(self):
+        """백그라운드 쓰기 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self.enabled:
+            self.writer.start()
+
+    async def close(self):
+        """쓰기 태스크 중지, 남은 기록 쓰기 후 파일 닫기"""
+        await self.writer.close()
+        for transcript in self.transcripts.values():
+            self._write_one(transcript)
+            transcript.close()
+        self.transcripts.clear()
+
+    def summary(self) -> dict:
+        """/usage 엔드포인트용 저장소 상태"""
+        pending = sum(len(transcript.pending) for transcript in self.transcripts.values())
+        return {"directory": self.directory, "open": len(self.transcripts), "pending": pending, **self.stats}
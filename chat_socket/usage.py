@@ -0,0 +1,264 @@
+"""Claude 사용량 조회 서비스
+
+사용량은 기본적으로 ccusage를 실행하여 얻고, USAGE_SOURCE=logs로 설정하면
+ccusage 없이 Claude CLI 로컬 로그를 증분 집계한다(usage_logs).
+조회 결과를 TTL 캐시에 보관하고 백그라운드에서 주기적으로 갱신한다.
+동시에 들어온 조회 요청은 하나의 갱신 작업을 함께 기다리며(coalescing),
+결과가 바뀐 경우에만 on_change 콜백으로 브로드캐스트한다.
+"""
+import asyncio
+import json
+import os
+import subprocess
+from datetime import datetime
+
+from log_pipeline import get_logger
+from usage_logs import UsageLogIndex
+
+log = get_logger("usage")
+
+# 설정
+USAGE_SOURCE = os.environ.get("USAGE_SOURCE", "ccusage")  # 사용량 출처: ccusage | logs(로컬 로그)
+CCUSAGE_CMD = os.environ.get("CCUSAGE_CMD", "npx ccusage@latest")  # ccusage 실행 명령
+USAGE_CACHE_TTL = 60  # 캐시 유효 시간 (초)
+USAGE_REFRESH_INTERVAL = 120  # 백그라운드 갱신 주기 (초)
+USAGE_MIN_REFRESH_GAP = 15  # 요청 완료 후 갱신 요청 시 최소 간격 (초)
+CCUSAGE_TIMEOUT = 30  # ccusage 실행 타임아웃 (초)
+
+
+def get_claude_usage():
+    """ccusage를 통해 오늘의 Claude 사용량 조회"""
+    try:
+        result = subprocess.run(
+            f"{CCUSAGE_CMD} daily --json",
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            shell=True,
+            timeout=CCUSAGE_TIMEOUT
+        )
+        if result.returncode != 0:
+            log.debug(f"[사용량] ccusage 실행 실패: {result.stderr}")
+            return None
+
+        data = json.loads(result.stdout)
+        daily_data = data.get("daily", [])
+        totals = data.get("totals", {})
+
+        # 오늘 날짜의 데이터 찾기
+        today = datetime.now().strftime("%Y-%m-%d")
+        today_usage = None
+        for day in daily_data:
+            if day.get("date") == today:
+                today_usage = day
+                break
+
+        return {
+            "today": today_usage,
+            "totals": totals,
+            "date": today
+        }
+    except subprocess.TimeoutExpired:
+        log.debug("[사용량] ccusage 타임아웃")
+        return None
+    except json.JSONDecodeError as e:
+        log.debug(f"[사용량] ccusage JSON 파싱 실패: {e}")
+        return None
+    except Exception as e:
+        log.debug(f"[사용량] ccusage 오류: {e}")
+        return None
+
+
+def get_claude_blocks():
+    """ccusage를 통해 5시간 블록 사용량 조회"""
+    try:
+        result = subprocess.run(
+            f"{CCUSAGE_CMD} blocks --json",
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            shell=True,
+            timeout=CCUSAGE_TIMEOUT
+        )
+        if result.returncode != 0:
+            log.debug(f"[사용량] ccusage blocks 실행 실패: {result.stderr}")
+            return None
+
+        data = json.loads(result.stdout)
+        blocks = data.get("blocks", [])
+
+        # 현재 활성 블록 찾기
+        active_block = None
+        for block in blocks:
+            if block.get("isActive") and not block.get("isGap"):
+                active_block = block
+                break
+
+        if not active_block:
+            return None
+
+        # 블록 정보 추출
+        projection = active_block.get("projection", {})
+        burn_rate = active_block.get("burnRate", {})
+
+        return {
+            "startTime": active_block.get("startTime"),
+            "endTime": active_block.get("endTime"),
+            "costUSD": active_block.get("costUSD", 0),
+            "totalTokens": active_block.get("totalTokens", 0),
+            "remainingMinutes": projection.get("remainingMinutes", 0) if projection else 0,
+            "projectedCost": projection.get("totalCost", 0) if projection else 0,
+            "costPerHour": burn_rate.get("costPerHour", 0) if burn_rate else 0,
+            "models": active_block.get("models", [])
+        }
+    except subprocess.TimeoutExpired:
+        log.debug("[사용량] ccusage blocks 타임아웃")
+        return None
+    except json.JSONDecodeError as e:
+        log.debug(f"[사용량] ccusage blocks JSON 파싱 실패: {e}")
+        return None
+    except Exception as e:
+        log.debug(f"[사용량] ccusage blocks 오류: {e}")
+        return None
+
+
+# 로컬 로그 증분 인덱스 (첫 조회 시 생성)
+_log_index = None
+
+
+def get_log_usage():
+    """로컬 로그 인덱스를 갱신하고 (오늘 사용량, 5시간 블록) 반환"""
+    global _log_index
+    if _log_index is None:
+        _log_index = UsageLogIndex()
+    try:
+        _log_index.update()
+        return _log_index.daily(), _log_index.active_block()
+    except Exception as e:
+        log.debug(f"[사용량] 로컬 로그 사용량 집계 오류: {e}")
+        return None, None
+
+
+def collect_usage() -> dict:
+    """오늘 사용량과 5시간 블록 정보를 하나의 usage_status 데이터로 병합"""
+    if USAGE_SOURCE == "logs":
+        usage, blocks = get_log_usage()
+    else:
+        usage = get_claude_usage()
+        blocks = get_claude_blocks()
+
+    combined_data = {}
+    if usage:
+        combined_data["today"] = usage.get("today")
+        combined_data["totals"] = usage.get("totals")
+        combined_data["date"] = usage.get("date")
+
+    if blocks:
+        combined_data["block"] = blocks
+
+    return combined_data
+
+
+class UsageService:
+    """TTL 캐시 + 요청 병합 + 백그라운드 갱신을 제공하는 사용량 서비스
+
+    - get(): 캐시가 유효하면 즉시 반환, 아니면 갱신 작업을 기다림
+    - request_refresh(): 대기하지 않고 갱신만 예약 (요청 처리 완료 후 호출)
+    - on_change(data): 갱신 결과가 이전과 다를 때만 호출되는 비동기 콜백
+    - ledger: 지정 시 외부 조회 사이의 요청 사용량을 snapshot()에 더해 줌 (UsageLedger)
+    """
+
+    def __init__(self, collector=collect_usage, ttl: float = USAGE_CACHE_TTL,
+                 refresh_interval: float = USAGE_REFRESH_INTERVAL, on_change=None, ledger=None):
+        self.collector = collector
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self.ledger = ledger
+        self.data = None  # 마지막으로 수집한 usage_status 데이터
+        self.updated_at = 0.0  # 마지막 갱신 시각 (loop.time())
+        self._inflight = None  # 진행 중인 갱신 작업 (Future)
+        self._refresh_task = None
+
+    @property
+    def age(self) -> float:
+        """캐시 경과 시간 (초)"""
+        if self.data is None:
+            return float("inf")
+        return asyncio.get_event_loop().time() - self.updated_at
+
+    def snapshot(self) -> dict:
+        """캐시된 외부 조회 결과 + 장부의 미반영 사용량 (외부 조회를 기다리지 않음)"""
+        if self.ledger is None:
+            return self.data
+        return self.ledger.apply(self.data)
+
+    async def get(self, max_age: float = None) -> dict:
+        """사용량 데이터 조회 (캐시가 max_age보다 오래되었으면 갱신 후 반환)"""
+        if max_age is None:
+            max_age = self.ttl
+        if self.age <= max_age:
+            return self.data
+        return await self.refresh()
+
+    def refresh(self):
+        """사용량 갱신 (이미 진행 중이면 같은 작업을 공유)"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._do_refresh())
+        return asyncio.shield(self._inflight)
+
+    def request_refresh(self, min_gap: float = USAGE_MIN_REFRESH_GAP):
+        """대기 없이 갱신 예약 (마지막 갱신 후 min_gap초가 지났을 때만)"""
+        if self.age >= min_gap:
+            self.refresh()
+
+    async def _do_refresh(self) -> dict:
+        """collector를 별도 스레드에서 실행하고 결과가 바뀌면 on_change 호출"""
+        loop = asyncio.get_event_loop()
+        mark = self.ledger.mark() if self.ledger else None
+        try:
+            data = await loop.run_in_executor(None, self.collector)
+        except Exception as e:
+            log.warning(f"[사용량] 사용량 조회 실패: {e}")
+            return self.data
+
+        if not data:
+            # 조회 실패 시 이전 캐시 유지 (다음 주기에 재시도)
+            return self.data
+
+        changed = data != self.data
+        self.data = data
+        self.updated_at = loop.time()
+        if self.ledger is not None:
+            # 조회 시작 전까지의 요청은 외부 값에 반영됨
+            if self.ledger.pending and any(seq <= mark for seq, _ in self.ledger.pending):
+                changed = True
+            self.ledger.reconcile(mark)
+
+        if changed and self.on_change:
+            try:
+                await self.on_change(self.snapshot())
+            except Exception as e:
+                log.warning(f"[사용량] 사용량 상태 전송 실패: {e}")
+        return data
+
+    async def _refresh_loop(self):
+        """주기적 백그라운드 갱신"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """백그라운드 갱신 시작"""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self):
+        """백그라운드 갱신 중지"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
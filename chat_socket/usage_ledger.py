@@ -0,0 +1,231 @@
+"""요청별 Claude 사용량 장부 (in-process ledger)
+
+ask_claude가 result 이벤트에서 받은 비용/토큰/소요 시간을 세션별, 보낸 사람별,
+5시간 블록별로 누적한다. 블록은 usage_logs(로컬 로그 집계)와 같은 기준으로 활동이
+시작된 정각부터 5시간이다 (중간에 5시간 넘게 쉬면 다음 활동에서 새 블록). 외부 출처(로컬 로그/ccusage) 조회 사이에 발생한 요청은
+'미반영(pending)' 값으로 보관했다가 usage_status 데이터에 더해 주므로,
+요청이 끝날 때마다 외부 조회를 다시 실행할 필요가 없다.
+
+db_path를 지정하면 SQLite에 기록하고 재시작 시 집계를 복원한다.
+"""
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from log_pipeline import get_logger
+from usage_logs import BLOCK_DURATION, block_start_for
+
+log = get_logger("usage")
+
+# 설정
+LEDGER_MAX_WINDOWS = 48  # 메모리에 보관할 블록 수
+LEDGER_MAX_SESSIONS = 500  # 메모리에 보관할 세션 수 (오래된 것부터 제거)
+
+COUNT_FIELDS = ("requests", "costUSD", "inputTokens", "outputTokens", "cacheReadTokens",
+                "durationMs", "turns")
+
+
+def _empty_counts() -> dict:
+    return {field: 0 for field in COUNT_FIELDS}
+
+
+def _add_counts(counts: dict, record: dict):
+    counts["requests"] += 1
+    for field in COUNT_FIELDS[1:]:
+        counts[field] += record[field]
+
+
+def isoformat(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class UsageLedger:
+    """세션/보낸 사람/5시간 블록별 사용량 누적기
+
+    - record(): 요청 한 건의 result 정보를 기록
+    - mark() / reconcile(mark): 외부 조회 직전 위치를 기억했다가, 조회 성공 시
+      그 이전 기록을 반영 완료로 처리
+    - apply(data): 외부 조회 결과에 미반영 값을 더한 usage_status 데이터
+    - summary(): /usage 엔드포인트용 전체 집계
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self.started_at = time.time()
+        self.totals = _empty_counts()
+        self.sessions = OrderedDict()  # 세션 ID -> 집계 (+ room)
+        self.senders = {}  # 보낸 사람 -> 집계
+        self.windows = OrderedDict()  # 블록 시작(ISO) -> 집계
+        self._block_start = None  # 마지막 블록 시작 시각 (UTC datetime)
+        self._last_ts = None  # 마지막 기록 시각 (UTC datetime)
+        self.pending = []  # (seq, record) 외부 출처에 아직 반영되지 않은 기록
+        self._seq = 0
+        self._db = None
+        if db_path:
+            self.open_db(db_path)
+
+    def open_db(self, db_path: str):
+        """SQLite 장부 열기 및 기존 기록으로 집계 복원"""
+        self.db_path = db_path
+        try:
+            db_dir = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(db_dir, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ledger ("
+                "ts REAL, session_id TEXT, room TEXT, sender TEXT, cost_usd REAL, "
+                "input_tokens INTEGER, output_tokens INTEGER, cache_read_tokens INTEGER, "
+                "duration_ms INTEGER, turns INTEGER)"
+            )
+            rows = self._db.execute(
+                "SELECT ts, session_id, room, sender, cost_usd, input_tokens, output_tokens, "
+                "cache_read_tokens, duration_ms, turns FROM ledger ORDER BY ts"
+            ).fetchall()
+        except sqlite3.Error as e:
+            log.warning(f"[사용량] 사용량 장부 DB 열기 실패: {e}")
+            self._db = None
+            return
+
+        for row in rows:
+            self._aggregate(self._make_record(*row))
+        if rows:
+            self.started_at = min(self.started_at, rows[0][0])
+        log.info(f"[사용량] 장부 복원: {len(rows)}건 ({self.db_path})")
+
+    @staticmethod
+    def _make_record(ts, session_id, room, sender, cost_usd, input_tokens, output_tokens,
+                     cache_read_tokens, duration_ms, turns) -> dict:
+        return {
+            "ts": ts,
+            "session_id": session_id,
+            "room": room,
+            "sender": sender,
+            "costUSD": cost_usd or 0,
+            "inputTokens": input_tokens or 0,
+            "outputTokens": output_tokens or 0,
+            "cacheReadTokens": cache_read_tokens or 0,
+            "durationMs": duration_ms or 0,
+            "turns": turns or 0
+        }
+
+    def record(self, session_id: str, room: str, sender: str, cost_usd: float = 0,
+               input_tokens: int = 0, output_tokens: int = 0, cache_read_tokens: int = 0,
+               duration_ms: int = 0, turns: int = 0, ts: float = None) -> dict:
+        """요청 한 건의 사용량 기록"""
+        record = self._make_record(ts or time.time(), session_id, room, sender, cost_usd,
+                                   input_tokens, output_tokens, cache_read_tokens,
+                                   duration_ms, turns)
+        self._aggregate(record)
+        self._seq += 1
+        self.pending.append((self._seq, record))
+
+        if self._db is not None:
+            try:
+                self._db.execute(
+                    "INSERT INTO ledger VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record["ts"], session_id, room, sender, record["costUSD"],
+                     record["inputTokens"], record["outputTokens"], record["cacheReadTokens"],
+                     record["durationMs"], record["turns"])
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning(f"[사용량] 사용량 장부 기록 실패: {e}")
+        return record
+
+    def _aggregate(self, record: dict):
+        _add_counts(self.totals, record)
+
+        session = self.sessions.get(record["session_id"])
+        if session is None:
+            session = self.sessions[record["session_id"]] = {"room": record["room"], **_empty_counts()}
+            while len(self.sessions) > LEDGER_MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(record["session_id"])
+        _add_counts(session, record)
+
+        sender = self.senders.get(record["sender"])
+        if sender is None:
+            sender = self.senders[record["sender"]] = _empty_counts()
+        _add_counts(sender, record)
+
+        # 기록은 시간순으로 들어오므로 마지막 블록만 이어 감 (시계가 되돌아간 기록은 마지막 블록에 포함)
+        ts = datetime.fromtimestamp(record["ts"], timezone.utc)
+        if self._last_ts is not None and ts < self._last_ts:
+            ts = self._last_ts
+        self._block_start = block_start_for(ts, self._block_start, self._last_ts)
+        self._last_ts = ts
+        key = isoformat(self._block_start)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = _empty_counts()
+            while len(self.windows) > LEDGER_MAX_WINDOWS:
+                self.windows.popitem(last=False)
+        _add_counts(window, record)
+
+    def mark(self) -> int:
+        """외부 조회 시작 시점의 기록 위치"""
+        return self._seq
+
+    def reconcile(self, mark: int):
+        """외부 조회 성공 - mark 이전 기록은 외부 값에 반영된 것으로 처리"""
+        self.pending = [(seq, record) for seq, record in self.pending if seq > mark]
+
+    def current_window(self, now: float = None) -> dict:
+        """현재 활성 5시간 블록 집계 (활성 블록이 없으면 시각은 None, 값은 0)
+
+        usage_logs.active_block()과 같은 기준: 블록이 끝나지 않았고 마지막 기록 후 5시간 이내
+        """
+        now = datetime.fromtimestamp(now or time.time(), timezone.utc)
+        if (self._block_start is None or now >= self._block_start + BLOCK_DURATION
+                or now - self._last_ts >= BLOCK_DURATION):
+            return {"startTime": None, "endTime": None, **_empty_counts()}
+        return {
+            "startTime": isoformat(self._block_start),
+            "endTime": isoformat(self._block_start + BLOCK_DURATION),
+            **self.windows.get(isoformat(self._block_start), _empty_counts())
+        }
+
+    def apply(self, data: dict) -> dict:
+        """외부 조회 결과에 미반영 기록을 더하고 장부 요약을 붙인 usage_status 데이터"""
+        result = dict(data or {})
+        if self.pending:
+            cost = sum(record["costUSD"] for _, record in self.pending)
+            tokens = sum(record["inputTokens"] + record["outputTokens"] + record["cacheReadTokens"]
+                         for _, record in self.pending)
+            for key, cost_field in (("today", "totalCost"), ("totals", "totalCost"), ("block", "costUSD")):
+                section = result.get(key)
+                if section:
+                    section = dict(section)
+                    section[cost_field] = section.get(cost_field, 0) + cost
+                    section["totalTokens"] = section.get("totalTokens", 0) + tokens
+                    result[key] = section
+
+        result["ledger"] = {
+            "totals": dict(self.totals),
+            "window": self.current_window(),
+            "pending": len(self.pending)
+        }
+        return result
+
+    def summary(self) -> dict:
+        """세션/보낸 사람/구간별 전체 집계"""
+        return {
+            "since": isoformat(datetime.fromtimestamp(self.started_at, timezone.utc)),
+            "totals": dict(self.totals),
+            "window": self.current_window(),
+            "windows": [{"startTime": key, **counts} for key, counts in self.windows.items()],
+            "sessions": [{"session_id": key, **counts} for key, counts in self.sessions.items()],
+            "senders": [{"sender": key, **counts} for key, counts in self.senders.items()],
+            "pending": len(self.pending)
+        }
+
+    def close(self):
+        """SQLite 연결 닫기"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
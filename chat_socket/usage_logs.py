@@ -0,0 +1,356 @@
+"""Claude CLI 로컬 로그 기반 사용량 집계
+
+ccusage를 실행하지 않고 Claude CLI가 남기는 세션 JSONL 로그
+(~/.claude/projects/*/*.jsonl)를 직접 읽어 일별 합계와 5시간 블록을 집계한다.
+파일별로 읽은 바이트 위치를 기억하여 새로 추가된 줄만 읽으므로(증분 인덱스)
+갱신 비용이 로그 전체 크기가 아니라 새로 쌓인 양에 비례한다.
+
+서버가 오래 실행되어도 메모리가 늘지 않도록, 갱신할 때마다 보고하지 않는 오래된 항목
+(오늘과 현재 블록보다 BLOCK_DURATION 이상 앞선 항목, 날짜별 집계, 중복 제거 키)을 정리한다.
+그보다 오래된 항목이 나중에 나타나면 (재개된 세션이 이전 대화를 다시 기록하는 경우 등)
+중복일 수 있으므로 집계하지 않는다. 전체 합계(totals)는 정리와 관계없이 유지된다.
+
+반환 형식은 usage.get_claude_usage() / usage.get_claude_blocks()와 같다.
+"""
+import bisect
+import glob
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+# 설정
+BLOCK_DURATION = timedelta(hours=5)  # 사용량 블록 길이
+CLAUDE_CONFIG_DIR_ENV = "CLAUDE_CONFIG_DIR"  # 로그 위치 지정 환경 변수 (쉼표로 여러 개)
+
+# 모델별 가격 (USD / 1M 토큰): 입력, 출력, 캐시 쓰기, 캐시 읽기
+# 로그에 costUSD가 없을 때 사용하며, 먼저 일치하는 항목을 적용한다.
+MODEL_PRICING = [
+    ("opus-4-5", (5.0, 25.0, 6.25, 0.5)),
+    ("opus", (15.0, 75.0, 18.75, 1.5)),
+    ("sonnet", (3.0, 15.0, 3.75, 0.3)),
+    ("haiku-4", (1.0, 5.0, 1.25, 0.1)),
+    ("haiku", (0.8, 4.0, 1.0, 0.08)),
+]
+
+TOKEN_FIELDS = ("inputTokens", "outputTokens", "cacheCreationTokens", "cacheReadTokens")
+
+
+def default_log_dirs() -> list:
+    """Claude CLI 세션 로그 디렉토리 목록"""
+    env_dirs = os.environ.get(CLAUDE_CONFIG_DIR_ENV, "")
+    if env_dirs:
+        roots = [d.strip() for d in env_dirs.split(",") if d.strip()]
+    else:
+        home = os.path.expanduser("~")
+        roots = [os.path.join(home, ".config", "claude"), os.path.join(home, ".claude")]
+    return [os.path.join(root, "projects") for root in roots]
+
+
+def calculate_cost(model: str, tokens: tuple) -> float:
+    """모델 가격표로 토큰 비용 계산 (알 수 없는 모델은 0)"""
+    model = (model or "").lower()
+    for key, prices in MODEL_PRICING:
+        if key in model:
+            return sum(count * price for count, price in zip(tokens, prices)) / 1_000_000
+    return 0.0
+
+
+def parse_timestamp(value: str):
+    """ISO 8601 타임스탬프를 UTC datetime으로 변환"""
+    if not value:
+        return None
+    try:
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def parse_entry(line: str):
+    """로그 한 줄에서 사용량 항목 추출 (사용량이 없는 줄은 None)
+
+    반환: (timestamp, dedup_key, model, tokens, cost)
+    """
+    if '"usage"' not in line:
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    message = data.get("message")
+    if not isinstance(message, dict):
+        return None
+    usage = message.get("usage")
+    if not isinstance(usage, dict):
+        return None
+
+    ts = parse_timestamp(data.get("timestamp"))
+    if ts is None:
+        return None
+
+    tokens = (
+        usage.get("input_tokens", 0) or 0,
+        usage.get("output_tokens", 0) or 0,
+        usage.get("cache_creation_input_tokens", 0) or 0,
+        usage.get("cache_read_input_tokens", 0) or 0,
+    )
+    model = message.get("model", "") or ""
+    cost = data.get("costUSD")
+    if cost is None:
+        cost = calculate_cost(model, tokens)
+
+    # 같은 응답이 여러 파일(재개된 세션 등)에 중복 기록되므로 메시지/요청 ID로 중복 제거
+    dedup_key = None
+    if message.get("id") and data.get("requestId"):
+        dedup_key = f"{message['id']}:{data['requestId']}"
+
+    return ts, dedup_key, model, tokens, cost
+
+
+def _empty_counts() -> dict:
+    counts = {field: 0 for field in TOKEN_FIELDS}
+    counts["totalTokens"] = 0
+    counts["totalCost"] = 0.0
+    return counts
+
+
+def _add_counts(counts: dict, tokens: tuple, cost: float):
+    for field, count in zip(TOKEN_FIELDS, tokens):
+        counts[field] += count
+    counts["totalTokens"] += sum(tokens)
+    counts["totalCost"] += cost
+
+
+class UsageLogIndex:
+    """Claude 세션 로그 증분 집계기
+
+    - update(): 새로 추가된 바이트만 읽어 집계에 반영
+    - daily(): get_claude_usage()와 같은 형식의 오늘/전체 사용량
+    - active_block(): get_claude_blocks()와 같은 형식의 현재 5시간 블록
+    """
+
+    def __init__(self, log_dirs: list = None):
+        self.log_dirs = log_dirs if log_dirs is not None else default_log_dirs()
+        self._reset()
+
+    def _reset(self):
+        self.offsets = {}  # 파일 경로 -> 읽은 바이트 위치
+        self.seen = {}  # 중복 제거 키 -> timestamp (정리 기준)
+        self.horizon = None  # 이보다 오래된 항목은 정리했으므로 집계하지 않음
+        self.days = {}  # 날짜(YYYY-MM-DD, 로컬) -> 집계
+        self.totals = _empty_counts()
+        self.entries = []  # (timestamp, tokens, cost, model), 시간순 정렬
+        self._times = []  # entries의 timestamp 목록 (bisect 검색용)
+        self._block_start_index = 0  # 현재 블록이 시작되는 entries 인덱스
+        self._dirty_from = 0  # 블록 재계산이 필요한 가장 앞 인덱스
+
+    def _log_files(self) -> list:
+        files = []
+        for log_dir in self.log_dirs:
+            files.extend(glob.glob(os.path.join(log_dir, "**", "*.jsonl"), recursive=True))
+        return files
+
+    def update(self, now: datetime = None) -> int:
+        """새로 추가된 로그 줄을 읽어 집계한 뒤 오래된 항목 정리 (반영한 항목 수 반환)"""
+        added = 0
+        for path in self._log_files():
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            offset = self.offsets.get(path, 0)
+            if size < offset:
+                # 파일이 잘리거나 교체됨 - 전체 재집계
+                self._reset()
+                return self.update(now)
+            if size == offset:
+                continue
+            added += self._read_file(path, offset)
+        self._prune(now)
+        return added
+
+    def _prune(self, now: datetime = None):
+        """오늘(로컬)과 현재 블록 시작 중 이른 쪽보다 BLOCK_DURATION 이상 앞선 항목 정리"""
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.astimezone(timezone.utc)
+        today_start = now.astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        keep_from = today_start.astimezone(timezone.utc)
+        if self.entries:
+            keep_from = min(keep_from, floor_hour(self.entries[self._current_block_start()][0]))
+        horizon = keep_from - BLOCK_DURATION
+        if self.horizon is not None and horizon <= self.horizon:
+            return
+        self.horizon = horizon
+
+        cut = bisect.bisect_left(self._times, horizon)
+        if cut:
+            del self.entries[:cut]
+            del self._times[:cut]
+            self._block_start_index = max(0, self._block_start_index - cut)
+            self._dirty_from = max(0, self._dirty_from - cut)
+        self.seen = {key: ts for key, ts in self.seen.items() if ts >= horizon}
+        oldest_date = horizon.astimezone().strftime("%Y-%m-%d")
+        for date in [date for date in self.days if date < oldest_date]:
+            del self.days[date]
+
+    def _read_file(self, path: str, offset: int) -> int:
+        """offset부터 완결된 줄만 읽어 집계 (쓰는 중인 마지막 줄은 다음 갱신으로 미룸)"""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+        except OSError:
+            return 0
+
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return 0
+        self.offsets[path] = offset + end + 1
+
+        added = 0
+        for raw in chunk[:end].split(b"\n"):
+            entry = parse_entry(raw.decode("utf-8", errors="replace"))
+            if entry and self._add_entry(*entry):
+                added += 1
+        return added
+
+    def _add_entry(self, ts, dedup_key, model, tokens, cost) -> bool:
+        if self.horizon is not None and ts < self.horizon:
+            return False
+        if dedup_key is not None:
+            if dedup_key in self.seen:
+                return False
+            self.seen[dedup_key] = ts
+
+        date = ts.astimezone().strftime("%Y-%m-%d")
+        day = self.days.get(date)
+        if day is None:
+            day = _empty_counts()
+            day["date"] = date
+            day["modelsUsed"] = []
+            day["modelBreakdowns"] = {}
+            self.days[date] = day
+        _add_counts(day, tokens, cost)
+        _add_counts(self.totals, tokens, cost)
+        if model:
+            if model not in day["modelsUsed"]:
+                day["modelsUsed"].append(model)
+            breakdown = day["modelBreakdowns"].get(model)
+            if breakdown is None:
+                breakdown = day["modelBreakdowns"][model] = _empty_counts()
+            _add_counts(breakdown, tokens, cost)
+
+        # 대부분 시간순으로 추가되므로 bisect 삽입은 보통 리스트 끝에서 일어남
+        item = (ts, tokens, cost, model)
+        index = bisect.bisect_right(self._times, ts)
+        self._times.insert(index, ts)
+        self.entries.insert(index, item)
+        self._dirty_from = min(self._dirty_from, index)
+        return True
+
+    def daily(self, now: datetime = None) -> dict:
+        """오늘 사용량과 전체 합계 (get_claude_usage()와 같은 형식)"""
+        now = now or datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        today_usage = None
+        day = self.days.get(today)
+        if day is not None:
+            today_usage = dict(day)
+            today_usage["modelsUsed"] = list(day["modelsUsed"])
+            today_usage["modelBreakdowns"] = [
+                {"modelName": name, **counts} for name, counts in day["modelBreakdowns"].items()
+            ]
+        return {
+            "today": today_usage,
+            "totals": dict(self.totals),
+            "date": today
+        }
+
+    def _current_block_start(self) -> int:
+        """현재(마지막) 블록의 시작 인덱스
+
+        이전 계산 이후 앞쪽에 끼어든 항목이 없으면 지난 블록 시작점부터만 다시 훑는다.
+        """
+        start = self._block_start_index if self._dirty_from >= self._block_start_index else 0
+        entries = self.entries
+        block_start_time = floor_hour(entries[start][0])
+        for i in range(start + 1, len(entries)):
+            ts = entries[i][0]
+            start_time = block_start_for(ts, block_start_time, entries[i - 1][0])
+            if start_time != block_start_time:
+                start = i
+                block_start_time = start_time
+        self._block_start_index = start
+        self._dirty_from = len(entries)
+        return start
+
+    def active_block(self, now: datetime = None) -> dict:
+        """현재 활성 5시간 블록 (get_claude_blocks()와 같은 형식, 없으면 None)"""
+        if not self.entries:
+            return None
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.astimezone(timezone.utc)
+
+        block_entries = self.entries[self._current_block_start():]
+        start_time = floor_hour(block_entries[0][0])
+        end_time = start_time + BLOCK_DURATION
+        first_ts = block_entries[0][0]
+        last_ts = block_entries[-1][0]
+
+        # ccusage와 같은 기준: 블록이 끝나지 않았고 마지막 활동 후 5시간 이내
+        if now >= end_time or now - last_ts >= BLOCK_DURATION:
+            return None
+
+        cost = 0.0
+        total_tokens = 0
+        models = []
+        for _, tokens, entry_cost, model in block_entries:
+            cost += entry_cost
+            total_tokens += sum(tokens)
+            if model and model not in models:
+                models.append(model)
+
+        duration_minutes = (last_ts - first_ts).total_seconds() / 60
+        cost_per_hour = cost / duration_minutes * 60 if duration_minutes > 0 else 0
+        remaining_minutes = max(0, round((end_time - now).total_seconds() / 60))
+
+        return {
+            "startTime": isoformat(start_time),
+            "endTime": isoformat(end_time),
+            "costUSD": cost,
+            "totalTokens": total_tokens,
+            "remainingMinutes": remaining_minutes,
+            "projectedCost": cost + cost_per_hour / 60 * remaining_minutes,
+            "costPerHour": cost_per_hour,
+            "models": models
+        }
+
+
+def block_start_for(ts: datetime, block_start: datetime = None, last_ts: datetime = None) -> datetime:
+    """ts가 속하는 5시간 블록의 시작 시각 (ccusage와 같은 기준, 사용량 장부도 같은 함수 사용)
+
+    현재 블록(block_start)이 끝났거나 직전 활동(last_ts) 후 5시간 넘게 쉬었으면
+    ts의 정각에서 새 블록을 시작하고, 아니면 현재 블록을 이어 간다.
+    """
+    if block_start is None or ts - block_start > BLOCK_DURATION or ts - last_ts > BLOCK_DURATION:
+        return floor_hour(ts)
+    return block_start
+
+
+def floor_hour(ts: datetime) -> datetime:
+    """UTC 기준 정각으로 내림 (블록 시작 시각)"""
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def isoformat(ts: datetime) -> str:
+    """ccusage와 같은 형식의 UTC 타임스탬프 문자열"""
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.000Z")